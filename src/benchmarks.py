@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from dashboards import SRC_DIR, load_dashboard
+import synthetic_data
+
+
+benchmark_countries = ['Germany', 'United Kingdom', 'France', 'Spain', 'United States',
+                       'Canada', 'Mexico', 'Brazil', 'Argentina', 'Colombia']
+
+year_ranges = [[2010, 2021], [1990, 2021], [1970, 2021]]
+
+law_index_years = [(2010, 2020), (1990, 2020), (1970, 2020)]
+
+economy_groups = ['United States, Canada, Mexico', 'Germany, United Kingdom, France, Spain']
+
+
+def countries_cases(dashboard, function, sizes, *extra_args):
+    return [(dashboard, function, f'countries={size}', (benchmark_countries[:size],) + extra_args)
+            for size in sizes]
+
+
+# (dashboard, callback function, parameters label, arguments)
+cases = (
+    countries_cases('main', 'population_chart', [1, 2, 4])
+    + countries_cases('main', 'update_employment_ratio_chart', [1, 4, 10])
+    + countries_cases('main', 'update_law_index', [1, 2, 4])
+    + countries_cases('main', 'dgp_lifeexpectancy_scatter', [1, 2, 4])
+    + countries_cases('women_rights', 'update_employment_equality_chart', [1, 4, 10])
+    + countries_cases('women_rights', 'update_figure', [1, 4, 10], 2020)
+    + [('economy', 'update_graph', f'countries={len(group.split(", "))},years={years[0]}-{years[1]}',
+        (group, years))
+       for group in economy_groups for years in year_ranges]
+    + [('law_index', 'update_graph', f'years={first_year},{second_year}',
+        ('SG.LAW.INDX', first_year, second_year))
+       for first_year, second_year in law_index_years]
+)
+
+
+def timings(func, repeat, warmup=1):
+    for _ in range(warmup):
+        func()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return {'min': min(durations), 'median': statistics.median(durations),
+            'mean': statistics.fmean(durations), 'runs': repeat}
+
+
+def run_callbacks(root, repeat):
+    results = {}
+    for dashboard, function, label, args in cases:
+        callback = getattr(load_dashboard(dashboard, root), function)
+        try:
+            results[f'{dashboard}.{function}[{label}]'] = timings(lambda: callback(*args), repeat)
+        except Exception as error:
+            results[f'{dashboard}.{function}[{label}]'] = {'error': repr(error)}
+    return results
+
+
+def run_polishing(root, repeat):
+    script = os.path.join(SRC_DIR, 'data-polishing.py')
+    return timings(lambda: subprocess.run([sys.executable, script], cwd=os.path.join(root, 'src'),
+                                          stdout=subprocess.DEVNULL, check=True),
+                   repeat, warmup=0)
+
+
+def prepare_dataset(root, scale, n_series, seed):
+    for directory in ['data', 'src', os.path.join('women_rights', 'src')]:
+        os.makedirs(os.path.join(root, directory), exist_ok=True)
+
+    params = {'countries': int(synthetic_data.PRODUCTION_COUNTRIES * scale),
+              'series': n_series, 'seed': seed}
+    params_path = os.path.join(root, 'data', 'generated.json')
+    if os.path.exists(params_path):
+        with open(params_path) as params_file:
+            generated = json.load(params_file)
+        if all(generated.get(key) == value for key, value in params.items()):
+            return generated
+
+    params['rows'] = synthetic_data.generate(os.path.join(root, 'data', 'data.csv'),
+                                             n_countries=params['countries'],
+                                             n_series=n_series, seed=seed)
+    with open(params_path, 'w') as params_file:
+        json.dump(params, params_file)
+    return params
+
+
+def run_dataset(root, repeat, polish_repeat):
+    print(f'{root}: data-polishing')
+    results = {'data-polishing': run_polishing(root, polish_repeat)}
+
+    # Each dataset gets a fresh interpreter, since the dashboards load their
+    # data on import.
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as output_file:
+        output_path = output_file.name
+    try:
+        print(f'{root}: callbacks')
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--callbacks-only', root,
+                        '--repeat', str(repeat), '--output', output_path],
+                       stdout=subprocess.DEVNULL, check=True)
+        with open(output_path) as callbacks_file:
+            results.update(json.load(callbacks_file))
+    finally:
+        os.remove(output_path)
+    return results
+
+
+def failures(results):
+    return [(dataset, case, timing['error']) for dataset, cases_results in results['results'].items()
+            for case, timing in cases_results.items() if 'error' in timing]
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for dataset, cases_results in results['results'].items():
+        for case, timing in cases_results.items():
+            reference = baseline.get('results', {}).get(dataset, {}).get(case)
+            if 'error' in timing:
+                if reference is not None and 'error' not in reference:
+                    print(f'{dataset:>10} {case:<70} failed, passed in the baseline')
+                continue
+            if reference is None or 'error' in reference:
+                continue
+            ratio = timing['median'] / reference['median']
+            flag = 'SLOWER' if ratio > 1 + tolerance else ''
+            print(f'{dataset:>10} {case:<70} {reference["median"] * 1000:9.1f}ms '
+                  f'-> {timing["median"] * 1000:9.1f}ms {ratio:6.2f}x {flag}')
+            if flag:
+                regressions.append((dataset, case, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time every dashboard callback and the cleaning script on synthetic data.')
+    parser.add_argument('--scales', nargs='+', type=float, default=[1],
+                        help='dataset sizes, as multiples of the production number of countries')
+    parser.add_argument('--series', type=int, default=synthetic_data.PRODUCTION_SERIES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--polish-repeat', type=int, default=1)
+    parser.add_argument('--work-dir', default='../benchmarks')
+    parser.add_argument('--output', default='../benchmarks/results.json')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown of the median before a case is flagged')
+    parser.add_argument('--callbacks-only', metavar='ROOT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.callbacks_only:
+        with open(args.output, 'w') as output_file:
+            json.dump(run_callbacks(args.callbacks_only, args.repeat), output_file)
+        return
+
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'datasets': {},
+        'results': {},
+    }
+    for scale in args.scales:
+        dataset = f'scale-{scale:g}'
+        root = os.path.abspath(os.path.join(args.work_dir, dataset))
+        results['datasets'][dataset] = prepare_dataset(root, scale, args.series, args.seed)
+        results['results'][dataset] = run_dataset(root, args.repeat, args.polish_repeat)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f'Wrote {args.output}')
+
+    failed = failures(results)
+    for dataset, case, error in failed:
+        print(f'{dataset:>10} {case:<70} failed: {error}')
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print(f'{len(regressions)} cases slower than the baseline by more than {args.tolerance:.0%}')
+    if failed:
+        print(f'{len(failed)} cases failed')
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+
+
+MANIFEST_NAME = 'build_manifest.json'
+READ_BLOCK = 1 << 20
+
+
+class NotSplittable(Exception):
+    pass
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(READ_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_entry(path, known=None):
+    # A file whose size and modification time match the recorded ones is
+    # not hashed again.
+    stat = os.stat(path)
+    if known and known.get('size') == stat.st_size and known.get('mtime_ns') == stat.st_mtime_ns:
+        return known
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256_file(path)}
+
+
+def source_digest(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+def load(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def save(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def first_field(line):
+    if line.startswith(b'"'):
+        end = 1
+        while True:
+            end = line.index(b'"', end)
+            if line[end + 1:end + 2] != b'"':
+                break
+            end += 2
+        return line[1:end].replace(b'""', b'"').decode('utf-8')
+    return line.split(b',', 1)[0].rstrip(b'\r\n').decode('utf-8')
+
+
+def country_blocks(path):
+    # The byte range and digest of the rows of each country, for files whose
+    # countries are contiguous and whose rows are single lines.
+    blocks = []
+    seen = set()
+    with open(path, 'rb') as source:
+        header = source.readline()
+        offset = len(header)
+        current = None
+        for line in source:
+            length = len(line)
+            if line.count(b'"') % 2:
+                raise NotSplittable(f'{path} has a quoted line break')
+            if not line.strip():
+                offset += length
+                continue
+            country = first_field(line)
+            if current is None or country != current['country']:
+                if country in seen:
+                    raise NotSplittable(f'the rows of {country} are not contiguous in {path}')
+                seen.add(country)
+                current = {'country': country, 'offset': offset, 'length': 0, 'rows': 0,
+                           'digest': hashlib.sha256()}
+                blocks.append(current)
+            current['length'] = offset + length - current['offset']
+            current['rows'] += 1
+            current['digest'].update(line)
+            offset += length
+    for block in blocks:
+        block['sha256'] = block.pop('digest').hexdigest()
+    return header, blocks
+
+
+def read_range(path, offset, length):
+    with open(path, 'rb') as source:
+        source.seek(offset)
+        return source.read(length)
@@ -0,0 +1,628 @@
+import hashlib
+import io
+import json
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import build_manifest
+import data_cache
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+MAX_MISSING_SERIES_PER_COUNTRY = 6
+MAX_MISSING_YEAR_PERCENT = 40
+MAX_MISSING_SERIES_PERCENT = 0.5
+
+ID_COLUMNS = ['Country Name', 'Country Code', 'Series Name', 'Series Code']
+
+MB = 1024 * 1024
+
+
+def year_columns_of(columns):
+    return [col for col in columns if 'YR' in col]
+
+
+def read_data(path):
+    # Values stay the strings they are in the databank file, '..' marks
+    # missing ones, so the cleaned file keeps the original number formatting.
+    return pd.read_csv(path, dtype=str, na_values=['..'])
+
+
+def missing_series_per_country(data, missing):
+    all_missing = pd.Series(missing.all(axis=1), index=data.index)
+    return all_missing.groupby(data['Country Name']).sum()
+
+
+def missing_percent_per_year(year_columns, missing):
+    return pd.Series(missing.sum(axis=0), index=year_columns) / len(missing) * 100
+
+
+def missing_percent_per_series(data, missing):
+    missing_per_row = pd.Series(missing.sum(axis=1), index=data.index)
+    missing_values = missing_per_row.groupby(data['Series Name']).sum()
+    return missing_values / (missing.shape[1] * len(data)) * 100
+
+
+def remove_countries(keys, missing, max_missing_series):
+    counts = missing_series_per_country(keys, missing)
+    removed = counts[counts > max_missing_series].sort_values(ascending=False)
+    keep = ~keys['Country Name'].isin(removed.index).to_numpy()
+    return keep, {'missing_series': counts.to_dict(), 'removed': removed.to_dict()}
+
+
+def remove_years(year_columns, missing, max_missing_percent):
+    percent = missing_percent_per_year(year_columns, missing)
+    removed = percent[percent > max_missing_percent]
+    keep = (percent <= max_missing_percent).to_numpy() | percent.isna().to_numpy()
+    return keep, {'missing_percent': percent.to_dict(), 'removed': removed.to_dict()}
+
+
+def remove_series(keys, missing, max_missing_percent):
+    percent = missing_percent_per_series(keys, missing)
+    removed = percent[percent > max_missing_percent].sort_values(ascending=False)
+    keep = ~keys['Series Name'].isin(removed.index).to_numpy()
+    return keep, {'missing_percent': percent.to_dict(), 'removed': removed.to_dict()}
+
+
+def decide(keys, missing, year_columns, timer, max_missing_series, max_missing_year_percent,
+           max_missing_series_percent):
+    # keys holds the 'Country Name' and 'Series Name' of every row, missing
+    # the row x year missing value mask.
+    keep, countries = timer.run('countries', remove_countries, keys, missing, max_missing_series)
+    keys, missing = keys[keep], missing[keep]
+    keep, years = timer.run('years', remove_years, year_columns, missing, max_missing_year_percent)
+    missing = missing[:, keep]
+    keep, series = timer.run('series', remove_series, keys, missing, max_missing_series_percent)
+    return {'countries': countries, 'years': years, 'series': series}
+
+
+def kept_rows(data, steps):
+    return ~data['Country Name'].isin(list(steps['countries']['removed'])) \
+        & ~data['Series Name'].isin(list(steps['series']['removed']))
+
+
+def apply_steps(data, steps):
+    return data[kept_rows(data, steps)].drop(columns=list(steps['years']['removed']))
+
+
+def describe(data, years=None):
+    return {'rows': len(data),
+            'countries': int(data['Country Name'].nunique()),
+            'series': int(data['Series Name'].nunique()),
+            'years': len(year_columns_of(data.columns)) if years is None else years}
+
+
+def max_rss_mb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageTimer:
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = []
+
+    def run(self, name, func, *args):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = func(*args)
+        stage = {'stage': name, 'seconds': time.perf_counter() - start, 'max_rss_mb': max_rss_mb()}
+        if self.trace_memory:
+            stage['traced_peak_mb'] = tracemalloc.get_traced_memory()[1] / MB
+        self.stages.append(stage)
+        return result
+
+
+def clean(data, timer, max_missing_series=MAX_MISSING_SERIES_PER_COUNTRY,
+          max_missing_year_percent=MAX_MISSING_YEAR_PERCENT,
+          max_missing_series_percent=MAX_MISSING_SERIES_PERCENT, state=None):
+    year_columns = year_columns_of(data.columns)
+    missing = timer.run('missing mask', lambda: data[year_columns].isna().to_numpy())
+    steps = decide(data, missing, year_columns, timer, max_missing_series,
+                   max_missing_year_percent, max_missing_series_percent)
+    if state is not None:
+        state.update(keys=data[ID_COLUMNS], missing=missing, year_columns=year_columns)
+    return apply_steps(data, steps), steps
+
+
+def polish_in_memory(input_path, output_dir, timer, max_missing_series,
+                     max_missing_year_percent, max_missing_series_percent, state=None):
+    data = timer.run('read', read_data, input_path)
+    report = {'input': dict(describe(data), path=input_path)}
+    data_cleaned, report['steps'] = clean(data, timer, max_missing_series,
+                                          max_missing_year_percent, max_missing_series_percent, state)
+    del data
+
+    timer.run('write', write_outputs, data_cleaned, output_dir)
+    report['output'] = dict(describe(data_cleaned), path=os.path.join(output_dir, 'cleaned_data.csv'))
+    return report
+
+
+def polish(input_path='../data/data.csv', output_dir='../data',
+           max_missing_series=MAX_MISSING_SERIES_PER_COUNTRY,
+           max_missing_year_percent=MAX_MISSING_YEAR_PERCENT,
+           max_missing_series_percent=MAX_MISSING_SERIES_PERCENT,
+           trace_memory=False, chunksize=None, force=False):
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {} if force else build_manifest.load(output_dir)
+    input_entry = build_manifest.file_entry(input_path, manifest.get('input'))
+    parameters = build_parameters(max_missing_series, max_missing_year_percent, max_missing_series_percent)
+    if up_to_date(manifest, input_entry, parameters, output_dir):
+        return dict(manifest['report'], up_to_date=True)
+
+    if trace_memory:
+        tracemalloc.start()
+    timer = StageTimer(trace_memory)
+    if chunksize:
+        report = polish_streaming(input_path, output_dir, timer, max_missing_series, max_missing_year_percent,
+                                  max_missing_series_percent, chunksize)
+        build = {}
+    else:
+        report, build = polish_incremental(input_path, output_dir, timer, manifest, max_missing_series,
+                                           max_missing_year_percent, max_missing_series_percent)
+
+    if trace_memory:
+        tracemalloc.stop()
+    report['thresholds'] = parameters['thresholds']
+    report['chunksize'] = chunksize
+    report['stages'] = timer.stages
+    report['seconds'] = time.perf_counter() - start
+    with open(os.path.join(output_dir, 'cleaning_report.json'), 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+
+    outputs = {name: build_manifest.file_entry(os.path.join(output_dir, name)) for name in OUTPUT_NAMES}
+    build_manifest.save(output_dir, dict(build, input=input_entry, parameters=parameters, outputs=outputs,
+                                         report=report))
+    cleaned = os.path.join(output_dir, 'cleaned_data.csv')
+    data_cache.invalidate(cleaned, outputs['cleaned_data.csv']['sha256'])
+    return report
+
+
+def write_lookups(data, output_dir):
+    unique_series_and_codes = data[['Series Name', 'Series Code']].drop_duplicates()
+    unique_countries_and_codes = data[['Country Name', 'Country Code']].drop_duplicates()
+    unique_series_and_codes.to_csv(os.path.join(output_dir, 'series.csv'), index=False)
+    unique_countries_and_codes.to_csv(os.path.join(output_dir, 'countries.csv'), index=False)
+
+
+def write_outputs(data_cleaned, output_dir):
+    data_cleaned.to_csv(os.path.join(output_dir, 'cleaned_data.csv'), index=False)
+    write_lookups(data_cleaned, output_dir)
+
+
+# Incremental rebuilds: build_manifest.json in the output directory records
+# the digest of the input, of every country's rows in it and of the outputs,
+# and cache/cleaning_state.npz the missing value mask of the last run. A run
+# with the same input, thresholds and code does nothing; otherwise only the
+# rows of the countries that changed are parsed, and when the same years and
+# series are removed as before, the rows of the other countries are copied
+# from the previous cleaned_data.csv.
+
+OUTPUT_NAMES = ['cleaned_data.csv', 'series.csv', 'countries.csv']
+STATE_NAME = 'cleaning_state.npz'
+
+
+def build_parameters(max_missing_series, max_missing_year_percent, max_missing_series_percent):
+    return {'thresholds': {'max_missing_series_per_country': max_missing_series,
+                           'max_missing_year_percent': max_missing_year_percent,
+                           'max_missing_series_percent': max_missing_series_percent},
+            'code': build_manifest.source_digest(__file__)}
+
+
+def output_current(output_dir, manifest, name):
+    recorded = manifest.get('outputs', {}).get(name)
+    path = os.path.join(output_dir, name)
+    return bool(recorded) and os.path.exists(path) and \
+        build_manifest.file_entry(path, recorded)['sha256'] == recorded['sha256']
+
+
+def up_to_date(manifest, input_entry, parameters, output_dir):
+    return manifest.get('input', {}).get('sha256') == input_entry['sha256'] \
+        and manifest.get('parameters') == parameters \
+        and all(output_current(output_dir, manifest, name) for name in OUTPUT_NAMES)
+
+
+def state_path(output_dir):
+    return os.path.join(output_dir, data_cache.CACHE_DIR_NAME, STATE_NAME)
+
+
+def save_state(output_dir, keys, missing, year_columns):
+    # The ID columns are stored as category codes and the mask as bits, so
+    # the state is a few percent of the input size.
+    path = state_path(output_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    arrays = {'year_columns': np.array(year_columns, dtype=str),
+              'missing': np.packbits(missing, axis=1)}
+    for column in ID_COLUMNS:
+        categorical = pd.Categorical(keys[column])
+        arrays[f'{column} categories'] = np.array(categorical.categories, dtype=str)
+        arrays[f'{column} codes'] = categorical.codes.astype(np.int32)
+    with open(path + '.tmp', 'wb') as state_file:
+        np.savez(state_file, **arrays)
+    os.replace(path + '.tmp', path)
+    return build_manifest.file_entry(path)
+
+
+def load_state(output_dir, manifest):
+    path = state_path(output_dir)
+    recorded = manifest.get('state')
+    if not recorded or not os.path.exists(path) or \
+            build_manifest.file_entry(path, recorded)['sha256'] != recorded['sha256']:
+        return None
+    with np.load(path) as saved:
+        year_columns = list(saved['year_columns'])
+        keys = pd.DataFrame({column: pd.Categorical.from_codes(saved[f'{column} codes'],
+                                                               saved[f'{column} categories']).astype(object)
+                             for column in ID_COLUMNS})
+        missing = np.unpackbits(saved['missing'], axis=1, count=len(year_columns)).astype(bool)
+    return keys, missing, year_columns
+
+
+def read_blocks(input_path, header, blocks):
+    content = b''.join(build_manifest.read_range(input_path, block['offset'], block['length']) for block in blocks)
+    parsed = read_data(io.BytesIO(header + content))
+    if len(parsed) != sum(block['rows'] for block in blocks):
+        raise build_manifest.NotSplittable(f'the changed rows of {input_path} did not parse line by line')
+    return parsed
+
+
+def reuse_rows(input_path, header, blocks, manifest, previous, timer):
+    # The keys and mask of the new input, from the saved state for the
+    # countries whose rows did not change and parsed for the others. The
+    # countries removed last time are parsed too, in case they are kept now.
+    keys, missing, year_columns = previous
+    old_blocks = manifest['input_blocks']
+    starts = np.cumsum([0] + [block['rows'] for block in old_blocks])
+    if starts[-1] != len(keys):
+        return None
+    old = {block['country']: (block['sha256'], start, end)
+           for block, start, end in zip(old_blocks, starts[:-1], starts[1:])}
+    old_removed = set(manifest['report']['steps']['countries']['removed'])
+    parse = [block for block in blocks if block['country'] in old_removed
+             or old.get(block['country'], (None,))[0] != block['sha256']]
+
+    parsed = timer.run('read changed', read_blocks, input_path, header, parse)
+    if year_columns_of(parsed.columns) != year_columns:
+        return None
+    parsed_missing = timer.run('missing mask', lambda: parsed[year_columns].isna().to_numpy())
+
+    parsed_countries = {block['country'] for block in parse}
+    position = len(keys)
+    parsed_rows = {}
+    take = []
+    for block in blocks:
+        if block['country'] in parsed_countries:
+            rows = (position, position + block['rows'])
+            parsed_rows[block['country']] = (rows[0] - len(keys), rows[1] - len(keys))
+            position += block['rows']
+        else:
+            rows = old[block['country']][1:]
+        take.append(np.arange(*rows))
+    take = np.concatenate(take) if take else np.array([], dtype=int)
+    keys = pd.concat([keys, parsed[ID_COLUMNS]], ignore_index=True).take(take).reset_index(drop=True)
+    missing = np.concatenate([missing, parsed_missing])[take]
+    return keys, missing, year_columns, parsed, parsed_rows
+
+
+def write_spliced(output_dir, blocks, steps, kept_columns, parsed, parsed_rows, old_output_blocks):
+    path = os.path.join(output_dir, 'cleaned_data.csv')
+    removed_countries = set(steps['countries']['removed'])
+    output_blocks = {}
+    with open(path + '.tmp', 'wb') as output_file:
+        output_file.write(pd.DataFrame(columns=kept_columns).to_csv(index=False).encode('utf-8'))
+        for block in blocks:
+            country = block['country']
+            if country in removed_countries:
+                continue
+            if country in parsed_rows:
+                rows = parsed.iloc[slice(*parsed_rows[country])]
+                content = apply_steps(rows, steps).to_csv(index=False, header=False).encode('utf-8')
+            elif country in old_output_blocks:
+                old = old_output_blocks[country]
+                content = build_manifest.read_range(path, old['offset'], old['length'])
+            else:
+                content = b''
+            if content:
+                output_blocks[country] = {'offset': output_file.tell(), 'length': len(content)}
+                output_file.write(content)
+    os.replace(path + '.tmp', path)
+    return output_blocks
+
+
+def scan_output(output_dir):
+    try:
+        _, blocks = build_manifest.country_blocks(os.path.join(output_dir, 'cleaned_data.csv'))
+    except build_manifest.NotSplittable:
+        return None
+    return {block['country']: {'offset': block['offset'], 'length': block['length']} for block in blocks}
+
+
+def same_removed(steps, old_steps, stage):
+    return set(steps[stage]['removed']) == set(old_steps[stage]['removed'])
+
+
+def polish_incremental(input_path, output_dir, timer, manifest, max_missing_series, max_missing_year_percent,
+                       max_missing_series_percent):
+    thresholds = (max_missing_series, max_missing_year_percent, max_missing_series_percent)
+    try:
+        header, blocks = timer.run('scan', build_manifest.country_blocks, input_path)
+    except build_manifest.NotSplittable:
+        header, blocks = None, None
+    build = {'header': hashlib.sha256(header).hexdigest()} if blocks is not None else {}
+
+    reused = None
+    if blocks is not None and manifest.get('input_blocks') is not None \
+            and manifest.get('header') == build['header'] \
+            and manifest.get('parameters', {}).get('code') == build_parameters(*thresholds)['code'] \
+            and manifest.get('output_blocks') is not None \
+            and output_current(output_dir, manifest, 'cleaned_data.csv'):
+        previous = timer.run('load state', load_state, output_dir, manifest)
+        if previous is not None:
+            try:
+                reused = reuse_rows(input_path, header, blocks, manifest, previous, timer)
+            except build_manifest.NotSplittable:
+                reused = None
+
+    if reused is not None:
+        keys, missing, year_columns, parsed, parsed_rows = reused
+        steps = decide(keys, missing, year_columns, timer, *thresholds)
+        old_steps = manifest['report']['steps']
+        if not (same_removed(steps, old_steps, 'years') and same_removed(steps, old_steps, 'series')):
+            reused = None
+
+    if reused is None:
+        state = {}
+        report = polish_in_memory(input_path, output_dir, timer, *thresholds, state)
+        keys, missing, year_columns = state['keys'], state['missing'], state['year_columns']
+        report['rebuild'] = {'incremental': False}
+        if blocks is not None:
+            build['output_blocks'] = timer.run('scan output', scan_output, output_dir)
+    else:
+        removed_years = steps['years']['removed']
+        kept_columns = [column for column in parsed.columns if column not in removed_years]
+        build['output_blocks'] = timer.run('write', write_spliced, output_dir, blocks, steps, kept_columns,
+                                           parsed, parsed_rows, manifest['output_blocks'])
+        kept = keys[kept_rows(keys, steps).to_numpy()]
+        write_lookups(kept, output_dir)
+        report = {'input': dict(describe(keys, len(year_columns)), path=input_path),
+                  'steps': steps,
+                  'output': dict(describe(kept, len(year_columns) - len(removed_years)),
+                                 path=os.path.join(output_dir, 'cleaned_data.csv')),
+                  'rebuild': {'incremental': True, 'parsed_countries': sorted(parsed_rows),
+                              'reused_countries': len(blocks) - len(parsed_rows)}}
+
+    if blocks is not None:
+        build['input_blocks'] = blocks
+        build['state'] = timer.run('save state', save_state, output_dir, keys, missing, year_columns)
+    return report, build
+
+
+# Streaming mode: the file is read in chunks twice, once for the statistics
+# and once to write the rows that pass the filters, so memory depends on the
+# chunk size and the number of countries, series and years, not on the rows.
+
+NO_COUNTRY = ''
+
+
+def read_chunks(path, chunksize):
+    return pd.read_csv(path, dtype=str, na_values=['..'], chunksize=chunksize)
+
+
+class MissingStatistics:
+    def __init__(self, year_columns, max_missing_series):
+        self.year_columns = year_columns
+        self.max_missing_series = max_missing_series
+        self.rows = 0
+        self.series_names = set()
+        self.country_rows = {}
+        self.all_missing = {}
+        self.year_missing = {}
+        # Missing values per series and year over the countries that are
+        # kept. A country is only known to be kept once all its rows have been
+        # read, so this relies on the rows of each country being contiguous,
+        # as they are in databank downloads; otherwise `grouped` turns False
+        # and series_pass counts them in another read.
+        self.grouped = True
+        self.series_missing = None
+        self.open_country = None
+        self.pending = []
+        self.closed = set()
+
+    def add(self, chunk):
+        countries = chunk['Country Name'].fillna(NO_COUNTRY)
+        missing = pd.DataFrame(chunk[self.year_columns].isna().to_numpy(), columns=self.year_columns)
+        missing.index = chunk.index
+        self.rows += len(chunk)
+        self.series_names.update(chunk['Series Name'].dropna().unique())
+
+        by_country = missing.groupby(countries, sort=False)
+        all_missing = missing.all(axis=1).groupby(countries, sort=False).sum()
+        for country, rows in by_country.size().items():
+            self.country_rows[country] = self.country_rows.get(country, 0) + rows
+            self.all_missing[country] = self.all_missing.get(country, 0) + all_missing[country]
+        for country, counts in by_country.sum().iterrows():
+            previous = self.year_missing.get(country)
+            self.year_missing[country] = counts.to_numpy() if previous is None else previous + counts.to_numpy()
+
+        if self.grouped:
+            self.add_series(missing, countries, chunk['Series Name'])
+
+    def add_series(self, missing, countries, series):
+        order = pd.unique(countries)
+        runs = int((countries != countries.shift()).sum())
+        reopened = [country for country in order if country in self.closed
+                    or (country == self.open_country and country != order[0])]
+        if runs != len(order) or reopened:
+            self.grouped = False
+            self.series_missing = None
+            self.pending = []
+            return
+
+        per_country = {country: counts.droplevel(0) for country, counts in
+                       missing.groupby([countries, series], sort=False).sum().groupby(level=0, sort=False)}
+        for country in order:
+            if country != self.open_country:
+                self.close_country()
+                self.open_country = country
+            if country in per_country:
+                self.pending.append(per_country[country])
+
+    def close_country(self):
+        country, pending = self.open_country, self.pending
+        self.pending = []
+        if country is None:
+            return
+        self.closed.add(country)
+        if country != NO_COUNTRY and self.all_missing[country] > self.max_missing_series:
+            return
+        for counts in pending:
+            self.series_missing = counts if self.series_missing is None else \
+                self.series_missing.add(counts, fill_value=0)
+
+    def finish(self):
+        if self.grouped:
+            self.close_country()
+
+
+def statistics_pass(input_path, chunksize, max_missing_series):
+    statistics = None
+    for chunk in read_chunks(input_path, chunksize):
+        if statistics is None:
+            statistics = MissingStatistics(year_columns_of(chunk.columns), max_missing_series)
+        statistics.add(chunk)
+    statistics.finish()
+    return statistics
+
+
+def series_pass(input_path, chunksize, removed_countries, kept_years):
+    series_missing = pd.Series(dtype=float)
+    for chunk in read_chunks(input_path, chunksize):
+        chunk = chunk[~chunk['Country Name'].isin(removed_countries)]
+        missing_per_row = pd.Series(chunk[kept_years].isna().to_numpy().sum(axis=1), index=chunk.index)
+        series_missing = series_missing.add(missing_per_row.groupby(chunk['Series Name']).sum(), fill_value=0)
+    return series_missing
+
+
+def decide_from_statistics(statistics, input_path, chunksize, max_missing_year_percent, max_missing_series_percent, timer):
+    counts = pd.Series({country: count for country, count in statistics.all_missing.items()
+                        if country != NO_COUNTRY}, dtype=int).sort_index()
+    removed_countries = counts[counts > statistics.max_missing_series].sort_values(ascending=False)
+    kept = [country for country in statistics.country_rows if country not in removed_countries.index]
+    kept_rows = sum(statistics.country_rows[country] for country in kept)
+
+    year_missing = sum(statistics.year_missing[country] for country in kept)
+    year_percent = pd.Series(year_missing, index=statistics.year_columns) / kept_rows * 100
+    removed_years = year_percent[year_percent > max_missing_year_percent]
+    kept_years = [column for column in statistics.year_columns if column not in removed_years.index]
+
+    if statistics.grouped:
+        series_missing = statistics.series_missing[kept_years].sum(axis=1)
+    else:
+        series_missing = timer.run('series pass', series_pass, input_path, chunksize,
+                                   removed_countries.index, kept_years)
+    series_percent = (series_missing / (len(kept_years) * kept_rows) * 100).sort_index()
+    removed_series = series_percent[series_percent > max_missing_series_percent].sort_values(ascending=False)
+
+    return {
+        'countries': {'missing_series': counts.to_dict(), 'removed': removed_countries.to_dict()},
+        'years': {'missing_percent': year_percent.to_dict(), 'removed': removed_years.to_dict()},
+        'series': {'missing_percent': series_percent.to_dict(), 'removed': removed_series.to_dict()},
+    }
+
+
+def write_pass(input_path, output_dir, chunksize, steps):
+    rows = 0
+    series_and_codes = []
+    countries_and_codes = []
+    with open(os.path.join(output_dir, 'cleaned_data.csv'), 'w', newline='') as output_file:
+        for number, chunk in enumerate(read_chunks(input_path, chunksize)):
+            chunk = apply_steps(chunk, steps)
+            chunk.to_csv(output_file, index=False, header=number == 0)
+            rows += len(chunk)
+            series_and_codes.append(chunk[['Series Name', 'Series Code']].drop_duplicates())
+            countries_and_codes.append(chunk[['Country Name', 'Country Code']].drop_duplicates())
+
+    unique_series_and_codes = pd.concat(series_and_codes).drop_duplicates()
+    unique_countries_and_codes = pd.concat(countries_and_codes).drop_duplicates()
+    unique_series_and_codes.to_csv(os.path.join(output_dir, 'series.csv'), index=False)
+    unique_countries_and_codes.to_csv(os.path.join(output_dir, 'countries.csv'), index=False)
+    return {'rows': rows,
+            'countries': int(unique_countries_and_codes['Country Name'].nunique()),
+            'series': int(unique_series_and_codes['Series Name'].nunique())}
+
+
+def polish_streaming(input_path, output_dir, timer, max_missing_series, max_missing_year_percent,
+                     max_missing_series_percent, chunksize):
+    statistics = timer.run('statistics pass', statistics_pass, input_path, chunksize, max_missing_series)
+    steps = decide_from_statistics(statistics, input_path, chunksize, max_missing_year_percent,
+                                   max_missing_series_percent, timer)
+    output = timer.run('write pass', write_pass, input_path, output_dir, chunksize, steps)
+
+    return {
+        'input': {'rows': statistics.rows,
+                  'countries': len([country for country in statistics.country_rows if country != NO_COUNTRY]),
+                  'series': len(statistics.series_names),
+                  'years': len(statistics.year_columns),
+                  'path': input_path},
+        'steps': steps,
+        'output': dict(output, years=len(statistics.year_columns) - len(steps['years']['removed']),
+                       path=os.path.join(output_dir, 'cleaned_data.csv')),
+        'rows_grouped_by_country': statistics.grouped,
+    }
+
+
+def year_label(column):
+    return column[:4]
+
+
+def print_summary(report, top=10):
+    before, after = report['input'], report['output']
+    print(f"{before['rows']} rows, {before['countries']} countries, {before['series']} series, "
+          f"{before['years']} years -> {after['rows']} rows, {after['countries']} countries, "
+          f"{after['series']} series, {after['years']} years")
+
+    thresholds = report['thresholds']
+    countries = report['steps']['countries']['removed']
+    print(f"Removed {len(countries)} countries with more than "
+          f"{thresholds['max_missing_series_per_country']} empty series"
+          + (': ' + ', '.join(f'{name} ({count})' for name, count in list(countries.items())[:top])
+             if countries else ''))
+    if len(countries) > top:
+        print(f'    ... and {len(countries) - top} more')
+
+    years = report['steps']['years']['removed']
+    print(f"Removed {len(years)} years with more than {thresholds['max_missing_year_percent']}% missing"
+          + (': ' + ', '.join(year_label(year) for year in years) if years else ''))
+
+    series = report['steps']['series']['removed']
+    print(f"Removed {len(series)} series with more than {thresholds['max_missing_series_percent']}% "
+          f"of all values missing")
+    for name, percent in list(series.items())[:top]:
+        print(f'    {percent:6.2f}%  {name}')
+    if len(series) > top:
+        print(f'    ... and {len(series) - top} more')
+
+    rebuild = report.get('rebuild', {})
+    if rebuild.get('incremental'):
+        print(f"Parsed the rows of {len(rebuild['parsed_countries'])} changed countries, copied "
+              f"{rebuild['reused_countries']} from the previous cleaned_data.csv")
+
+    print('Stages:')
+    for stage in report['stages']:
+        memory = f", max RSS {stage['max_rss_mb']:.0f} MB" if stage['max_rss_mb'] is not None else ''
+        if 'traced_peak_mb' in stage:
+            memory += f", traced peak {stage['traced_peak_mb']:.0f} MB"
+        print(f"    {stage['stage']:<14} {stage['seconds']:7.2f}s{memory}")
+    print(f"Total {report['seconds']:.2f}s; per-country, per-year and per-series missing values "
+          f"are in cleaning_report.json")
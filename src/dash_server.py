@@ -0,0 +1,218 @@
+import atexit
+import gzip
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time
+
+from dash import Dash
+from flask import Flask, g, request
+
+import figure_executor
+import hot_reload
+import metrics
+import profiling
+import series_api
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSION_ENABLED = os.environ.get('RESPONSE_COMPRESSION', '1') == '1'
+COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.environ.get('RESPONSE_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('RESPONSE_BROTLI_QUALITY', 5))
+
+CALLBACK_METRICS = os.environ.get('CALLBACK_METRICS', '1') == '1'
+# Share of callback responses whose body is parsed to split its size by output.
+CALLBACK_SIZE_SAMPLE_RATE = float(os.environ.get('CALLBACK_SIZE_SAMPLE_RATE', 0.05))
+METRICS_DUMP_DIR = os.environ.get('METRICS_DUMP_DIR', '.')
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/javascript', 'text/javascript',
+                          'text/html', 'text/css', 'text/plain', 'image/svg+xml'}
+
+CALLBACK_PATH = '_dash-update-component'
+
+# Static bundles carry an ETag, so their compressed bodies are kept. Responses
+# that must be revalidated (the data API) are compressed every time.
+_compressed_static = {}
+_static_lock = threading.Lock()
+
+
+def choose_encoding(accept_encoding):
+    accepted = {part.split(';')[0].strip() for part in accept_encoding.lower().split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def record_callback_sizes(body, sent_bytes, encoding):
+    # Sampled, since it parses the body again; the ratio of the two counters
+    # is still the mean size per response.
+    if not CALLBACK_METRICS or random.random() >= CALLBACK_SIZE_SAMPLE_RATE:
+        return
+    try:
+        outputs = json.loads(body).get('response', {})
+    except ValueError:
+        return
+
+    raw_sizes = {output_id: len(json.dumps(value, separators=(',', ':')))
+                 for output_id, value in outputs.items()}
+    raw_total = sum(raw_sizes.values()) or 1
+    for output_id, raw_size in raw_sizes.items():
+        metrics.inc('dash_callback_responses_total', output=output_id)
+        metrics.inc('dash_callback_output_bytes_total', raw_size, output=output_id, encoding='identity')
+        if encoding:
+            metrics.inc('dash_callback_output_bytes_total', sent_bytes * raw_size / raw_total,
+                        output=output_id, encoding=encoding)
+
+
+def compress_response(response):
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    response.direct_passthrough = False
+    body = response.get_data()
+    encoding = None
+    if COMPRESSION_ENABLED and len(body) >= COMPRESSION_MIN_BYTES:
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+
+    if encoding:
+        etag = response.headers.get('ETag')
+        if etag and request.method == 'GET' and not response.cache_control.no_cache:
+            key = (request.path, etag, encoding)
+            with _static_lock:
+                compressed = _compressed_static.get(key)
+            if compressed is None:
+                compressed = compress(body, encoding)
+                with _static_lock:
+                    _compressed_static[key] = compressed
+        else:
+            compressed = compress(body, encoding)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+
+    sent_bytes = response.content_length
+    metrics.inc('http_response_bytes_total', len(body), encoding='identity')
+    if encoding:
+        metrics.inc('http_response_bytes_total', sent_bytes, encoding=encoding)
+    if request.path.endswith(CALLBACK_PATH):
+        record_callback_sizes(body, sent_bytes, encoding)
+    return response
+
+
+def start_callback_timer():
+    if request.path.endswith(CALLBACK_PATH):
+        g.callback_start = time.perf_counter()
+
+
+def callback_id():
+    body = request.get_json(silent=True) or {}
+    return body.get('output', 'unknown')
+
+
+def record_callback_metrics(response):
+    start = g.pop('callback_start', None)
+    if start is None:
+        return response
+    callback = callback_id()
+    metrics.inc('dash_callback_calls_total', callback=callback)
+    metrics.observe('dash_callback_duration_seconds', time.perf_counter() - start, callback=callback)
+    if response.status_code >= 400:
+        metrics.inc('dash_callback_errors_total', callback=callback)
+    elif not response.direct_passthrough:
+        metrics.observe('dash_callback_response_size_bytes', len(response.get_data()), callback=callback)
+    return response
+
+
+def record_callback_exception(error):
+    # Only reached with the timer still set when the exception propagated
+    # past the after_request hooks (debug mode).
+    start = g.pop('callback_start', None)
+    if start is None or error is None:
+        return
+    callback = callback_id()
+    metrics.inc('dash_callback_calls_total', callback=callback)
+    metrics.inc('dash_callback_errors_total', callback=callback)
+    metrics.observe('dash_callback_duration_seconds', time.perf_counter() - start, callback=callback)
+
+
+def start_callback_profile():
+    if request.path.endswith(CALLBACK_PATH) and profiling.should_sample():
+        g.callback_profile = profiling.start()
+
+
+def stop_callback_profile(error):
+    started = g.pop('callback_profile', None)
+    if started is None:
+        return
+    body = request.get_json(silent=True) or {}
+    inputs = {f"{item.get('id')}.{item.get('property')}": item.get('value')
+              for item in body.get('inputs', []) + body.get('state', []) if isinstance(item, dict)}
+    profiling.stop(started, body.get('output', 'unknown'),
+                   {'inputs': inputs, 'error': repr(error) if error else None})
+
+
+def dump_metrics():
+    os.makedirs(METRICS_DUMP_DIR, exist_ok=True)
+    metrics.dump(os.path.join(METRICS_DUMP_DIR, f'metrics-{os.getpid()}.prom'))
+
+
+def exit_on_sigterm(signum, frame):
+    sys.exit(0)
+
+
+def dump_metrics_on_exit():
+    # Called by whatever starts a server, not on import, so tools that only
+    # import a dashboard leave no metrics file and keep their SIGTERM handler.
+    if not CALLBACK_METRICS:
+        return
+    atexit.register(dump_metrics)
+    # atexit handlers only run on SIGTERM if it raises SystemExit.
+    if threading.current_thread() is threading.main_thread() and \
+            signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, exit_on_sigterm)
+
+
+def create_server(name):
+    server = Flask(name)
+    # Every request runs against one version of the data, see hot_reload.
+    server.before_request(hot_reload.begin_request)
+    server.teardown_request(hot_reload.end_request)
+    server.after_request(hot_reload.add_version_header)
+    server.after_request(compress_response)
+    server.add_url_rule('/metrics', 'metrics', metrics.metrics_view)
+    server.add_url_rule('/admin/reload', 'reload', hot_reload.reload_view, methods=['GET', 'POST'])
+    server.add_url_rule('/api/series', 'series', series_api.series_view)
+    if CALLBACK_METRICS:
+        # Registered after compress_response, so it sees the uncompressed body.
+        server.before_request(start_callback_timer)
+        server.after_request(record_callback_metrics)
+        server.teardown_request(record_callback_exception)
+    if profiling.enabled:
+        server.before_request(start_callback_profile)
+        server.teardown_request(stop_callback_profile)
+    return server
+
+
+hot_reload.on_swap(figure_executor.reset_process_pool)
+
+
+def create_app(name, **kwargs):
+    return Dash(name, server=create_server(name), **kwargs)
@@ -0,0 +1,93 @@
+import importlib
+import os
+import sys
+
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SRC_DIR)
+
+# Dashboard name -> (directory it runs from, relative to the repository root,
+# module name). The modules read their data relative to that directory, so
+# another root with the same layout and its own data/ can be used instead.
+dashboard_modules = {
+    'main': ('src', 'main'),
+    'economy': ('src', 'economy_and_women_employment_plot'),
+    'law_index': ('src', 'women_business_law_index'),
+    'women_rights': (os.path.join('women_rights', 'src'), 'women_rights'),
+}
+
+
+def load_dashboard(name, root=REPO_DIR):
+    directory, module_name = dashboard_modules[name]
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    module_dir = os.path.join(REPO_DIR, directory)
+    if module_dir not in sys.path:
+        sys.path.insert(0, module_dir)
+
+    cwd = os.getcwd()
+    os.chdir(os.path.join(root, directory))
+    try:
+        return importlib.import_module(module_name)
+    finally:
+        os.chdir(cwd)
+
+
+def _dependencies(items):
+    return [(item['id'], item['property']) for item in items]
+
+
+def callback_specs(app):
+    specs = []
+    for callback in app.callback_map.values():
+        outputs = callback['output'] if isinstance(callback['output'], list) else [callback['output']]
+        specs.append({
+            'outputs': [(output.component_id, output.component_property) for output in outputs],
+            'multi': isinstance(callback['output'], list),
+            'inputs': _dependencies(callback['inputs']),
+            'state': _dependencies(callback['state']),
+            'function': callback['callback'].__wrapped__,
+        })
+
+    # Callbacks run after the callbacks that produce their inputs.
+    ordered = []
+    produced_later = {output for spec in specs for output in spec['outputs']}
+    remaining = list(specs)
+    while remaining:
+        ready = [spec for spec in remaining
+                 if not any(dependency in produced_later for dependency in spec['inputs'])]
+        if not ready:
+            ready = remaining[:1]
+        for spec in ready:
+            remaining.remove(spec)
+            ordered.append(spec)
+        produced_later = {output for spec in remaining for output in spec['outputs']}
+    return ordered
+
+
+def layout_values(app):
+    values = {}
+    layout = app.layout() if callable(app.layout) else app.layout
+    for component in layout._traverse():
+        component_id = getattr(component, 'id', None)
+        if component_id is None:
+            continue
+        for prop in component._prop_names:
+            value = getattr(component, prop, None)
+            if value is not None:
+                values[(component_id, prop)] = value
+    return values
+
+
+def run_view(app, changes=None):
+    values = layout_values(app)
+    values.update(changes or {})
+    outputs = {}
+    for spec in callback_specs(app):
+        args = [values.get(dependency) for dependency in spec['inputs'] + spec['state']]
+        result = spec['function'](*args)
+        results = result if spec['multi'] else [result]
+        for output, value in zip(spec['outputs'], results):
+            values[output] = value
+            outputs[output] = value
+    return outputs
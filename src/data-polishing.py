@@ -1,67 +1,32 @@
-import pandas as pd
-import numpy as np
-
-data = pd.read_csv('../data/data.csv', low_memory=False)
-data = data.replace('..', np.nan)
-year_columns = [col for col in data.columns if 'YR' in col]
-
-# First step: Removing missing countries:
-data['all_missing'] = data[year_columns].isnull().all(axis=1)
-missing_counts = data.groupby('Country Name').apply(
-    lambda group: group['all_missing'].sum())
-missing_counts_sorted = missing_counts.sort_values(ascending=False)
-
-for country, count in missing_counts_sorted.items():
-    print(f"{country}: {count}")
-
-countries_to_remove = missing_counts_sorted[missing_counts_sorted > 6].index.tolist(
-)
-data_cleaned = data[~data['Country Name'].isin(countries_to_remove)]
-
-
-# Second step: Removing missing years:
-missing_values_per_year = data_cleaned[year_columns].isnull().sum(axis=0)
-percentage_missing_per_year = (
-    missing_values_per_year / len(data_cleaned)) * 100
-
-for year, count in missing_values_per_year.items():
-    print(
-        f"{year}: {count} missing values ({percentage_missing_per_year[year]:.2f}% of total)")
-
-years_to_drop = percentage_missing_per_year[percentage_missing_per_year > 40].index
-data_cleaned = data_cleaned.drop(years_to_drop, axis=1)
-
-year_columns = [col for col in data_cleaned.columns if 'YR' in col]
-
-
-# Third step: Removing missing series
-missing_values_per_series = data_cleaned.groupby('Series Name').apply(
-    lambda group: group[year_columns].isnull().sum().sum())
-percentage_missing_per_series = (
-    missing_values_per_series / (len(year_columns) * len(data_cleaned)) * 100)
-
-for series, count in missing_values_per_series.items():
-    print(
-        f"{series}: {count} missing values ({percentage_missing_per_series[series]:.2f}% of total)")
-
-series_to_drop = percentage_missing_per_series[percentage_missing_per_series > 0.5].index
-data_cleaned = data_cleaned[~data_cleaned['Series Name'].isin(series_to_drop)]
-
-data_cleaned = data_cleaned.drop(columns=['all_missing'])
-
-
-# Export cleaned data
-data_cleaned.to_csv('../data/cleaned_data.csv', index=False)
-
-
-# Find series name
-unique_series_and_codes = data_cleaned[[
-    'Series Name', 'Series Code']].drop_duplicates()
-
-# Find country name
-unique_countries_and_codes = data_cleaned[[
-    'Country Name', 'Country Code']].drop_duplicates()
-
-# Export them
-unique_series_and_codes.to_csv('../data/series.csv', index=False)
-unique_countries_and_codes.to_csv('../data/countries.csv', index=False)
+import argparse
+
+import cleaning
+
+
+parser = argparse.ArgumentParser(
+    description='Drop the countries, years and series of the databank extract with too many missing values.')
+parser.add_argument('--input', default='../data/data.csv')
+parser.add_argument('--output-dir', default='../data')
+parser.add_argument('--max-missing-series', type=int, default=cleaning.MAX_MISSING_SERIES_PER_COUNTRY,
+                    help='remove countries with more empty series than this')
+parser.add_argument('--max-missing-year-percent', type=float, default=cleaning.MAX_MISSING_YEAR_PERCENT,
+                    help='remove years with a larger share of missing values')
+parser.add_argument('--max-missing-series-percent', type=float, default=cleaning.MAX_MISSING_SERIES_PERCENT,
+                    help='remove series whose missing values are a larger share of all values')
+parser.add_argument('--chunksize', type=int,
+                    help='stream the input in chunks of this many rows instead of loading it whole')
+parser.add_argument('--trace-memory', action='store_true',
+                    help='also report the tracemalloc peak of every stage (slower)')
+parser.add_argument('--force', action='store_true',
+                    help='rebuild everything even if build_manifest.json says the outputs are up to date')
+args = parser.parse_args()
+
+report = cleaning.polish(args.input, args.output_dir,
+                         max_missing_series=args.max_missing_series,
+                         max_missing_year_percent=args.max_missing_year_percent,
+                         max_missing_series_percent=args.max_missing_series_percent,
+                         trace_memory=args.trace_memory, chunksize=args.chunksize, force=args.force)
+if report.get('up_to_date'):
+    print(f'{args.output_dir} is up to date with {args.input}; --force rebuilds it anyway')
+else:
+    cleaning.print_summary(report)
@@ -0,0 +1,178 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+import metrics
+from build_manifest import file_entry
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.csv
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_NAME = 'cache'
+DIGESTS_NAME = 'digests.json'
+# Kinds of files kept in the cache directory for a source file.
+CACHE_EXTENSIONS = ('.parquet', '.sqlite', '.duckdb')
+
+metrics.histogram('data_load_seconds', 'Time to load a data file, by file and source')
+
+
+def cache_dir(path):
+    return os.path.join(os.path.dirname(path), CACHE_DIR_NAME)
+
+
+def _load_digests(directory):
+    path = os.path.join(directory, DIGESTS_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as digests_file:
+        return json.load(digests_file)
+
+
+def _save_digests(directory, digests):
+    path = os.path.join(directory, DIGESTS_NAME)
+    temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as digests_file:
+        json.dump(digests, digests_file, indent=2)
+    os.replace(temporary, path)
+
+
+def source_digest(path):
+    directory = cache_dir(path)
+    digests = _load_digests(directory)
+    name = os.path.basename(path)
+    entry = file_entry(path, digests.get(name))
+    if entry is not digests.get(name):
+        os.makedirs(directory, exist_ok=True)
+        digests[name] = entry
+        _save_digests(directory, digests)
+    return entry['sha256']
+
+
+def cache_path(path, digest, extension='parquet'):
+    return os.path.join(cache_dir(path), f'{os.path.basename(path)}.{digest[:16]}.{extension}')
+
+
+def derived_path(path, digest, name):
+    return cache_path(path, digest, f'{name}.parquet')
+
+
+def invalidate(path, digest=None):
+    # Removes the cached copies of `path`, and the frames and stores derived
+    # from it, that were built from other contents.
+    keep = cache_path(path, digest, '') if digest else None
+    for cached in glob.glob(os.path.join(cache_dir(path), f'{glob.escape(os.path.basename(path))}.*')):
+        if cached.endswith(CACHE_EXTENSIONS) and (keep is None or not cached.startswith(keep)):
+            os.remove(cached)
+
+
+def write_parquet(frame, cached):
+    temporary = f'{cached}.{os.getpid()}.{threading.get_ident()}.tmp'
+    frame.to_parquet(temporary)
+    os.replace(temporary, cached)
+
+
+def write_table(table, cached):
+    temporary = f'{cached}.{os.getpid()}.{threading.get_ident()}.tmp'
+    pyarrow.parquet.write_table(table, temporary)
+    os.replace(temporary, cached)
+
+
+def is_year(column):
+    return column.startswith('19') or column.startswith('20')
+
+
+def wanted(column, columns, years):
+    if is_year(column):
+        return years is None or years[0] <= int(column[:4]) <= years[1]
+    return columns is None or column in columns
+
+
+def arrow_read(path):
+    table = pyarrow.csv.read_csv(path, read_options=pyarrow.csv.ReadOptions(use_threads=True))
+    # Empty columns come out as nulls where pd.read_csv gives float NaN.
+    for position, field in enumerate(table.schema):
+        if pyarrow.types.is_null(field.type):
+            table = table.set_column(position, field.name, table.column(position).cast(pyarrow.float64()))
+    return table
+
+
+def select_table(table, columns, series_codes, years):
+    if series_codes is not None:
+        table = table.filter(pyarrow.compute.is_in(table['Series Code'], value_set=pyarrow.array(series_codes)))
+    return table.select([name for name in table.column_names if wanted(name, columns, years)])
+
+
+def select_frame(frame, columns, series_codes, years):
+    if series_codes is not None:
+        frame = frame[frame['Series Code'].isin(series_codes)]
+    return frame[[column for column in frame.columns if wanted(column, columns, years)]]
+
+
+def read_csv(path, columns=None, series_codes=None, years=None):
+    # Same frame as pd.read_csv(path), narrowed to the non-year `columns`,
+    # the year columns within `years` (first, last) and the rows of
+    # `series_codes`, None keeping all. It comes from a parquet copy keyed by
+    # the CSV's content hash, which the filters are pushed into; when there
+    # is none yet, pyarrow's multithreaded reader parses the CSV to make it
+    # and only the selected part is converted to pandas.
+    start = time.perf_counter()
+    selected = columns is not None or series_codes is not None or years is not None
+    if pyarrow is None:
+        source = 'csv'
+        frame = select_frame(pd.read_csv(path), columns, series_codes, years)
+    else:
+        digest = source_digest(path)
+        cached = cache_path(path, digest)
+        if os.path.exists(cached):
+            source = 'parquet'
+            names = pyarrow.parquet.read_schema(cached).names
+            filters = [('Series Code', 'in', list(series_codes))] if series_codes is not None else None
+            frame = pd.read_parquet(cached, columns=[name for name in names if wanted(name, columns, years)]
+                                    if selected else None, filters=filters)
+        else:
+            source = 'csv'
+            table = arrow_read(path)
+            invalidate(path, digest)
+            write_table(table, cached)
+            frame = select_table(table, columns, series_codes, years).to_pandas()
+    if selected:
+        frame = frame.reset_index(drop=True)
+
+    seconds = time.perf_counter() - start
+    metrics.observe('data_load_seconds', seconds, file=os.path.basename(path), source=source)
+    logger.info('Loaded %d rows and %d columns of %s from %s in %.3fs',
+                len(frame), len(frame.columns), path, source, seconds)
+    return frame
+
+
+def read_derived(path, name, build):
+    # build(read_csv(path)), cached under the same content hash.
+    if pyarrow is None:
+        return build(read_csv(path))
+    cached = derived_path(path, source_digest(path), name)
+    if os.path.exists(cached):
+        return pd.read_parquet(cached)
+
+    frame = build(read_csv(path))
+    write_parquet(frame, cached)
+    return frame
+
+
+def write_derived(path, name, frame):
+    # Stores a frame derived from the current contents of path, for frames
+    # that were updated in place rather than built by read_derived.
+    if pyarrow is not None:
+        write_parquet(frame, derived_path(path, source_digest(path), name))
@@ -0,0 +1,121 @@
+import ast
+import logging
+import re
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# Series computed from others, as arithmetic over series codes, added to the
+# cube as ordinary columns. The expressions keep the order of operations of
+# the callbacks that used to compute them.
+DERIVED = {
+    'Labor force proportion': 'SL.TLF.TOTL.IN / SP.POP.TOTL * 100',
+    'Employment to population ratio, total (%)': 'SL.EMP.TOTL.SP.ZS * (SP.POP.TOTL - SP.POP.0014.TO) / SP.POP.TOTL',
+}
+
+# Gap and ratio columns of every female/male pair of series, named after the
+# pair's label.
+GAP = '{}: female - male'
+RATIO = '{}: female / male'
+
+CODE = re.compile(r'\b[A-Z][A-Z0-9_]*(?:\.[A-Z0-9_]+)+\b')
+OPERATORS = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+
+def parse(expression):
+    # The expression with its series codes replaced by names Python can
+    # parse, and the codes in the order of those names.
+    codes = []
+
+    def name(match):
+        if match.group() not in codes:
+            codes.append(match.group())
+        return f'series_{codes.index(match.group())}'
+
+    tree = ast.parse(CODE.sub(name, expression), mode='eval')
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.USub, ast.Constant, ast.Name,
+                                 ast.Load, *OPERATORS)):
+            raise ValueError(f'{expression!r}: only + - * / over series codes and numbers are supported')
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError(f'{expression!r}: {node.value!r} is not a number')
+    return tree.body, codes
+
+
+def evaluate(node, values):
+    if isinstance(node, ast.BinOp):
+        return OPERATORS[type(node.op)](evaluate(node.left, values), evaluate(node.right, values))
+    if isinstance(node, ast.UnaryOp):
+        return np.negative(evaluate(node.operand, values))
+    if isinstance(node, ast.Constant):
+        return node.value
+    return values[int(node.id.split('_')[1])]
+
+
+parsed = {name: parse(expression) for name, expression in DERIVED.items()}
+
+
+def pair_label(female_name):
+    # 'Mortality rate, adult, female (per 1,000 female adults)' ->
+    # 'Mortality rate, adult (per 1,000 adults)'
+    return re.sub(r',? female\b', '', female_name).replace(', (', ' (')
+
+
+def gender_pairs(series_names):
+    # (label, female series, male series) for every series whose code has an
+    # FE part where the code of another series has MA, as in SP.POP.TOTL.FE.IN
+    # and SP.POP.TOTL.MA.IN.
+    pairs = []
+    for code, name in series_names.items():
+        parts = code.split('.')
+        if 'FE' in parts:
+            male = series_names.get('.'.join('MA' if part == 'FE' else part for part in parts))
+            if male is not None:
+                pairs.append((pair_label(name), name, male))
+    return sorted(pairs)
+
+
+def gap_labels(columns):
+    # The pairs a cube with these columns has gap and ratio columns for.
+    suffix = GAP.format('')
+    return sorted(column[:-len(suffix)] for column in columns if column.endswith(suffix))
+
+
+def columns_of(columns):
+    # The columns `add` computed among these.
+    suffixes = (GAP.format(''), RATIO.format(''))
+    return [column for column in columns if column in DERIVED or column.endswith(suffixes)]
+
+
+def add(cube, series_names):
+    # The cube with a column per derived series and the gap and ratio of
+    # every female/male pair, computed over all its rows at once;
+    # series_names maps the codes to the cube's column names. A series whose
+    # inputs are not in the data comes out empty.
+    columns = {}
+    for name, (tree, codes) in parsed.items():
+        if name in cube.columns:
+            raise ValueError(f'Derived series {name!r} has the name of a series in the data')
+        missing = [code for code in codes if series_names.get(code) not in cube.columns]
+        if missing:
+            logger.warning('%s needs %s, which the data does not have', name, ', '.join(missing))
+            columns[name] = np.full(len(cube), np.nan)
+            continue
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns[name] = evaluate(tree, [cube[series_names[code]].to_numpy(dtype=float) for code in codes])
+
+    pairs = [pair for pair in gender_pairs(series_names) if pair[1] in cube.columns and pair[2] in cube.columns]
+    female = cube[[pair[1] for pair in pairs]].to_numpy(dtype=float)
+    male = cube[[pair[2] for pair in pairs]].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gaps, ratios = female - male, female / male
+    # A male value of 0 has no ratio.
+    ratios[np.isinf(ratios)] = np.nan
+    for position, (label, _, _) in enumerate(pairs):
+        for name, values in [(GAP.format(label), gaps[:, position]), (RATIO.format(label), ratios[:, position])]:
+            if name in cube.columns or name in columns:
+                raise ValueError(f'Gender pair column {name!r} has the name of another column')
+            columns[name] = values
+    return cube.assign(**columns)
@@ -2,9 +2,12 @@ import plotly.graph_objects as go
 from dash.dependencies import Input, Output
 from dash import html
 from dash import dcc
-import dash
-import pandas as pd
 import numpy as np
+from figure_executor import build_figures
+from dash_server import create_app, dump_metrics_on_exit
+import panel_store
+import series_cube
+import hot_reload
 
 
 def binary_categories_bar_creation(filtered_df, category_code, year_range, number_of_country, country):
@@ -95,7 +98,7 @@ def create_return_for_category(data, x_values, category_code, height, width):
             xaxis=dict(title='Year',
                        tickangle=0,
                        showgrid=True,
-                       range=[1970, 2021],
+                       range=[first_year, last_year],
                        tickvals=[i for i in range(int(x_values[0]), int(x_values[-1]), 5)]),
             yaxis2=dict(title = 'Answer',
                         overlaying='y',
@@ -145,7 +148,89 @@ def create_return_for_hist_category(data, x_values, category_code, height, width
     }
 
 
-df = pd.read_csv('../data/cleaned_data.csv')
+def gdp_tickvals(maximum, share, digits):
+    # Ticks every `share` of the maximum, rounded to `digits` decimals, or to
+    # the step's own leading digit for economies too small for that rounding.
+    if not maximum > 0:
+        return []
+    shift = int(round(int(maximum) * share, digits))
+    if shift <= 0:
+        shift = int(round(maximum * share, -int(np.floor(np.log10(maximum * share)))))
+    return [i for i in range(0, int(maximum), shift)]
+
+
+def create_gdp_figure(country_dfs, country_group, year_range):
+    traces = []
+    y_scatter_max = []
+
+    for number_of_country, (country, filtered_df) in enumerate(country_dfs.items()):
+        first_series_df = filtered_df[filtered_df['Series Code'] == 'NY.GDP.MKTP.CD']
+
+        x_values = first_series_df.loc[:,
+                                 f'{year_range[0]} [YR{year_range[0]}]':f'{year_range[1]} [YR{year_range[1]}]'].columns
+        x_values = [x[0:4] for x in x_values]
+        y_values = first_series_df.loc[:, f'{year_range[0]} [YR{year_range[0]}]':
+                                 f'{year_range[1]} [YR{year_range[1]}]'].values[0]
+        y_values_fixed = []
+        for idx, y_value in enumerate(y_values):
+            if idx == 0 or np.isnan(y_value) == False:
+                existed_value = y_value
+                y_values_fixed.append(existed_value)
+            elif not y_value and y_value != 0:
+                y_values_fixed.append(existed_value)
+
+        y_scatter_max.append(max(y_values))
+        name_of_graph = country
+        trace = go.Scatter(
+            x=x_values,
+            y=y_values_fixed,
+            mode='lines',
+            name=name_of_graph,
+            yaxis='y1',
+            marker_color=country_colors[number_of_country],
+            showlegend=True
+        )
+        traces.append(trace)
+
+    if country_group != 'Cameroon, Egypt, Kenya, Nigeria':
+        positive_tickvals = gdp_tickvals(max(y_scatter_max), 0.25, -12)
+        max_range = max(y_scatter_max) + 1000000000000
+        min_range = -max(y_scatter_max) * 0.4
+    else:
+        positive_tickvals = gdp_tickvals(max(y_scatter_max), 0.33, -10)
+        max_range = max(y_scatter_max) + 10000000000
+        min_range = -max(y_scatter_max) * 0.4
+
+    height_main = 450
+    width_main = 900
+    return {
+        'data': traces,
+        'layout': go.Layout(
+            height=height_main,
+            width=width_main,
+            title='<b>Prosperity of the economy depends on the participation of women<b>',
+            xaxis={'title': 'Year'},
+            yaxis=dict(title='GDP (current US$)',
+                       showgrid=False,
+                       range=[min_range, max_range],
+                       tickvals=positive_tickvals,
+                       ),
+            hovermode='closest',
+        )
+    }
+
+
+def create_category_figure(country_dfs, category_code, year_range, x_values, height, width):
+    traces = [binary_categories_bar_creation(filtered_df, category_code, year_range, number_of_country, country)
+              for number_of_country, (country, filtered_df) in enumerate(country_dfs.items())]
+    return create_return_for_category(traces, x_values, category_code, height, width)
+
+
+def create_hist_category_figure(country_dfs, category_code, year_range, x_values, height, width):
+    traces = [binary_categories_hist_creation(filtered_df, category_code, year_range, number_of_country, country)
+              for number_of_country, (country, filtered_df) in enumerate(country_dfs.items())]
+    return create_return_for_hist_category(traces, x_values, category_code, height, width)
+
 
 countries_groups = ['Germany, United Kingdom, France, Spain',
         'United States, Canada, Mexico',
@@ -168,30 +253,63 @@ binary_series_data = {'SG.GET.JOBS.EQ': 'A woman can get a job in the same way a
                               'SG.CNT.SIGN.EQ': 'A woman can sign a contract in the same way as a man',
                               }
 
-app = dash.Dash(__name__)
-app.layout = html.Div([
-    dcc.Dropdown(
-        id='country-dropdown',
-        options=[{'label': i, 'value': i} for i in countries_groups],
-        value = 'Germany, United Kingdom, France, Spain'
-    ),
-    dcc.RangeSlider(
-        id='year-slider',
-        min=1970,
-        max=2021,
-        step=1,
-        value=[1970, 2021],
-        marks={i: str(i) for i in range(1960, 2023, 2)}
-    ),
-    dcc.Graph(id='indicator-graph'),
-    dcc.Graph(id='sg_get_jobs_eq_binary-indicator-graph'),
-    dcc.Graph(id='sg_get_work_eq_binary-indicator-graph'),
-    dcc.Graph(id='sg_law_nodc_hr_binary-indicator-graph'),
-    dcc.Graph(id='se_ter_enrr_fe_binary-indicator-graph'),
-    dcc.Graph(id='sg_law_indx_en_binary-indicator-graph'),
-    # dcc.Graph(id='sl_emp_mpyr_fe_zs_binary-indicator-graph'),
-    dcc.Graph(id='sg_cnt_sign_eq_binary-indicator-graph')
-])
+# Output graph of each category, in the order the callback returns them
+category_outputs = [
+    ('sg_get_jobs_eq_binary-indicator-graph', 'SG.GET.JOBS.EQ'),
+    ('sg_get_work_eq_binary-indicator-graph', 'SG.IND.WORK.EQ'),
+    ('sg_law_nodc_hr_binary-indicator-graph', 'SG.LAW.NODC.HR'),
+    ('se_ter_enrr_fe_binary-indicator-graph', 'SE.TER.ENRR.FE'),
+    ('sg_law_indx_en_binary-indicator-graph', 'SG.LAW.INDX.EN'),
+    # ('sl_emp_mpyr_fe_zs_binary-indicator-graph', 'SL.EMP.MPYR.FE.ZS'),
+    ('sg_cnt_sign_eq_binary-indicator-graph', 'SG.CNT.SIGN.EQ'),
+]
+
+hist_series_codes = ['SE.TER.ENRR.FE', 'SG.LAW.INDX.EN']
+
+DATA_PATH = '../data/cleaned_data.csv'
+
+
+def load_data(path):
+    # Only the rows of the plotted series and the columns the callbacks use.
+    df = panel_store.read_csv(path, columns=['Country Name', 'Series Code'],
+                             series_codes=list(series_data) + list(binary_series_data))
+    years = series_cube.years_of(df.columns)
+    return df, years[0], years[-1]
+
+
+df, first_year, last_year = load_data(DATA_PATH)
+hot_reload.register(__name__, DATA_PATH, load_data, ['df', 'first_year', 'last_year'])
+
+app = create_app(__name__)
+
+
+def serve_layout():
+    return html.Div([
+        dcc.Dropdown(
+            id='country-dropdown',
+            options=[{'label': i, 'value': i} for i in countries_groups],
+            value = 'Germany, United Kingdom, France, Spain'
+        ),
+        dcc.RangeSlider(
+            id='year-slider',
+            min=first_year,
+            max=last_year,
+            step=1,
+            value=[first_year, last_year],
+            marks={i: str(i) for i in range(first_year, last_year + 1, 2)}
+        ),
+        dcc.Graph(id='indicator-graph'),
+        dcc.Graph(id='sg_get_jobs_eq_binary-indicator-graph'),
+        dcc.Graph(id='sg_get_work_eq_binary-indicator-graph'),
+        dcc.Graph(id='sg_law_nodc_hr_binary-indicator-graph'),
+        dcc.Graph(id='se_ter_enrr_fe_binary-indicator-graph'),
+        dcc.Graph(id='sg_law_indx_en_binary-indicator-graph'),
+        # dcc.Graph(id='sl_emp_mpyr_fe_zs_binary-indicator-graph'),
+        dcc.Graph(id='sg_cnt_sign_eq_binary-indicator-graph')
+    ])
+
+
+app.layout = serve_layout
 
 country_colors = {0: '#fed98e',
           1: '#fe9929',
@@ -214,91 +332,22 @@ country_colors = {0: '#fed98e',
 
 def update_graph(country_group, year_range):
     country_group_set = country_group.split(', ')
-    traces = []
-    sg_get_jobs_eq_traces = []
-    sg_get_work_eq_traces = []
-    sg_law_nodc_hr_traces = []
-    sg_sec_enrr_fe_traces = []
-    sg_law_indx_en_traces = []
-    sg_cnt_sign_eq_traces = []
-    # sl_emp_mpyr_fe_zs_traces = []
-    y_scatter_max = []
-
-    for number_of_country, country in enumerate(country_group_set):
-        filtered_df = df[df['Country Name'] == country]
-        first_series_df = filtered_df[filtered_df['Series Code'] == 'NY.GDP.MKTP.CD']
-
-        x_values = first_series_df.loc[:,
-                                 f'{year_range[0]} [YR{year_range[0]}]':f'{year_range[1]} [YR{year_range[1]}]'].columns
-        x_values = [x[0:4] for x in x_values]
-        y_values = first_series_df.loc[:, f'{year_range[0]} [YR{year_range[0]}]':
-                                 f'{year_range[1]} [YR{year_range[1]}]'].values[0]
-        y_values_fixed = []
-        for idx, y_value in enumerate(y_values):
-            if idx == 0 or np.isnan(y_value) == False:
-                existed_value = y_value
-                y_values_fixed.append(existed_value)
-            elif not y_value and y_value != 0:
-                y_values_fixed.append(existed_value)
+    country_dfs = {country: df[df['Country Name'] == country] for country in country_group_set}
 
-        y_scatter_max.append(max(y_values))
-        name_of_graph = country
-        trace = go.Scatter(
-            x=x_values,
-            y=y_values_fixed,
-            mode='lines',
-            name=name_of_graph,
-            yaxis='y1',
-            marker_color=country_colors[number_of_country],
-            showlegend=True
-        )
-        traces.append(trace)
-
-        sg_get_jobs_eq_traces.append(binary_categories_bar_creation(filtered_df, 'SG.GET.JOBS.EQ', year_range, number_of_country, country))
-        sg_get_work_eq_traces.append(binary_categories_bar_creation(filtered_df, 'SG.IND.WORK.EQ', year_range, number_of_country, country))
-        sg_law_nodc_hr_traces.append(binary_categories_bar_creation(filtered_df, 'SG.LAW.NODC.HR', year_range, number_of_country, country))
-        sg_cnt_sign_eq_traces.append(binary_categories_bar_creation(filtered_df, 'SG.CNT.SIGN.EQ', year_range, number_of_country, country))
-        sg_sec_enrr_fe_traces.append(binary_categories_hist_creation(filtered_df, 'SE.TER.ENRR.FE', year_range, number_of_country, country))
-        sg_law_indx_en_traces.append(binary_categories_hist_creation(filtered_df, 'SG.LAW.INDX.EN', year_range, number_of_country, country))
-        # sl_emp_mpyr_fe_zs_traces.append(binary_categories_hist_creation(filtered_df, 'SL.EMP.MPYR.FE.ZS', year_range, number_of_country, country))
-
-    if country_group != 'Cameroon, Egypt, Kenya, Nigeria':
-        shift = int(round(int(max(y_scatter_max)) * 0.25, -12))
-        positive_tickvals = [i for i in range(0, int(max(y_scatter_max)), shift)]
-        max_range = max(y_scatter_max) + 1000000000000
-        min_range = -max(y_scatter_max) * 0.4
-    else:
-        shift = int(round(int(max(y_scatter_max)) * 0.33, -10))
-        positive_tickvals = [i for i in range(0, int(max(y_scatter_max)), shift)]
-        max_range = max(y_scatter_max) + 10000000000
-        min_range = -max(y_scatter_max) * 0.4
+    x_values = df.loc[:, f'{year_range[0]} [YR{year_range[0]}]':f'{year_range[1]} [YR{year_range[1]}]'].columns
+    x_values = [x[0:4] for x in x_values]
 
-    height_main = 450
-    width_main = 900
     width_subplots = 900
     height_subplots = 275
-    return {
-               'data': traces,
-               'layout': go.Layout(
-                   height=height_main,
-                   width=width_main,
-                   title='<b>Prosperity of the economy depends on the participation of women<b>',
-                   xaxis={'title': 'Year'},
-                   yaxis=dict(title='GDP (current US$)',
-                              showgrid=False,
-                              range=[min_range, max_range],
-                              tickvals=positive_tickvals,
-                              ),
-                   hovermode='closest',
-               )
-           }, create_return_for_category(sg_get_jobs_eq_traces, x_values, 'SG.GET.JOBS.EQ', height_subplots, width_subplots),\
-        create_return_for_category(sg_get_work_eq_traces, x_values, 'SG.IND.WORK.EQ', height_subplots, width_subplots),\
-        create_return_for_category(sg_law_nodc_hr_traces, x_values, 'SG.LAW.NODC.HR', height_subplots, width_subplots),\
-        create_return_for_hist_category(sg_sec_enrr_fe_traces, x_values, 'SE.TER.ENRR.FE', height_subplots, width_subplots),\
-        create_return_for_hist_category(sg_law_indx_en_traces, x_values, 'SG.LAW.INDX.EN', height_subplots, width_subplots),\
-        create_return_for_category(sg_cnt_sign_eq_traces, x_values, 'SG.CNT.SIGN.EQ', height_subplots, width_subplots)
-        # create_return_for_hist_category(sl_emp_mpyr_fe_zs_traces, x_values, 'SL.EMP.MPYR.FE.ZS', height_subplots, width_subplots)
+    builders = [('indicator-graph', create_gdp_figure, (country_dfs, country_group, year_range))]
+    for output_id, category_code in category_outputs:
+        create_figure = create_hist_category_figure if category_code in hist_series_codes else create_category_figure
+        builders.append((output_id, create_figure,
+                         (country_dfs, category_code, year_range, x_values, height_subplots, width_subplots)))
+
+    return build_figures(builders)
 
 
 if __name__ == '__main__':
+    dump_metrics_on_exit()
     app.run_server(debug=True)
\ No newline at end of file
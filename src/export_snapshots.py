@@ -0,0 +1,111 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+from dashboards import load_dashboard, run_view
+
+
+presets = {
+    'main': lambda module: [(region, {('region-radio', 'value'): region})
+                            for region in module.regions],
+    'women_rights': lambda module: [(region, {('region-radio', 'value'): region})
+                                    for region in module.regions],
+    'economy': lambda module: [(group, {('country-dropdown', 'value'): group})
+                               for group in module.countries_groups],
+}
+
+html_template = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotlyjs}"></script>
+</head>
+<body>
+{divs}
+<script>
+const figures = {figures};
+for (const [id, figure] of Object.entries(figures)) {{
+    Plotly.newPlot(id, figure);
+}}
+</script>
+</body>
+</html>
+'''
+
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def write_hashed(output_dir, relative_dir, stem, extension, content):
+    content = content.encode() if isinstance(content, str) else content
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    relative_path = os.path.join(relative_dir, f'{stem}.{digest}.{extension}')
+    path = os.path.join(output_dir, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):
+        with open(path, 'wb') as bundle_file:
+            bundle_file.write(content)
+    return relative_path
+
+
+def export_preset(output_dir, dashboard, preset, outputs, plotlyjs_path):
+    figures = {component_id: value for (component_id, prop), value in outputs.items()
+               if prop == 'figure'}
+    bundle = {
+        'dashboard': dashboard,
+        'preset': preset,
+        'outputs': {f'{component_id}.{prop}': value
+                    for (component_id, prop), value in outputs.items()},
+    }
+    stem = slugify(preset)
+    json_path = write_hashed(output_dir, dashboard, stem, 'json', pio.json.to_json_plotly(bundle))
+
+    html = html_template.format(
+        title=f'{dashboard}: {preset}',
+        plotlyjs=os.path.relpath(plotlyjs_path, dashboard),
+        divs='\n'.join(f'<div id="{component_id}"></div>' for component_id in figures),
+        figures=pio.json.to_json_plotly(figures).replace('</', '<\\/'),
+    )
+    html_path = write_hashed(output_dir, dashboard, stem, 'html', html)
+    return {'json': json_path, 'html': html_path}
+
+
+def export_all(output_dir, dashboards):
+    os.makedirs(output_dir, exist_ok=True)
+    plotlyjs_path = write_hashed(output_dir, '', 'plotly', 'min.js', get_plotlyjs())
+
+    manifest = {'plotlyjs': plotlyjs_path, 'dashboards': {}}
+    for dashboard in dashboards:
+        module = load_dashboard(dashboard)
+        entries = manifest['dashboards'][dashboard] = {}
+        for preset, changes in presets[dashboard](module):
+            start = time.perf_counter()
+            outputs = run_view(module.app, changes)
+            entries[preset] = export_preset(output_dir, dashboard, preset, outputs, plotlyjs_path)
+            print(f'{dashboard} / {preset}: {time.perf_counter() - start:.2f}s')
+
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export every preset view of the dashboards as static JSON and HTML bundles.')
+    parser.add_argument('--output-dir', default='../snapshots')
+    parser.add_argument('--dashboards', nargs='+', default=list(presets), choices=list(presets))
+    args = parser.parse_args()
+
+    export_all(args.output_dir, args.dashboards)
+
+
+if __name__ == '__main__':
+    main()
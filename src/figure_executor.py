@@ -0,0 +1,151 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+# 'auto' picks serial or thread execution from the measured build times of
+# earlier calls; the other modes force one strategy. 'auto' never picks
+# 'process': its workers are forked from the running server, and a fork of a
+# threaded server can inherit locks held by other threads and deadlock, so it
+# is only for servers that handle one request at a time.
+MODES = ['serial', 'thread', 'process', 'auto']
+EXECUTOR_MODE = os.environ.get('FIGURE_EXECUTOR_MODE', 'auto')
+MAX_WORKERS = int(os.environ.get('FIGURE_EXECUTOR_WORKERS', min(8, os.cpu_count() or 1)))
+
+# Below this total cost (seconds) the pool overhead is not worth it.
+SERIAL_THRESHOLD = 0.05
+HISTORY_SIZE = 20
+
+build_times = defaultdict(lambda: deque(maxlen=HISTORY_SIZE))
+_lock = threading.Lock()
+_thread_pool = None
+_process_pool = None
+
+
+def check_mode(mode):
+    if mode not in MODES:
+        raise ValueError(f'FIGURE_EXECUTOR_MODE must be one of {", ".join(MODES)}, not {mode!r}')
+
+
+check_mode(EXECUTOR_MODE)
+
+
+def _get_thread_pool():
+    global _thread_pool
+    with _lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS,
+                                              thread_name_prefix='figure-builder')
+        return _thread_pool
+
+
+def _get_process_pool():
+    global _process_pool
+    # Workers are forked so they inherit the data the dashboard already loaded.
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    with _lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=MAX_WORKERS,
+                                                mp_context=multiprocessing.get_context('fork'))
+        return _process_pool
+
+
+def reset_process_pool():
+    # Forked workers keep the data of the moment they were forked, so the pool
+    # is replaced when the dashboard data is swapped.
+    global _process_pool
+    with _lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+def _timed_call(func, args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _mean_cost(label):
+    history = build_times.get(label)
+    if not history:
+        return None
+    return sum(history) / len(history)
+
+
+def choose_mode(labels):
+    # What 'auto' runs the builders of `labels` with.
+    if len(labels) < 2:
+        return 'serial'
+
+    costs = [_mean_cost(label) for label in labels]
+    # Outputs that were never measured are built serially once to get a cost.
+    if any(cost is None for cost in costs):
+        return 'serial'
+    if sum(costs) < SERIAL_THRESHOLD:
+        return 'serial'
+    return 'thread'
+
+
+def build_figures(builders, mode=None):
+    if not builders:
+        return []
+    labels = [label for label, _, _ in builders]
+    mode = mode or EXECUTOR_MODE
+    check_mode(mode)
+    if mode == 'auto':
+        mode = choose_mode(labels)
+
+    pool = None
+    if mode == 'process':
+        pool = _get_process_pool()
+        if pool is None:
+            mode = 'thread'
+    if mode == 'thread':
+        pool = _get_thread_pool()
+
+    start = time.perf_counter()
+    if pool is None:
+        results = [_timed_call(func, args) for _, func, args in builders]
+    else:
+        futures = [pool.submit(_timed_call, func, args) for _, func, args in builders]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    figures = []
+    with _lock:
+        for label, (figure, duration) in zip(labels, results):
+            build_times[label].append(duration)
+            figures.append(figure)
+
+    slowest_label, (_, slowest) = max(zip(labels, results), key=lambda item: item[1][1])
+    logger.debug('Built %d figures in %.3fs (%s), slowest %s %.3fs',
+                 len(figures), elapsed, mode, slowest_label, slowest)
+    return figures
+
+
+def build_report():
+    with _lock:
+        report = {}
+        for label, history in build_times.items():
+            report[label] = {
+                'calls': len(history),
+                'last': history[-1],
+                'mean': sum(history) / len(history),
+                'max': max(history),
+            }
+    return dict(sorted(report.items(), key=lambda item: item[1]['mean'], reverse=True))
+
+
+def print_build_report():
+    for label, stats in build_report().items():
+        print(f"{label}: mean {stats['mean'] * 1000:.1f} ms, "
+              f"last {stats['last'] * 1000:.1f} ms, max {stats['max'] * 1000:.1f} ms "
+              f"over {stats['calls']} builds")
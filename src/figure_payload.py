@@ -0,0 +1,173 @@
+import base64
+import copy
+import logging
+import os
+
+import dash
+import numpy as np
+import plotly.io as pio
+
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_REDUCTION = os.environ.get('FIGURE_PAYLOAD_REDUCTION', '1') == '1'
+# Numeric arrays are sent as JSON lists, rounded to FLOAT_DECIMALS decimal
+# places when FIGURE_FLOAT_DECIMALS is set (which loses small values, such as
+# shares of 0.001), or, with FIGURE_TYPED_ARRAYS=1, as base64 typed arrays,
+# which only plotly.js >= 2.28 (bundled from Dash 2.15) can read.
+TYPED_ARRAYS = os.environ.get('FIGURE_TYPED_ARRAYS', '0') == '1'
+TYPED_ARRAYS_DASH_VERSION = (2, 15)
+FLOAT_DTYPE = os.environ.get('FIGURE_FLOAT_DTYPE', 'f4')
+FLOAT_DECIMALS = int(os.environ['FIGURE_FLOAT_DECIMALS']) if os.environ.get('FIGURE_FLOAT_DECIMALS') else None
+# Keep every n-th animation frame, e.g. 2 for every second year.
+FRAME_STEP = int(os.environ.get('FIGURE_FRAME_STEP', 1))
+
+MIN_TYPED_ARRAY_LENGTH = 2
+
+
+def dash_reads_typed_arrays():
+    return tuple(int(part) for part in dash.__version__.split('.')[:2]) >= TYPED_ARRAYS_DASH_VERSION
+
+
+if TYPED_ARRAYS and not dash_reads_typed_arrays():
+    logger.warning('FIGURE_TYPED_ARRAYS needs Dash %s or newer, not %s; sending lists',
+                   '.'.join(map(str, TYPED_ARRAYS_DASH_VERSION)), dash.__version__)
+    TYPED_ARRAYS = False
+
+
+def _is_numeric_array(value):
+    if isinstance(value, np.ndarray):
+        return value.dtype.kind in 'fiu'
+    if isinstance(value, (list, tuple)) and value:
+        return all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value)
+    return False
+
+
+def encode_array(values, float_dtype=FLOAT_DTYPE, decimals=FLOAT_DECIMALS, typed_arrays=TYPED_ARRAYS):
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        if not typed_arrays:
+            return values if decimals is None else np.round(values, decimals)
+        values = values.astype(float_dtype)
+    elif not typed_arrays:
+        return values
+    elif values.size and np.abs(values).max() < 2 ** 31:
+        values = values.astype('i4')
+    else:
+        values = values.astype('f8')
+    encoded = {'dtype': values.dtype.str[1:],
+               'bdata': base64.b64encode(values.astype(values.dtype.newbyteorder('<')).tobytes()).decode('ascii')}
+    if values.ndim > 1:
+        # Row-major, as tobytes lays them out, in plotly's '3, 4' form.
+        encoded['shape'] = ', '.join(map(str, values.shape))
+    return encoded
+
+
+def encode_arrays(item, **options):
+    encoded = {}
+    for key, value in item.items():
+        if isinstance(value, dict):
+            encoded[key] = encode_arrays(value, **options)
+        elif _is_numeric_array(value) and len(value) >= MIN_TYPED_ARRAY_LENGTH:
+            encoded[key] = encode_array(value, **options)
+        else:
+            encoded[key] = value
+    return encoded
+
+
+def _equal(first, second):
+    if isinstance(first, np.ndarray) or isinstance(second, np.ndarray):
+        first, second = np.asarray(first), np.asarray(second)
+        if first.shape != second.shape:
+            return False
+        if first.dtype.kind == 'f' and second.dtype.kind == 'f':
+            return np.array_equal(first, second, equal_nan=True)
+        return bool((first == second).all())
+    return first == second
+
+
+def _drop_constant(base, items):
+    # Frames are merged onto the current traces and layout when animating, so
+    # a property that has the base value in every frame never needs resending.
+    for key, base_value in base.items():
+        if not all(key in item for item in items):
+            continue
+        values = [item[key] for item in items]
+        if isinstance(base_value, dict) and all(isinstance(value, dict) for value in values):
+            _drop_constant(base_value, values)
+            if all(not value for value in values):
+                for item in items:
+                    del item[key]
+        elif all(_equal(base_value, value) for value in values):
+            for item in items:
+                del item[key]
+
+
+def subsample_frames(fig, frame_step):
+    frames = fig['frames']
+    kept = frames[::frame_step]
+    if frames[-1] is not kept[-1]:
+        kept.append(frames[-1])
+    kept_names = {frame.get('name') for frame in kept}
+    fig['frames'] = kept
+
+    for slider in fig['layout'].get('sliders', []):
+        slider['steps'] = [step for step in slider.get('steps', [])
+                           if step['args'][0][0] in kept_names]
+    return fig
+
+
+def deduplicate_frames(fig):
+    frames = fig['frames']
+    layouts = [frame['layout'] for frame in frames if 'layout' in frame]
+    if layouts and len(layouts) == len(frames):
+        _drop_constant(fig['layout'], layouts)
+        for frame in frames:
+            if not frame['layout']:
+                del frame['layout']
+
+    for index, trace in enumerate(fig['data']):
+        frame_traces = [frame['data'][index] for frame in frames
+                        if index < len(frame.get('data', []))]
+        if len(frame_traces) != len(frames):
+            continue
+        if any(frame_trace.get('name') != trace.get('name') for frame_trace in frame_traces):
+            continue
+        _drop_constant({key: value for key, value in trace.items() if key not in ('type', 'name')},
+                       frame_traces)
+    return fig
+
+
+def payload_size(fig):
+    return len(pio.to_json(fig, validate=False))
+
+
+def reduce_figure(fig, output_id, frame_step=None, float_dtype=None, decimals=None, typed_arrays=None):
+    if not PAYLOAD_REDUCTION:
+        return fig
+
+    options = {
+        'float_dtype': float_dtype or FLOAT_DTYPE,
+        'decimals': FLOAT_DECIMALS if decimals is None else decimals,
+        'typed_arrays': TYPED_ARRAYS if typed_arrays is None else typed_arrays,
+    }
+    frame_step = frame_step or FRAME_STEP
+
+    original_size = payload_size(fig) if logger.isEnabledFor(logging.INFO) else None
+    reduced = fig.to_plotly_json() if hasattr(fig, 'to_plotly_json') else copy.deepcopy(fig)
+
+    if reduced.get('frames'):
+        if frame_step > 1:
+            subsample_frames(reduced, frame_step)
+        deduplicate_frames(reduced)
+        reduced['frames'] = [
+            {**frame, 'data': [encode_arrays(trace, **options) for trace in frame.get('data', [])]}
+            for frame in reduced['frames']
+        ]
+    reduced['data'] = [encode_arrays(trace, **options) for trace in reduced['data']]
+
+    if original_size is not None:
+        reduced_size = payload_size(reduced)
+        logger.info('%s payload: %d bytes, %d bytes before reduction (%.0f%%)',
+                    output_id, reduced_size, original_size, 100 * reduced_size / max(1, original_size))
+    return reduced
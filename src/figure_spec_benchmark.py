@@ -0,0 +1,196 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+import figure_specs
+
+
+country_colors = ['#fed98e', '#fe9929', '#d95f0e', '#993404']
+
+legend = dict(
+    x=0.5,
+    y=-0.5,
+    xanchor='center',
+    yanchor='top',
+    orientation='h',
+    traceorder='normal',
+    font=dict(
+        family='sans-serif',
+        size=12,
+        color='black'
+    ),
+    bordercolor='Black',
+    borderwidth=2
+)
+
+grid_axis = dict(showgrid=True, gridcolor='LightGray', showline=True, linecolor='black')
+
+
+def sample_data(n_countries, first_year=1970, last_year=2021, seed=0):
+    rng = np.random.default_rng(seed)
+    years = pd.Series(np.arange(first_year, last_year + 1))
+    countries = [f'Country {i}' for i in range(n_countries)]
+    values = {country: (pd.Series(rng.uniform(0, 100, len(years))),
+                        pd.Series(rng.uniform(0, 100, len(years))))
+              for country in countries}
+    return countries, years, values
+
+
+# Graph objects versions, as the dashboards built these figures before
+# figure_specs.
+
+def plotly_line_chart(countries, years, values):
+    fig = go.Figure()
+    for i, country in enumerate(countries):
+        fig.add_trace(go.Scatter(x=years, y=values[country][0], mode='lines', name=country,
+                                 line=dict(color=country_colors[i % len(country_colors)])))
+    fig.update_layout(
+        title={'text': 'GDP Change Over Time (current US$)', 'y': 0.9, 'x': 0.5,
+               'xanchor': 'center', 'yanchor': 'top'},
+        xaxis=dict(title='Year', **grid_axis),
+        yaxis=dict(title='GDP (current US$)', **grid_axis),
+        autosize=True,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        legend=legend,
+    )
+    return fig
+
+
+def plotly_bar_chart(countries, years, values):
+    fig = go.Figure()
+    for i, country in enumerate(countries):
+        fig.add_trace(go.Bar(x=years[years % 10 == 5], y=(values[country][0][years % 10 == 5] > 50) + 1,
+                             name=country, marker_color=country_colors[i % len(country_colors)],
+                             width=1, offset=i-1))
+    fig.update_layout(
+        yaxis_tickvals=[1, 2],
+        yaxis_ticktext=['No', 'Yes'],
+        title={'text': 'A woman can get a job in the same way as a man', 'y': 0.9, 'x': 0.5,
+               'xanchor': 'center', 'yanchor': 'top'},
+        xaxis=dict(title='Year', **grid_axis),
+        yaxis=dict(title='', **grid_axis),
+        autosize=True,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        legend=legend,
+    )
+    return fig
+
+
+def plotly_area_chart(countries, years, values):
+    fig = make_subplots(rows=1, cols=4, subplot_titles=countries,
+                        shared_xaxes=True, vertical_spacing=0.1)
+    for i, country in enumerate(countries):
+        y1, y2 = values[country]
+        fig.add_trace(go.Scatter(x=years, y=y1, fill='tozeroy', mode='lines', name='Female',
+                                 line=dict(color='blue'), legendgroup='group1', showlegend=(i == 0)),
+                      row=1, col=i + 1)
+        fig.add_trace(go.Scatter(x=years, y=y2, fill='tonexty', mode='lines', name='Male',
+                                 line=dict(color='red'), legendgroup='group2', showlegend=(i == 0)),
+                      row=1, col=i + 1)
+    fig.update_yaxes(range=[-1, 101])
+    fig.update_layout(
+        height=500,
+        title={'text': 'Mortality Rate (Adult) Over Time', 'y': 0.9, 'x': 0.5,
+               'xanchor': 'center', 'yanchor': 'top'},
+        legend=dict(legend, y=-0.4),
+    )
+    fig.add_annotation(dict(x=-0.04, y=0.5, showarrow=False, text='Mortality Rate',
+                            textangle=-90, xref='paper', yref='paper'))
+    fig.add_annotation(dict(x=0.5, y=-0.3, showarrow=False, text='Year',
+                            xref='paper', yref='paper'))
+    return fig
+
+
+def spec_line_chart(countries, years, values):
+    traces = [figure_specs.line_trace(years, values[country][0], country,
+                                      country_colors[i % len(country_colors)])
+              for i, country in enumerate(countries)]
+    return figure_specs.figure(traces, figure_specs.grid_layout(
+        'GDP Change Over Time (current US$)', 'Year', 'GDP (current US$)'))
+
+
+def spec_bar_chart(countries, years, values):
+    traces = [figure_specs.bar_trace(years[years % 10 == 5], (values[country][0][years % 10 == 5] > 50) + 1,
+                                     country, country_colors[i % len(country_colors)],
+                                     offset=i-1, width=1)
+              for i, country in enumerate(countries)]
+    layout = figure_specs.grid_layout('A woman can get a job in the same way as a man', 'Year', '')
+    layout['yaxis'].update(tickvals=[1, 2], ticktext=['No', 'Yes'])
+    return figure_specs.figure(traces, layout)
+
+
+def spec_area_chart(countries, years, values):
+    traces = []
+    for i, country in enumerate(countries):
+        y1, y2 = values[country]
+        subplot_axes = figure_specs.subplot_axes(i + 1)
+        traces.append(figure_specs.line_trace(years, y1, 'Female', 'blue', fill='tozeroy',
+                                              legendgroup='group1', showlegend=(i == 0), **subplot_axes))
+        traces.append(figure_specs.line_trace(years, y2, 'Male', 'red', fill='tonexty',
+                                              legendgroup='group2', showlegend=(i == 0), **subplot_axes))
+    layout = figure_specs.subplot_row(4, countries, range=[-1, 101])
+    layout.update(height=500, title=figure_specs.title('Mortality Rate (Adult) Over Time'),
+                  legend=figure_specs.legend(-0.4))
+    layout['annotations'] += [
+        figure_specs.paper_annotation('Mortality Rate', -0.04, 0.5, textangle=-90),
+        figure_specs.paper_annotation('Year', 0.5, -0.3),
+    ]
+    return figure_specs.figure(traces, layout)
+
+
+benchmarks = {
+    'line chart (gdp_chart, enrolment_line_chart)': (plotly_line_chart, spec_line_chart),
+    'binary bar chart (update_bar_charts)': (plotly_bar_chart, spec_bar_chart),
+    'area chart (create_feature_area_graph)': (plotly_area_chart, spec_area_chart),
+}
+
+
+def time_builder(builder, args, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        builder(*args)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def run(n_countries=4, repeat=50):
+    args = sample_data(n_countries)
+    results = {}
+    for name, (plotly_builder, spec_builder) in benchmarks.items():
+        identical = (json.loads(pio.to_json(plotly_builder(*args))) ==
+                     json.loads(pio.to_json(spec_builder(*args))))
+        before = time_builder(plotly_builder, args, repeat)
+        after = time_builder(spec_builder, args, repeat)
+        results[name] = {'before_ms': before * 1000, 'after_ms': after * 1000,
+                         'speedup': before / after, 'identical': identical}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare figure build time of graph objects and figure_specs.')
+    parser.add_argument('--countries', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    results = run(args.countries, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, result in results.items():
+        print(f"{name}: {result['before_ms']:.2f} ms -> {result['after_ms']:.2f} ms "
+              f"({result['speedup']:.1f}x), identical output: {result['identical']}")
+
+
+if __name__ == '__main__':
+    main()
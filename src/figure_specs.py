@@ -0,0 +1,109 @@
+from functools import lru_cache
+
+import numpy as np
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+
+# Figures here are plain dicts in the form go.Figure(...).to_plotly_json()
+# returns, built without plotly's per-property validation. Dash serializes
+# them the same way. The layout pieces below are shared between figures and
+# must not be modified in place.
+
+TITLE = {'y': 0.9, 'x': 0.5, 'xanchor': 'center', 'yanchor': 'top'}
+
+GRID_AXIS = {'showgrid': True, 'gridcolor': 'LightGray',
+             'showline': True, 'linecolor': 'black'}
+
+LEGEND_FONT = {'family': 'sans-serif', 'size': 12, 'color': 'black'}
+
+BOTTOM_LEGEND = {'x': 0.5, 'xanchor': 'center', 'yanchor': 'top',
+                 'orientation': 'h', 'traceorder': 'normal',
+                 'font': LEGEND_FONT, 'bordercolor': 'Black', 'borderwidth': 2}
+
+TRANSPARENT_BACKGROUND = {'autosize': True,
+                          'plot_bgcolor': 'rgba(0,0,0,0)',
+                          'paper_bgcolor': 'rgba(0,0,0,0)'}
+
+SUBPLOT_TITLE = {'font': {'size': 16}, 'showarrow': False, 'xanchor': 'center',
+                 'xref': 'paper', 'y': 1.0, 'yanchor': 'bottom', 'yref': 'paper'}
+
+
+@lru_cache(maxsize=None)
+def _template(name):
+    return pio.templates[name].to_plotly_json()
+
+
+def default_template():
+    return _template(pio.templates.default)
+
+
+def as_array(values):
+    if isinstance(values, (list, tuple)):
+        return values
+    return np.asarray(values)
+
+
+def figure(data, layout):
+    return {'data': data, 'layout': {'template': default_template(), **layout}}
+
+
+def title(text, **overrides):
+    return {'text': text, **TITLE, **overrides}
+
+
+def axis(axis_title, **props):
+    return {'title': {'text': axis_title}, **GRID_AXIS, **props}
+
+
+def legend(y, **props):
+    return {'y': y, **BOTTOM_LEGEND, **props}
+
+
+def paper_annotation(text, x, y, **props):
+    return {'showarrow': False, 'text': text, 'x': x, 'xref': 'paper',
+            'y': y, 'yref': 'paper', **props}
+
+
+def line_trace(x, y, name, color, **props):
+    return {'line': {'color': color}, 'mode': 'lines', 'name': name,
+            'x': as_array(x), 'y': as_array(y), 'type': 'scatter', **props}
+
+
+def bar_trace(x, y, name, color, **props):
+    return {'marker': {'color': color}, 'name': name,
+            'x': as_array(x), 'y': as_array(y), 'type': 'bar', **props}
+
+
+def grid_layout(figure_title, xaxis_title, yaxis_title, legend_y=-0.5):
+    return {'title': title(figure_title),
+            'xaxis': axis(xaxis_title),
+            'yaxis': axis(yaxis_title),
+            **TRANSPARENT_BACKGROUND,
+            'legend': legend(legend_y)}
+
+
+@lru_cache(maxsize=None)
+def _subplot_row_domains(n_cols):
+    layout = make_subplots(rows=1, cols=n_cols).to_plotly_json()['layout']
+    return tuple(tuple(layout[f'xaxis{i}' if i > 1 else 'xaxis']['domain'])
+                 for i in range(1, n_cols + 1))
+
+
+def subplot_row(n_cols, subplot_titles, **yaxis_props):
+    domains = _subplot_row_domains(n_cols)
+    layout = {}
+    for i, domain in enumerate(domains, start=1):
+        suffix = str(i) if i > 1 else ''
+        layout[f'xaxis{suffix}'] = {'anchor': f'y{suffix}', 'domain': list(domain)}
+        layout[f'yaxis{suffix}'] = {'anchor': f'x{suffix}', 'domain': [0.0, 1.0], **yaxis_props}
+    layout['annotations'] = [
+        {**SUBPLOT_TITLE, 'text': subplot_title, 'x': (domain[0] + domain[1]) / 2}
+        for subplot_title, domain in zip(subplot_titles, domains)
+    ]
+    return layout
+
+
+def subplot_axes(col):
+    suffix = str(col) if col > 1 else ''
+    return {'xaxis': f'x{suffix}', 'yaxis': f'y{suffix}'}
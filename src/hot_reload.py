@@ -0,0 +1,188 @@
+import logging
+import os
+import sys
+import threading
+import time
+
+from flask import g, jsonify, request
+
+import data_cache
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the registered data files; 0 leaves reloading to
+# POST /admin/reload.
+WATCH_INTERVAL = float(os.environ.get('DATA_RELOAD_INTERVAL', 0))
+# Required in the X-Reload-Token header of /admin/reload when set; without it
+# only local requests may reload.
+RELOAD_TOKEN = os.environ.get('DATA_RELOAD_TOKEN')
+LOCAL_ADDRESSES = {'127.0.0.1', '::1'}
+
+
+class SnapshotLock:
+    # Requests hold it shared for their whole duration and a swap holds it
+    # exclusively, so a request sees the data of one version from start to
+    # end. A waiting swap keeps new requests out until it is done.
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._condition:
+            while self._writing or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+
+    def release_write(self):
+        with self._condition:
+            self._writing = False
+            self._condition.notify_all()
+
+
+snapshot_lock = SnapshotLock()
+datasets = {}
+swap_listeners = []
+status = {'state': 'idle', 'error': None, 'last_reload': None, 'seconds': None}
+_reload_lock = threading.Lock()
+_watcher = None
+
+
+def file_state(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def register(module_name, path, load, names):
+    # `load(path)` returns the values of the module attributes in `names`,
+    # which a reload replaces together.
+    path = os.path.abspath(path)
+    datasets[module_name] = {'module': sys.modules[module_name], 'path': path, 'load': load, 'names': names,
+                             'version': data_cache.source_digest(path), 'file_state': file_state(path)}
+    start_watcher()
+
+
+def on_swap(listener):
+    swap_listeners.append(listener)
+
+
+def version():
+    return ','.join(dataset['version'][:16] for dataset in list(datasets.values()))
+
+
+def reload(force=False):
+    # Builds the new data outside the lock; only the assignment of the module
+    # attributes waits for the requests in flight.
+    with _reload_lock:
+        status.update(state='loading', error=None)
+        start = time.perf_counter()
+        try:
+            updates = []
+            for dataset in datasets.values():
+                digest = data_cache.source_digest(dataset['path'])
+                if digest != dataset['version'] or force:
+                    updates.append((dataset, digest, file_state(dataset['path']), dataset['load'](dataset['path'])))
+                else:
+                    dataset['file_state'] = file_state(dataset['path'])
+        except Exception as error:
+            logger.exception('Reloading the dashboard data failed')
+            status.update(state='failed', error=repr(error))
+            return status
+
+        if updates:
+            status['state'] = 'swapping'
+            snapshot_lock.acquire_write()
+            try:
+                for dataset, digest, state, values in updates:
+                    for name, value in zip(dataset['names'], values):
+                        setattr(dataset['module'], name, value)
+                    dataset['version'], dataset['file_state'] = digest, state
+                for listener in swap_listeners:
+                    listener()
+            finally:
+                snapshot_lock.release_write()
+            logger.info('Swapped in data version %s', version())
+        status.update(state='idle', last_reload=time.time(), seconds=time.perf_counter() - start)
+        return status
+
+
+def reload_in_background(force=False):
+    if _reload_lock.locked():
+        return False
+    threading.Thread(target=reload, args=(force,), name='data-reload', daemon=True).start()
+    return True
+
+
+def changed_files():
+    changed = {}
+    for dataset in datasets.values():
+        try:
+            state = file_state(dataset['path'])
+        except FileNotFoundError:
+            continue
+        if state != dataset['file_state']:
+            changed[dataset['path']] = state
+    return changed
+
+
+def watch(interval):
+    pending = None
+    while True:
+        time.sleep(interval)
+        changed = changed_files()
+        # A file that is still being written is reloaded once it stops changing.
+        if changed and changed == pending:
+            reload()
+            pending = None
+        else:
+            pending = changed or None
+
+
+def start_watcher():
+    global _watcher
+    if WATCH_INTERVAL > 0 and _watcher is None:
+        _watcher = threading.Thread(target=watch, args=(WATCH_INTERVAL,), name='data-watcher', daemon=True)
+        _watcher.start()
+
+
+def begin_request():
+    snapshot_lock.acquire_read()
+    g.data_snapshot = True
+
+
+def end_request(error):
+    if g.pop('data_snapshot', None):
+        snapshot_lock.release_read()
+
+
+def add_version_header(response):
+    if datasets:
+        response.headers['X-Data-Version'] = version()
+    return response
+
+
+def reload_view():
+    if request.method == 'POST':
+        allowed = request.headers.get('X-Reload-Token') == RELOAD_TOKEN if RELOAD_TOKEN \
+            else request.remote_addr in LOCAL_ADDRESSES
+        if not allowed:
+            return jsonify({'error': 'forbidden'}), 403
+        started = reload_in_background(force=request.args.get('force') == '1')
+        return jsonify(dict(status, version=version(), started=started)), 202
+    return jsonify(dict(status, version=version(), changed_files=sorted(changed_files())))
@@ -0,0 +1,318 @@
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from dashboards import REPO_DIR, dashboard_modules, load_dashboard
+import dash_server
+
+
+CALLBACK_PATH = '/_dash-update-component'
+
+# Components a user picks a new value in, and the name of that interaction.
+pick_components = {
+    'region-radio': 'region click',
+    'category-dropdown': 'category pick',
+    'year-radio': 'year pick',
+}
+
+SLIDER_DRAG_STEPS = 4
+
+
+async def http_request(host, port, method, path, payload=None, timeout=60):
+    body = json.dumps(payload).encode() if payload is not None else b''
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(f'{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+                     f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+                     f'Accept-Encoding: gzip\r\nConnection: close\r\n\r\n'.encode() + body)
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+
+    head, _, content = data.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ')[1])
+    headers = {name.strip().lower(): value.strip()
+               for name, _, value in (line.partition(':') for line in lines[1:])}
+    if headers.get('transfer-encoding') == 'chunked':
+        content = dechunk(content)
+    if headers.get('content-encoding') == 'gzip':
+        content = gzip.decompress(content)
+    return status, content
+
+
+def dechunk(content):
+    chunks = []
+    while content:
+        size_line, _, content = content.partition(b'\r\n')
+        size = int(size_line.split(b';')[0], 16)
+        if size == 0:
+            break
+        chunks.append(content[:size])
+        content = content[size + 2:]
+    return b''.join(chunks)
+
+
+def split_output(output):
+    if output.startswith('..'):
+        return [tuple(part.rsplit('.', 1)) for part in output[2:-2].split('...')], True
+    return [tuple(output.rsplit('.', 1))], False
+
+
+def layout_state(node, state):
+    if isinstance(node, list):
+        for child in node:
+            layout_state(child, state)
+    elif isinstance(node, dict) and 'props' in node:
+        props = node['props']
+        if 'id' in props:
+            for prop, value in props.items():
+                if prop != 'children' or not isinstance(value, (dict, list)):
+                    state[(props['id'], prop)] = value
+        layout_state(props.get('children'), state)
+    return state
+
+
+def option_values(options):
+    if isinstance(options, dict):
+        return list(options)
+    return [option['value'] if isinstance(option, dict) else option for option in options or []]
+
+
+def interactions(state, rng):
+    steps = []
+    for component_id, name in pick_components.items():
+        values = option_values(state.get((component_id, 'options')))
+        if values:
+            steps.append((name, [{(component_id, 'value'): rng.choice(values)}]))
+
+    values = option_values(state.get(('country-dropdown', 'options')))
+    selected = state.get(('country-dropdown', 'value'))
+    if values and isinstance(selected, list):
+        candidates = [value for value in values if value not in selected]
+        if candidates:
+            steps.append(('country add', [{('country-dropdown', 'value'): selected + [rng.choice(candidates)]}]))
+    elif values:
+        steps.append(('country add', [{('country-dropdown', 'value'): rng.choice(values)}]))
+
+    low, high = state.get(('year-slider', 'min')), state.get(('year-slider', 'max'))
+    current = state.get(('year-slider', 'value'))
+    if low is not None and high is not None and isinstance(current, list):
+        # Either handle, towards its end of the slider or the other handle.
+        handle = rng.randrange(2)
+        bounds = (low, current[1] - 1) if handle == 0 else (current[0] + 1, high)
+        if bounds[0] <= bounds[1]:
+            target = rng.randint(*bounds)
+            stops = [round(current[handle] + (target - current[handle]) * step / SLIDER_DRAG_STEPS)
+                     for step in range(1, SLIDER_DRAG_STEPS + 1)]
+            steps.append(('slider drag', [{('year-slider', 'value'): [stop, current[1]] if handle == 0
+                                           else [current[0], stop]} for stop in stops]))
+    return steps
+
+
+class Session:
+    def __init__(self, host, port, callbacks, layout, stats, timeout):
+        self.host = host
+        self.port = port
+        self.callbacks = callbacks
+        self.state = dict(layout)
+        self.stats = stats
+        self.timeout = timeout
+
+    async def call(self, callback, changed):
+        outputs, multi = split_output(callback['output'])
+        payload = {
+            'output': callback['output'],
+            'outputs': [{'id': i, 'property': p} for i, p in outputs] if multi
+            else {'id': outputs[0][0], 'property': outputs[0][1]},
+            'inputs': [dict(item, value=self.state.get((item['id'], item['property'])))
+                       for item in callback['inputs']],
+            'state': [dict(item, value=self.state.get((item['id'], item['property'])))
+                      for item in callback['state']],
+            'changedPropIds': [f'{i}.{p}' for i, p in changed],
+        }
+        start = time.perf_counter()
+        try:
+            status, content = await http_request(self.host, self.port, 'POST', CALLBACK_PATH,
+                                                 payload, self.timeout)
+        except (OSError, asyncio.TimeoutError) as error:
+            self.stats.record(callback['output'], time.perf_counter() - start, repr(error))
+            return {}
+        self.stats.record(callback['output'], time.perf_counter() - start,
+                          None if status in (200, 204) else f'HTTP {status}')
+        if status != 200:
+            return {}
+        response = json.loads(content).get('response', {})
+        return {(component_id, prop): value
+                for component_id, props in response.items() for prop, value in props.items()}
+
+    async def fire(self, changed, depth=0):
+        triggered = [callback for callback in self.callbacks
+                     if changed is None or any((item['id'], item['property']) in changed
+                                               for item in callback['inputs'])]
+        results = await asyncio.gather(*(self.call(callback, changed or []) for callback in triggered))
+        updated = {}
+        for result in results:
+            updated.update(result)
+        self.state.update(updated)
+        # Outputs that feed other callbacks fire those next, as in the browser.
+        if updated and depth < 5:
+            await self.fire(set(updated), depth + 1)
+
+    async def step(self, name, changes):
+        start = time.perf_counter()
+        for change in changes:
+            self.state.update(change)
+            await self.fire(set(change))
+        self.stats.record_step(name, time.perf_counter() - start)
+
+    async def run(self, deadline, rng):
+        start = time.perf_counter()
+        await self.fire(None)
+        self.stats.record_step('page load', time.perf_counter() - start)
+        while time.perf_counter() < deadline:
+            steps = interactions(self.state, rng)
+            if not steps:
+                break
+            await self.step(*rng.choice(steps))
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.steps = defaultdict(list)
+
+    def record(self, callback, duration, error):
+        self.latencies[callback].append(duration)
+        if error:
+            self.errors[callback] += 1
+
+    def record_step(self, name, duration):
+        self.steps[name].append(duration)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(durations, elapsed, errors=0):
+    return {'count': len(durations), 'errors': errors,
+            'p50': percentile(durations, 0.50), 'p95': percentile(durations, 0.95),
+            'p99': percentile(durations, 0.99), 'per_second': len(durations) / elapsed}
+
+
+async def load_test(url, users, duration, seed, timeout):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    _, content = await http_request(host, port, 'GET', '/_dash-dependencies', timeout=timeout)
+    callbacks = [callback for callback in json.loads(content) if not callback.get('clientside_function')]
+    _, content = await http_request(host, port, 'GET', '/_dash-layout', timeout=timeout)
+    layout = layout_state(json.loads(content), {})
+
+    stats = Stats()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(Session(host, port, callbacks, layout, stats, timeout)
+                           .run(deadline, random.Random(seed + user)) for user in range(users)))
+    elapsed = time.perf_counter() - start
+
+    total = [duration for durations in stats.latencies.values() for duration in durations]
+    return {
+        'users': users,
+        'elapsed': elapsed,
+        'total': summarize(total, elapsed, sum(stats.errors.values())) if total else {},
+        'callbacks': {callback: summarize(durations, elapsed, stats.errors[callback])
+                      for callback, durations in stats.latencies.items()},
+        'interactions': {name: summarize(durations, elapsed) for name, durations in stats.steps.items()},
+    }
+
+
+def print_results(results):
+    def row(name, entry):
+        print(f'{name[:60]:<60} {entry["count"]:>6} {entry["errors"]:>6} {entry["p50"] * 1000:>8.0f} '
+              f'{entry["p95"] * 1000:>8.0f} {entry["p99"] * 1000:>8.0f} {entry["per_second"]:>8.2f}')
+
+    header = f'{"":<60} {"count":>6} {"errors":>6} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"per s":>8}'
+    print(f'{results["users"]} users for {results["elapsed"]:.1f}s')
+    print(header)
+    for callback, entry in sorted(results['callbacks'].items()):
+        row(callback.strip('.').replace('...', ', '), entry)
+    if results['total']:
+        row('all callbacks', results['total'])
+    print()
+    print(header)
+    for name, entry in results['interactions'].items():
+        row(name, entry)
+
+
+def wait_until_ready(url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url + '/_dash-dependencies', timeout=5):
+                return
+        except OSError:
+            time.sleep(1)
+    raise RuntimeError(f'{url} did not start within {timeout}s')
+
+
+def serve(dashboard, root, port):
+    module = load_dashboard(dashboard, root)
+    dash_server.dump_metrics_on_exit()
+    module.app.run(host='127.0.0.1', port=port, debug=False, threaded=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Replay user interactions against a dashboard and report callback latencies.')
+    parser.add_argument('--dashboard', default='main', choices=list(dashboard_modules))
+    parser.add_argument('--root', default=REPO_DIR,
+                        help='directory with the data/ the dashboard reads')
+    parser.add_argument('--url', help='test an already running server instead of starting one')
+    parser.add_argument('--port', type=int, default=8060)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.dashboard, args.root, args.port)
+        return
+
+    url = args.url
+    server = None
+    if url is None:
+        url = f'http://127.0.0.1:{args.port}'
+        server = subprocess.Popen([sys.executable, __file__, '--serve', '--dashboard', args.dashboard,
+                                   '--root', args.root, '--port', str(args.port)],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(url, args.timeout)
+        results = asyncio.run(load_test(url, args.users, args.duration, args.seed, args.timeout))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,39 +2,53 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objs as go
-from dash import Dash, dcc, html
+from dash import dcc, html
 from dash.dependencies import Input, Output, State
 from sklearn.preprocessing import StandardScaler
 from plotly.subplots import make_subplots
 from math import ceil
 from scipy import stats
-
-
-df = pd.read_csv('../data/cleaned_data.csv')
-
-df_series = df[['Series Name', 'Country Name'] +
-               [col for col in df if col.startswith('19') or col.startswith('20')]]
-
-df_series = df_series.melt(
-    id_vars=['Series Name', 'Country Name'], var_name='Year', value_name='Value')
-
-df_series['Year'] = df_series['Year'].str.extract('(\d+)').astype(int)
-
-df_series = df_series.pivot_table(
-    index=['Country Name', 'Year'], columns='Series Name', values='Value').reset_index()
-
-df_series.columns.name = ''
-df_series.rename(columns={'Country Name': 'Country'}, inplace=True)
-
-
-regions = {
+from figure_executor import build_figures
+import figure_specs
+import figure_payload
+import profiling
+import series_cube
+import derived_series
+import region_aggregates
+import similarity
+import panel_store
+import hot_reload
+from dash_server import create_app, dump_metrics_on_exit
+
+
+DATA_PATH = '../data/cleaned_data.csv'
+
+regions = region_aggregates.with_user_regions({
     'Europe': ['United Kingdom', 'France', 'Germany', 'Italy'],
     'Middle East': ['Saudi Arabia', 'Iran, Islamic Rep.', 'Israel', 'Turkiye'],
     'Asia': ['China', 'Japan', 'India', 'Vietnam'],
     'Africa': ['Egypt, Arab Rep.', 'South Africa', 'Nigeria', 'Kenya'],
     'South America': ['Brazil', 'Argentina', 'Venezuela, RB', 'Peru'],
     'North and middle America': ['United States', 'Canada', 'Mexico']
-}
+})
+country_regions = region_aggregates.country_regions(regions)
+
+
+def load_data(path):
+    with profiling.profiled('main.prepare_data', {'file_path': path}, sampled=False):
+        df_series = panel_store.cube(path, country_codes=False, regions=regions)
+    years = series_cube.years(df_series)
+    similar = similarity.build(panel_store.read_csv(path, columns=['Country Name', 'Series Code'],
+                                                    series_codes=similarity.FEATURES))
+    return (df_series, df_series.copy(), series_cube.countries(df_series), years[0], years[-1],
+            derived_series.gap_labels(series_cube.columns(df_series)), similar)
+
+
+df_series, df_series_original, all_countries, first_year, last_year, gender_gaps, similar = load_data(DATA_PATH)
+hot_reload.register(__name__, DATA_PATH, load_data,
+                    ['df_series', 'df_series_original', 'all_countries', 'first_year', 'last_year', 'gender_gaps',
+                     'similar'])
+
 
 country_colors = {
     0: '#fed98e',
@@ -43,139 +57,135 @@ country_colors = {
     3: '#993404'
 }
 
-all_countries = df_series['Country'].unique().tolist()
 
-df_series_original = df_series.copy()
+def filter_df(df, selected_countries, years_range):
+    df = series_cube.country_rows(df, selected_countries)
+    return df[df['Year'].between(years_range[0], years_range[1])]
 
 
-def update_layout(fig, title, xaxis_title, yaxis_title):
-    fig.update_layout(
-        title={
-            'text': title,
-            'y': 0.9,
-            'x': 0.5,
-            'xanchor': 'center',
-            'yanchor': 'top'},
-        xaxis=dict(
-            title=xaxis_title,
-            showgrid=True,
-            gridcolor='LightGray',
-            showline=True,
-            linecolor='black',
+app = create_app(__name__)
+
+
+def serve_layout():
+    return html.Div([
+        dcc.Dropdown(
+            id='country-dropdown',
+            options=[{'label': country, 'value': country}
+                     for country in all_countries],
+            multi=True,
+            value=[]
         ),
-        yaxis=dict(
-            title=yaxis_title,
-            showgrid=True,
-            gridcolor='LightGray',
-            showline=True,
-            linecolor='black',
+        dcc.RadioItems(
+            id='region-radio',
+            options=[{'label': region, 'value': region}
+                     for region in regions.keys()],
+            value=None
         ),
-        autosize=True,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-
-        legend=dict(
-            x=0.5,
-            y=-0.5,
-            xanchor='center',
-            yanchor='top',
-            orientation='h',
-            traceorder='normal',
-            font=dict(
-                family='sans-serif',
-                size=12,
-                color='black'
+        html.Div([
+            dcc.Dropdown(
+                id='similar-country',
+                options=[{'label': country, 'value': country} for country in similar['countries']],
+                placeholder='Countries most similar to...',
+                value=None,
+                style={'width': '300px'}
             ),
-            bordercolor='Black',
-            borderwidth=2
+            dcc.Input(id='similar-count', type='number', min=1, max=20, step=1, value=5),
+            html.Div(
+                dcc.RangeSlider(
+                    id='similar-years',
+                    min=first_year,
+                    max=last_year,
+                    step=1,
+                    value=[max(first_year, last_year - 10), last_year],
+                    marks={i: str(i) for i in range(first_year, last_year + 1, 5)}
+                ), style={'flex': '1'}),
+        ], style={'display': 'flex'}),
+        dcc.Graph(id='population-animated-chart'),
+        html.Div(style={'height': '50px'}),
+        html.Div([
+            dcc.Graph(id='line-chart-total', style={'width': '33%'}),
+            dcc.Graph(id='line-chart-female', style={'width': '33%'}),
+            dcc.Graph(id='line-chart-male', style={'width': '33%'}),], style={'display': 'flex'}),
+        html.Div(style={'height': '50px'}),
+        dcc.Graph(id='employment-ratio-chart'),
+        html.Div(style={'height': '50px'}),
+        dcc.RangeSlider(
+            id='year-slider',
+            min=first_year,
+            max=last_year,
+            step=1,
+            value=[first_year, last_year],
+            marks={i: str(i) for i in range(first_year, last_year + 1, 2)}
         ),
-    )
-    return fig
-
+        html.Div(style={'height': '50px'}),
+        dcc.Graph(id='gdp-line-chart'),
+        html.Div(style={'height': '50px'}),
+        html.Div([
+            dcc.Graph(id='chart-women-job', style={'width': '33%'}),
+            dcc.Graph(id='chart-women-industrial-job', style={'width': '33%'}),
+            dcc.Graph(id='chart-women-contract', style={'width': '33%'}),
+        ], style={'display': 'flex'}),
+        html.Div(style={'height': '50px'}),
+        dcc.Graph(id='enrolment-line-chart'),
+        html.Div(style={'height': '50px'}),
+        html.Div([
+            html.Div([dcc.Graph(id='heatmap-lawscore')], style={'width': '25%'}),
+            html.Div([dcc.Graph(id='heatmap-entrepreneurship')],
+                     style={'width': '25%'}),
+            html.Div([dcc.Graph(id='heatmap-mobility')], style={'width': '25%'}),
+            html.Div([dcc.Graph(id='heatmap-pay')], style={'width': '25%'}),
+        ], style={'display': 'flex'}),
+        html.Div(style={'height': '50px'}),
+        dcc.Graph(id='life-expextancy-scatter-chart'),
+        dcc.Graph(id='animated-birth-death-chart'),
+        dcc.Graph(id='fertility-line-chart'),
+        dcc.Graph(id='mortality-rate-adult-area-chart'),
+        dcc.Graph(id='mortality-rate-infant-area-chart'),
+        dcc.Graph(id='immunization-heatmap'),
+        dcc.Graph(id='survival-rates-seniors-chart'),
+        html.Div(style={'height': '50px'}),
+        dcc.Dropdown(
+            id='gender-gap-dropdown',
+            options=[{'label': label, 'value': label} for label in gender_gaps],
+            value=gender_gaps[0] if gender_gaps else None
+        ),
+        dcc.RadioItems(
+            id='gender-gap-measure',
+            options=[{'label': 'Female - male', 'value': 'gap'},
+                     {'label': 'Female / male', 'value': 'ratio'}],
+            value='gap'
+        ),
+        dcc.Graph(id='gender-gap-chart'),
 
-def filter_df(df, selected_countries, years_range):
-    return df[(df['Country'].isin(selected_countries)) &
-              (df['Year'].between(years_range[0], years_range[1]))]
+    ])
 
 
-def add_trace(fig, x, y, mode, name, line_color):
-    fig.add_trace(go.Scatter(x=x,
-                             y=y,
-                             mode=mode,
-                             name=name,
-                             line=dict(color=line_color)))
-    return fig
+app.layout = serve_layout
 
 
-app = Dash(__name__)
-
-app.layout = html.Div([
-    dcc.Dropdown(
-        id='country-dropdown',
-        options=[{'label': country, 'value': country}
-                 for country in all_countries],
-        multi=True,
-        value=[]
-    ),
-    dcc.RadioItems(
-        id='region-radio',
-        options=[{'label': region, 'value': region}
-                 for region in regions.keys()],
-        value=None
-    ),
-    dcc.Graph(id='population-animated-chart'),
-    html.Div(style={'height': '50px'}),
-    html.Div([
-        dcc.Graph(id='line-chart-total', style={'width': '33%'}),
-        dcc.Graph(id='line-chart-female', style={'width': '33%'}),
-        dcc.Graph(id='line-chart-male', style={'width': '33%'}),], style={'display': 'flex'}),
-    html.Div(style={'height': '50px'}),
-    dcc.Graph(id='employment-ratio-chart'),
-    html.Div(style={'height': '50px'}),
-    dcc.RangeSlider(
-        id='year-slider',
-        min=1970,
-        max=2021,
-        step=1,
-        value=[1970, 2021],
-        marks={i: str(i) for i in range(1960, 2023, 2)}
-    ),
-    html.Div(style={'height': '50px'}),
-    dcc.Graph(id='gdp-line-chart'),
-    html.Div(style={'height': '50px'}),
-    html.Div([
-        dcc.Graph(id='chart-women-job', style={'width': '33%'}),
-        dcc.Graph(id='chart-women-industrial-job', style={'width': '33%'}),
-        dcc.Graph(id='chart-women-contract', style={'width': '33%'}),
-    ], style={'display': 'flex'}),
-    html.Div(style={'height': '50px'}),
-    dcc.Graph(id='enrolment-line-chart'),
-    html.Div(style={'height': '50px'}),
-    html.Div([
-        html.Div([dcc.Graph(id='heatmap-lawscore')], style={'width': '25%'}),
-        html.Div([dcc.Graph(id='heatmap-entrepreneurship')],
-                 style={'width': '25%'}),
-        html.Div([dcc.Graph(id='heatmap-mobility')], style={'width': '25%'}),
-        html.Div([dcc.Graph(id='heatmap-pay')], style={'width': '25%'}),
-    ], style={'display': 'flex'}),
-    html.Div(style={'height': '50px'}),
-    dcc.Graph(id='life-expextancy-scatter-chart'),
-    dcc.Graph(id='animated-birth-death-chart'),
-    dcc.Graph(id='fertility-line-chart'),
-    dcc.Graph(id='mortality-rate-adult-area-chart'),
-    dcc.Graph(id='mortality-rate-infant-area-chart'),
-    dcc.Graph(id='immunization-heatmap'),
-    dcc.Graph(id='survival-rates-seniors-chart'),
-
-])
+@app.callback(
+    Output('similar-country', 'value'),
+    [Input('region-radio', 'value')]
+)
+def clear_similar_country(selected_region):
+    # Picking a region replaces the countries similar to one.
+    return None
 
 
 @app.callback(
     Output('country-dropdown', 'value'),
-    [Input('region-radio', 'value')],
+    [Input('region-radio', 'value'),
+     Input('similar-country', 'value'),
+     Input('similar-years', 'value'),
+     Input('similar-count', 'value')],
     [State('country-dropdown', 'options')]
 )
-def update_dropdown_values(selected_region, available_options):
+def update_dropdown_values(selected_region, similar_country, similar_years, similar_count, available_options):
+    if similar_country is not None:
+        similar_countries = [similar_country] + [country for country, _ in similarity.nearest(
+            similar, similar_country, similar_years[0], similar_years[1], similar_count or 5)]
+        available = {country['value'] for country in available_options}
+        return [country for country in similar_countries if country in available]
     if selected_region is None:
         return []
     else:
@@ -197,8 +207,7 @@ def population_chart(selected_countries):
             'Population, female',
             'Population, male'
         ]
-        filtered_df_series = df_series_original[df_series_original['Country'].isin(
-            selected_countries)]
+        filtered_df_series = series_cube.country_rows(df_series_original, selected_countries)
         melted_df_series = pd.melt(filtered_df_series, id_vars=[
                                    'Country', 'Year'], value_vars=group_features, var_name='Feature', value_name='Value')
         fig = px.bar(melted_df_series,
@@ -228,7 +237,7 @@ def population_chart(selected_countries):
                            showlegend=False)
             )
 
-        return fig
+        return figure_payload.reduce_figure(fig, 'population-animated-chart')
 
 
 def get_standardized_population_chart(selected_countries, population_type):
@@ -236,8 +245,7 @@ def get_standardized_population_chart(selected_countries, population_type):
         return go.Figure()
     else:
         column_name = f'Population, {population_type}'
-        filtered_df = df_series_original[df_series_original['Country'].isin(
-            selected_countries)][['Year', 'Country', column_name]]
+        filtered_df = series_cube.country_rows(df_series_original, selected_countries)[['Year', 'Country', column_name]]
 
         scaler = StandardScaler()
         for country in selected_countries:
@@ -278,13 +286,11 @@ def get_standardized_population_chart(selected_countries, population_type):
     [Input('country-dropdown', 'value')]
 )
 def update_population_line_chart(selected_countries):
-    total_chart = get_standardized_population_chart(
-        selected_countries, 'total')
-    female_chart = get_standardized_population_chart(
-        selected_countries, 'female')
-    male_chart = get_standardized_population_chart(selected_countries, 'male')
-
-    return total_chart, female_chart, male_chart
+    return build_figures([
+        (f'line-chart-{population_type}', get_standardized_population_chart,
+         (selected_countries, population_type))
+        for population_type in ['total', 'female', 'male']
+    ])
 
 
 @app.callback(
@@ -295,12 +301,9 @@ def update_employment_ratio_chart(selected_countries):
     if not selected_countries:
         return go.Figure()
 
-    filtered_df = df_series[df_series['Country'].isin(selected_countries)]
+    filtered_df = series_cube.country_rows(df_series, selected_countries)
     filtered_df = filtered_df[filtered_df['Year'] >= 1990]
 
-    filtered_df['Labor force proportion'] = (
-        filtered_df['Labor force, total'] / filtered_df['Population, total']) * 100
-
     n = len(selected_countries)
     n_cols = min(5, n)
     n_rows = ceil(n / n_cols)
@@ -330,11 +333,7 @@ def update_employment_ratio_chart(selected_countries):
     for i, country in enumerate(selected_countries, start=1):
         country_df = filtered_df[filtered_df['Country'] == country]
 
-        labor_force_employment_proportion = (
-            country_df['Employment to population ratio, 15+, total (%) (modeled ILO estimate)'] *
-            (country_df['Population, total'] - country_df['Population ages 0-14, total']) /
-            country_df['Population, total']
-        )
+        labor_force_employment_proportion = country_df['Employment to population ratio, total (%)']
 
         min_country = min(labor_force_employment_proportion.min(),
                           country_df['Labor force proportion'].min())
@@ -433,110 +432,63 @@ def gdp_chart(selected_countries, years_range):
         filtered_df_series = filter_df(
             df_series_original, selected_countries, years_range)
 
-        fig = go.Figure()
+        traces = []
         for i, country in enumerate(selected_countries):
             country_data = filtered_df_series[filtered_df_series['Country'] == country]
-            fig = add_trace(fig, country_data['Year'], country_data['GDP (current US$)'],
-                            'lines', country, country_colors[i % len(country_colors)])
-
-        fig = update_layout(
-            fig, 'GDP Change Over Time (current US$)', 'Year', 'GDP (current US$)')
-
-        return fig
+            traces.append(figure_specs.line_trace(country_data['Year'], country_data['GDP (current US$)'],
+                                                  country, country_colors[i % len(country_colors)]))
 
+        return figure_specs.figure(traces, figure_specs.grid_layout(
+            'GDP Change Over Time (current US$)', 'Year', 'GDP (current US$)'))
 
-@app.callback(
-    [Output('chart-women-job', 'figure'),
-     Output('chart-women-industrial-job', 'figure'),
-     Output('chart-women-contract', 'figure')],
-    [Input('country-dropdown', 'value'),
-     Input('year-slider', 'value')]
-)
-def update_bar_charts(selected_countries, years_range):
-    figures = []
 
-    features = [
-        'A woman can get a job in the same way as a man (1=yes; 0=no)',
-        'A woman can work in an industrial job in the same way as a man (1=yes; 0=no)',
-        'A woman can sign a contract in the same way as a man (1=yes; 0=no)'
-    ]
+def create_binary_bar_chart(selected_countries, years_range, feature):
+    traces = []
 
-    for feature in features:
-        fig = go.Figure()
+    for i, country in enumerate(selected_countries):
+        country_data = filter_df(df_series_original, [
+                                 country], years_range)
+        country_data = country_data[country_data['Year'].astype(
+            str).str[-1] == '5']
 
-        for i, country in enumerate(selected_countries):
-            country_data = filter_df(df_series_original, [
-                                     country], years_range)
-            country_data = country_data[country_data['Year'].astype(
-                str).str[-1] == '5']
+        country_data = country_data[['Year', feature]]
+        country_data.set_index('Year', inplace=True)
 
-            country_data = country_data[['Year', feature]]
-            country_data.set_index('Year', inplace=True)
+        country_data[feature] = country_data[feature].map({0: 1, 1: 2})
 
-            country_data[feature] = country_data[feature].map({0: 1, 1: 2})
+        y_values_final = country_data[feature].tolist()
 
-            y_values_final = country_data[feature].tolist()
+        traces.append(figure_specs.bar_trace(country_data.index, y_values_final, country,
+                                             country_colors[i % len(country_colors)],
+                                             offset=i-1, width=1))
 
-            binary_trace = go.Bar(
-                x=country_data.index,
-                y=y_values_final,
-                name=country,
-                marker_color=country_colors[i % len(country_colors)],
-                width=1,
-                offset=i-1
-            )
+    clean_feature_title = feature.replace(' (1=yes; 0=no)', '')
 
-            fig.add_trace(binary_trace)
+    layout = figure_specs.grid_layout(clean_feature_title, 'Year', '')
+    layout['yaxis'].update(tickvals=[1, 2], ticktext=['No', 'Yes'])
 
-        clean_feature_title = feature.replace(' (1=yes; 0=no)', '')
+    return figure_specs.figure(traces, layout)
 
-        fig.update_layout(
-            yaxis_tickvals=[1, 2],
-            yaxis_ticktext=['No', 'Yes'],
-            title={
-                'text': clean_feature_title,
-                'y': 0.9,
-                'x': 0.5,
-                'xanchor': 'center',
-                'yanchor': 'top'
-            },
-            xaxis=dict(
-                title='Year',
-                showgrid=True,
-                gridcolor='LightGray',
-                showline=True,
-                linecolor='black',
-            ),
-            yaxis=dict(
-                title='',
-                showgrid=True,
-                gridcolor='LightGray',
-                showline=True,
-                linecolor='black',
-            ),
-            autosize=True,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            legend=dict(
-                x=0.5,
-                y=-0.5,
-                xanchor='center',
-                yanchor='top',
-                orientation='h',
-                traceorder='normal',
-                font=dict(
-                    family='sans-serif',
-                    size=12,
-                    color='black'
-                ),
-                bordercolor='Black',
-                borderwidth=2
-            )
-        )
 
-        figures.append(fig)
+@app.callback(
+    [Output('chart-women-job', 'figure'),
+     Output('chart-women-industrial-job', 'figure'),
+     Output('chart-women-contract', 'figure')],
+    [Input('country-dropdown', 'value'),
+     Input('year-slider', 'value')]
+)
+def update_bar_charts(selected_countries, years_range):
+    features = {
+        'chart-women-job': 'A woman can get a job in the same way as a man (1=yes; 0=no)',
+        'chart-women-industrial-job': 'A woman can work in an industrial job in the same way as a man (1=yes; 0=no)',
+        'chart-women-contract': 'A woman can sign a contract in the same way as a man (1=yes; 0=no)'
+    }
 
-    return figures
+    return build_figures([
+        (output_id, create_binary_bar_chart,
+         (selected_countries, years_range, feature))
+        for output_id, feature in features.items()
+    ])
 
 
 @app.callback(
@@ -551,20 +503,43 @@ def enrolment_line_chart(selected_countries, years_range):
         filtered_df_series = filter_df(
             df_series_original, selected_countries, years_range)
 
-        fig = go.Figure()
+        traces = []
         for i, country in enumerate(selected_countries):
             country_data = filtered_df_series[filtered_df_series['Country'] == country]
 
             country_data['School enrollment, tertiary, female (% gross)'] = country_data[
                 'School enrollment, tertiary, female (% gross)'].interpolate()
 
-            fig = add_trace(fig, country_data['Year'], country_data['School enrollment, tertiary, female (% gross)'],
-                            'lines', country, country_colors[i % len(country_colors)])
+            traces.append(figure_specs.line_trace(country_data['Year'],
+                                                  country_data['School enrollment, tertiary, female (% gross)'],
+                                                  country, country_colors[i % len(country_colors)]))
 
-        fig = update_layout(
-            fig, 'Gross enrollment ratio for tertiary school', 'Year', '% gross')
+        return figure_specs.figure(traces, figure_specs.grid_layout(
+            'Gross enrollment ratio for tertiary school', 'Year', '% gross'))
 
-        return fig
+
+def create_law_index_heatmap(filtered_df, feature, title):
+    heatmap_df = filtered_df.pivot(
+        index='Year', columns='Country', values=feature)
+    fig = go.Figure(data=go.Heatmap(
+        z=heatmap_df.values,
+        x=heatmap_df.columns.values,
+        y=heatmap_df.index.values,
+        zmin=0,
+        zmax=100,
+        hoverongaps=False
+    ))
+
+    fig.update_layout(
+        title={
+            'text': title,
+            'y': 0.9,
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top'},
+    )
+
+    return fig
 
 
 @app.callback(
@@ -578,8 +553,7 @@ def update_law_index(selected_countries):
     if len(selected_countries) > 4:
         return go.Figure()
     else:
-        filtered_df = df_series_original[df_series_original['Country'].isin(
-            selected_countries)]
+        filtered_df = series_cube.country_rows(df_series_original, selected_countries)
         filtered_df = filtered_df[filtered_df['Year'] >= 1990]
 
         employment_features = [
@@ -595,32 +569,14 @@ def update_law_index(selected_countries):
                          'Pay Indicator Score'
                          ]
 
-        figures = []
-
-        for feature, title in zip(employment_features, custom_titles):
-            heatmap_df = filtered_df.pivot(
-                index='Year', columns='Country', values=feature)
-            fig = go.Figure(data=go.Heatmap(
-                z=heatmap_df.values,
-                x=heatmap_df.columns.values,
-                y=heatmap_df.index.values,
-                zmin=0,
-                zmax=100,
-                hoverongaps=False
-            ))
-
-            fig.update_layout(
-                title={
-                    'text': title,
-                    'y': 0.9,
-                    'x': 0.5,
-                    'xanchor': 'center',
-                    'yanchor': 'top'},
-            ),
-
-            figures.append(fig)
+        output_ids = ['heatmap-lawscore', 'heatmap-entrepreneurship',
+                      'heatmap-mobility', 'heatmap-pay']
 
-        return figures
+        return build_figures([
+            (output_id, create_law_index_heatmap,
+             (filtered_df[['Year', 'Country', feature]], feature, title))
+            for output_id, feature, title in zip(output_ids, employment_features, custom_titles)
+        ])
 
 
 @app.callback(
@@ -634,7 +590,7 @@ def dgp_lifeexpectancy_scatter(selected_countries):
         fig = make_subplots(rows=1, cols=4, subplot_titles=selected_countries)
 
         for i, country in enumerate(selected_countries):
-            country_data = df_series_original[df_series_original['Country'] == country]
+            country_data = series_cube.country_rows(df_series_original, [country])
 
             country_data['Year'] = pd.to_datetime(
                 country_data['Year'], format='%Y')
@@ -698,13 +654,6 @@ def dgp_lifeexpectancy_scatter(selected_countries):
         return fig
 
 
-def get_region(country):
-    for region, countries in regions.items():
-        if country in countries:
-            return region
-    return None
-
-
 @app.callback(
     Output('animated-birth-death-chart', 'figure'),
     [Input('region-radio', 'value')]
@@ -712,10 +661,9 @@ def get_region(country):
 def update_birth_death_chart(selected_region):
     all_countries = [country for sublist in regions.values()
                      for country in sublist]
-    filtered_df = df_series_original[df_series_original['Country'].isin(
-        all_countries)]
+    filtered_df = series_cube.country_rows(df_series_original, all_countries)
 
-    filtered_df['Region'] = filtered_df['Country'].apply(get_region)
+    filtered_df['Region'] = filtered_df['Country'].map(country_regions)
 
     fig = px.scatter(
         filtered_df,
@@ -750,7 +698,7 @@ def update_birth_death_chart(selected_region):
         showlegend=True,
     )
 
-    return fig
+    return figure_payload.reduce_figure(fig, 'animated-birth-death-chart')
 
 
 def generate_fertility_line_chart(selected_countries):
@@ -758,8 +706,7 @@ def generate_fertility_line_chart(selected_countries):
         return go.Figure()
 
     column_name = 'Fertility rate, total (births per woman)'
-    filtered_df = df_series[df_series['Country'].isin(
-        selected_countries)][['Year', 'Country', column_name]]
+    filtered_df = series_cube.country_rows(df_series, selected_countries)[['Year', 'Country', column_name]]
 
     fig = px.line(filtered_df, x='Year', y=column_name, color='Country',
                   title='Fertility Rate Over Time')
@@ -800,112 +747,47 @@ def create_feature_area_graph(selected_countries, features, graph_title, y_axis_
     if not selected_countries or len(selected_countries) > 4:
         return go.Figure()
 
-    n = len(selected_countries)
     n_cols = 4
-    n_rows = 1
-
-    fig = make_subplots(rows=n_rows, cols=n_cols,
-                        subplot_titles=selected_countries,
-                        shared_xaxes=True, vertical_spacing=0.1)
 
+    traces = []
     min_val_list = []
     max_val_list = []
 
     for i, country in enumerate(selected_countries):
-        country_df = df_series[df_series['Country'] == country]
+        country_df = series_cube.country_rows(df_series, [country])
 
         x = country_df['Year']
         y1 = country_df[features[0]]
         y2 = country_df[features[1]]
 
-        row = i // n_cols + 1
-        col = i % n_cols + 1
+        subplot_axes = figure_specs.subplot_axes(i % n_cols + 1)
 
         min_val_list.append(min(y1.min(), y2.min()))
         max_val_list.append(max(y1.max(), y2.max()))
 
-        fig.add_trace(
-            go.Scatter(
-                x=x,
-                y=y1,
-                fill='tozeroy',
-                mode='lines',
-                name=legend_titles[0],
-                line=dict(color='blue'),
-                legendgroup='group1',
-                showlegend=(i == 0)
-            ),
-            row=row, col=col
-        )
-
-        fig.add_trace(
-            go.Scatter(
-                x=x,
-                y=y2,
-                fill='tonexty',
-                mode='lines',
-                name=legend_titles[1],
-                line=dict(color='red'),
-                legendgroup='group2',
-                showlegend=(i == 0)
-            ),
-            row=row, col=col
-        )
+        traces.append(figure_specs.line_trace(x, y1, legend_titles[0], 'blue',
+                                              fill='tozeroy', legendgroup='group1',
+                                              showlegend=(i == 0), **subplot_axes))
+        traces.append(figure_specs.line_trace(x, y2, legend_titles[1], 'red',
+                                              fill='tonexty', legendgroup='group2',
+                                              showlegend=(i == 0), **subplot_axes))
 
+    yaxis_props = {}
     if min_val_list:
         min_val = min(min_val_list)
         max_val = max(max_val_list)
-        fig.update_yaxes(range=[min_val - 1, max_val + 1])
-
-    fig.update_layout(
-        height=500,
-        title={
-            'text': graph_title,
-            'y': 0.9,
-            'x': 0.5,
-            'xanchor': 'center',
-            'yanchor': 'top'},
-
-        legend=dict(
-            x=0.5,
-            y=-0.4,
-            xanchor='center',
-            yanchor='top',
-            orientation='h',
-            traceorder='normal',
-            font=dict(
-                family='sans-serif',
-                size=12,
-                color='black'
-            ),
-            bordercolor='Black',
-            borderwidth=2
-        ),
-    )
-
-    fig.add_annotation(
-        dict(
-            x=-0.04,
-            y=0.5,
-            showarrow=False,
-            text=y_axis_label,
-            textangle=-90,
-            xref='paper',
-            yref='paper'
-        )
-    )
-    fig.add_annotation(
-        dict(
-            x=0.5,
-            y=-0.3,
-            showarrow=False,
-            text='Year',
-            xref='paper',
-            yref='paper'
-        )
-    )
+        yaxis_props['range'] = [min_val - 1, max_val + 1]
+
+    layout = figure_specs.subplot_row(n_cols, selected_countries, **yaxis_props)
+    layout.update(height=500,
+                  title=figure_specs.title(graph_title),
+                  legend=figure_specs.legend(-0.4))
+    layout['annotations'] += [
+        figure_specs.paper_annotation(y_axis_label, -0.04, 0.5, textangle=-90),
+        figure_specs.paper_annotation('Year', 0.5, -0.3),
+    ]
 
-    return fig
+    return figure_specs.figure(traces, layout)
 
 
 @app.callback(
@@ -945,8 +827,7 @@ def update_immunization_heatmap(selected_countries):
         return go.Figure()
     else:
 
-        filtered_df = df_series_original[df_series_original['Country'].isin(
-            selected_countries)]
+        filtered_df = series_cube.country_rows(df_series_original, selected_countries)
         filtered_df = filtered_df[filtered_df['Year'] >= 1980]
 
         dpt_data = filtered_df.pivot(index='Country', columns='Year',
@@ -997,10 +878,9 @@ def update_immunization_heatmap(selected_countries):
 def survival_rates_seniors_chart(selected_region):
     all_countries = [country for sublist in regions.values()
                      for country in sublist]
-    filtered_df = df_series_original[df_series_original['Country'].isin(
-        all_countries)]
+    filtered_df = series_cube.country_rows(df_series_original, all_countries)
 
-    filtered_df['Region'] = filtered_df['Country'].apply(get_region)
+    filtered_df['Region'] = filtered_df['Country'].map(country_regions)
 
     fig = px.scatter(
         filtered_df,
@@ -1036,8 +916,47 @@ def survival_rates_seniors_chart(selected_region):
         showlegend=True,
     )
 
-    return fig
+    return figure_payload.reduce_figure(fig, 'survival-rates-seniors-chart')
+
+
+@app.callback(
+    Output('gender-gap-chart', 'figure'),
+    [Input('country-dropdown', 'value'),
+     Input('gender-gap-dropdown', 'value'),
+     Input('gender-gap-measure', 'value')]
+)
+def gender_gap_chart(selected_countries, label, measure):
+    if not selected_countries or label is None:
+        return go.Figure()
+
+    column_name = (derived_series.GAP if measure == 'gap' else derived_series.RATIO).format(label)
+    filtered_df = series_cube.country_rows(df_series, selected_countries)[['Year', 'Country', column_name]]
+
+    fig = px.line(filtered_df, x='Year', y=column_name, color='Country',
+                  title=f'{label}: Gender {"Gap" if measure == "gap" else "Ratio"} Over Time')
+    # Parity: no gap, or a ratio of 1.
+    fig.add_hline(y=0 if measure == 'gap' else 1, line_dash='dot', line_color='grey')
+
+    fig.update_xaxes(tickangle=45, dtick=5)
+
+    fig.update_layout(showlegend=True,
+                      legend=dict(
+                          x=0.5,
+                          y=-0.5,
+                          xanchor='center',
+                          yanchor='top',
+                          orientation='h',
+                          title=''),
+                      title={
+                          'x': 0.5,
+                          'xanchor': 'center',
+                          'yanchor': 'top'},
+                      yaxis=dict(title='Female - male' if measure == 'gap' else 'Female / male'),
+                      )
+
+    return figure_payload.reduce_figure(fig, 'gender-gap-chart')
 
 
 if __name__ == '__main__':
+    dump_metrics_on_exit()
     app.run_server(debug=True)
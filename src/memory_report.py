@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from dashboards import REPO_DIR, dashboard_modules, load_dashboard
+
+
+# Module-level structures of each dashboard to account for.
+structures = {
+    'main': ['df_series', 'df_series_original'],
+    'economy': ['df'],
+    'law_index': ['df'],
+    'women_rights': ['df', 'df_original', 'world'],
+}
+
+MB = 1024 * 1024
+
+
+def column_hint(series):
+    if series.dtype == object:
+        unique = series.nunique(dropna=True)
+        if unique <= len(series) / 2:
+            return f'object with {unique} distinct values: category'
+        return 'object strings'
+    if is_binary_float(series):
+        return 'binary indicator stored as float64: bool/int8 or float32'
+    if series.dtype == 'float64':
+        return 'float64: float32'
+    if series.dtype == 'int64' and len(series) and series.min() >= -2 ** 15 and series.max() < 2 ** 15:
+        return 'int64: int16'
+    return ''
+
+
+def is_binary_float(series):
+    if series.dtype != 'float64':
+        return False
+    values = series.dropna()
+    return bool(len(values)) and values.isin([0, 1]).all()
+
+
+def frame_report(frame, top):
+    usage = frame.memory_usage(deep=True, index=True)
+    column_usage = usage.drop('Index')
+    columns = column_usage.sort_values(ascending=False).head(top)
+    dtypes = frame.dtypes.astype(str)
+    binary = [column for column in frame.columns if is_binary_float(frame[column])]
+    return {
+        'rows': len(frame),
+        'columns': frame.shape[1],
+        'bytes': int(usage.sum()),
+        'bytes_by_dtype': {dtype: int(size) for dtype, size in column_usage.groupby(dtypes).sum().items()},
+        'binary_float64': {'columns': len(binary), 'bytes': int(column_usage[binary].sum())},
+        'top_columns': [{'column': str(column), 'dtype': str(frame[column].dtype),
+                         'bytes': int(size), 'hint': column_hint(frame[column])}
+                        for column, size in columns.items()],
+    }
+
+
+def cache_report():
+    caches = {}
+    for module_name in ['figure_specs', 'figure_payload', 'figure_executor']:
+        module = sys.modules.get(module_name)
+        for attribute, value in vars(module).items() if module else []:
+            if hasattr(value, 'cache_info'):
+                caches[f'{module_name}.{attribute}'] = {'entries': value.cache_info().currsize}
+    dash_server = sys.modules.get('dash_server')
+    if dash_server is not None:
+        caches['dash_server._compressed_static'] = {
+            'entries': len(dash_server._compressed_static),
+            'bytes': sum(len(body) for body in dash_server._compressed_static.values())}
+    figure_executor = sys.modules.get('figure_executor')
+    if figure_executor is not None:
+        caches['figure_executor.build_times'] = {'entries': len(figure_executor.build_times)}
+    return caches
+
+
+def measure(dashboards, root, top):
+    report = {}
+    tracemalloc.start()
+    for dashboard in dashboards:
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        current_before = tracemalloc.get_traced_memory()[0]
+        module = load_dashboard(dashboard, root)
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+
+        report[dashboard] = {
+            'traced_bytes': current - current_before,
+            'peak_bytes': peak - current_before,
+            'top_allocations': [{'where': str(stat.traceback), 'bytes': stat.size_diff}
+                                for stat in after.compare_to(before, 'lineno')[:top]],
+            'structures': {name: frame_report(getattr(module, name), top)
+                           for name in structures[dashboard]
+                           if isinstance(getattr(module, name, None), pd.DataFrame)},
+        }
+    tracemalloc.stop()
+    report['caches'] = cache_report()
+    return report
+
+
+def print_report(report, previous=None):
+    for dashboard, entry in report.items():
+        if dashboard == 'caches':
+            continue
+        print(f'{dashboard}: {entry["traced_bytes"] / MB:.1f} MB allocated while loading, '
+              f'peak {entry["peak_bytes"] / MB:.1f} MB')
+        for where in entry['top_allocations']:
+            print(f'    {where["bytes"] / MB:8.1f} MB  {where["where"]}')
+        for name, structure in entry['structures'].items():
+            change = ''
+            if previous:
+                before = previous.get(dashboard, {}).get('structures', {}).get(name)
+                if before:
+                    change = f' ({(structure["bytes"] - before["bytes"]) / MB:+.1f} MB since last run)'
+            print(f'  {name}: {structure["rows"]} rows x {structure["columns"]} columns, '
+                  f'{structure["bytes"] / MB:.1f} MB{change}')
+            print('    by dtype: ' + ', '.join(f'{dtype} {size / MB:.1f} MB'
+                                             for dtype, size in structure['bytes_by_dtype'].items()))
+            binary = structure['binary_float64']
+            if binary['columns']:
+                print(f'    {binary["columns"]} binary indicators stored as float64: {binary["bytes"] / MB:.1f} MB')
+            for column in structure['top_columns']:
+                print(f'    {column["bytes"] / MB:8.1f} MB  {column["column"]} [{column["dtype"]}] {column["hint"]}')
+    for name, cache in report['caches'].items():
+        size = f', {cache["bytes"] / MB:.1f} MB' if 'bytes' in cache else ''
+        print(f'cache {name}: {cache["entries"]} entries{size}')
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as history_file:
+        return [json.loads(line) for line in history_file if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Report the memory used by the data each dashboard loads.')
+    parser.add_argument('--dashboards', nargs='+', default=list(dashboard_modules),
+                        choices=list(dashboard_modules))
+    parser.add_argument('--root', default=REPO_DIR,
+                        help='directory with the data/ the dashboards read')
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('--history', default='../benchmarks/memory-history.jsonl',
+                        help='JSON lines file each report is appended to')
+    args = parser.parse_args()
+
+    # Import the libraries first, so their own allocations are not counted.
+    import dash, geopandas, plotly.express, sklearn
+
+    report = measure(args.dashboards, os.path.abspath(args.root), args.top)
+    history = load_history(args.history)
+    print_report(report, history[-1]['report'] if history else None)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, 'a') as history_file:
+        history_file.write(json.dumps({'created': datetime.now(timezone.utc).isoformat(),
+                                       'report': report}) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import bisect
+import threading
+from collections import defaultdict
+
+from flask import Response
+
+
+_lock = threading.Lock()
+_metrics = {}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7)
+
+
+def _register(name, metric_type, description, buckets=None):
+    with _lock:
+        if name not in _metrics:
+            if buckets is None:
+                samples = defaultdict(float)
+            else:
+                samples = defaultdict(lambda: {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0})
+            _metrics[name] = {'type': metric_type, 'help': description,
+                              'buckets': buckets, 'samples': samples}
+        return _metrics[name]
+
+
+def counter(name, description):
+    return _register(name, 'counter', description)
+
+
+def gauge(name, description):
+    return _register(name, 'gauge', description)
+
+
+def histogram(name, description, buckets=LATENCY_BUCKETS):
+    return _register(name, 'histogram', description, tuple(buckets))
+
+
+def inc(name, value=1, **labels):
+    metric = _metrics[name]
+    key = tuple(sorted(labels.items()))
+    with _lock:
+        metric['samples'][key] += value
+
+
+def set_value(name, value, **labels):
+    metric = _metrics[name]
+    key = tuple(sorted(labels.items()))
+    with _lock:
+        metric['samples'][key] = value
+
+
+def observe(name, value, **labels):
+    metric = _metrics[name]
+    key = tuple(sorted(labels.items()))
+    index = bisect.bisect_left(metric['buckets'], value)
+    with _lock:
+        sample = metric['samples'][key]
+        if index < len(sample['buckets']):
+            sample['buckets'][index] += 1
+        sample['sum'] += value
+        sample['count'] += 1
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']}
+    return value
+
+
+def snapshot():
+    with _lock:
+        return {name: {'type': metric['type'], 'help': metric['help'], 'buckets': metric['buckets'],
+                       'samples': {labels: _copy(value) for labels, value in metric['samples'].items()}}
+                for name, metric in _metrics.items()}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _histogram_lines(name, buckets, labels, sample):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(buckets, sample['buckets']):
+        cumulative += count
+        lines.append(f'{name}_bucket{_format_labels(labels + (("le", _format_value(bound)),))} {cumulative}')
+    lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {sample["count"]}')
+    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(sample["sum"])}')
+    lines.append(f'{name}_count{_format_labels(labels)} {sample["count"]}')
+    return lines
+
+
+def _format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render():
+    lines = []
+    for name, metric in snapshot().items():
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in metric['samples'].items():
+            if metric['type'] == 'histogram':
+                lines.extend(_histogram_lines(name, metric['buckets'], labels, value))
+            else:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+
+def dump(path):
+    with open(path, 'w') as metrics_file:
+        metrics_file.write(render())
+
+
+counter('dash_callback_responses_total',
+        'Sampled callback responses per output (CALLBACK_SIZE_SAMPLE_RATE).')
+counter('dash_callback_output_bytes_total',
+        'Bytes of callback output JSON per output in the sampled responses, raw and as sent '
+        '(compressed share attributed by raw size).')
+counter('http_response_bytes_total',
+        'Response body bytes by encoding.')
+counter('dash_callback_calls_total',
+        'Callback requests per callback ID.')
+counter('dash_callback_errors_total',
+        'Callback requests per callback ID that ended in an error response or exception.')
+histogram('dash_callback_duration_seconds',
+          'Time to handle a callback request, per callback ID.')
+histogram('dash_callback_response_size_bytes',
+          'Uncompressed callback response size per callback ID.', SIZE_BUCKETS)
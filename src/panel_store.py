@@ -0,0 +1,302 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+import derived_series
+import region_aggregates
+import series_cube
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+logger = logging.getLogger(__name__)
+
+# Embedded database copy of cleaned_data.csv the dashboards query instead of
+# holding the panel in memory: DATA_BACKEND=sqlite, or duckdb when it is
+# installed. memory, the default, loads the frames as before.
+BACKEND = os.environ.get('DATA_BACKEND', 'memory')
+BACKENDS = ['memory', 'sqlite', 'duckdb']
+CHUNK_ROWS = 10000
+
+ID_COLUMNS = ['Country Name', 'Country Code', 'Series Name', 'Series Code']
+
+# One long row per non-empty value, keyed by series, country and year; rows
+# keeps every row of the CSV, empty ones included, in file order.
+SCHEMA = [
+    'CREATE TABLE rows (row_number INTEGER PRIMARY KEY, country_name TEXT, country_code TEXT, '
+    'series_name TEXT, series_code TEXT)',
+    'CREATE TABLE columns (position INTEGER PRIMARY KEY, name TEXT)',
+    'CREATE TABLE observations (series_code TEXT NOT NULL, country_code TEXT NOT NULL, year INTEGER NOT NULL, '
+    'value DOUBLE NOT NULL, PRIMARY KEY (series_code, country_code, year)){options}',
+]
+# Run once the values are in; countries, series and years are those with
+# values, as in the cube. There are few series, so lookups by country or year
+# skip-scan the primary key (sqlite needs ANALYZE for it) instead of needing
+# indexes of their own, which would triple the size of the file.
+FINISH = [
+    'CREATE TABLE countries AS SELECT DISTINCT country_code, country_name FROM rows '
+    'WHERE country_code IN (SELECT country_code FROM observations)',
+    'CREATE TABLE series AS SELECT DISTINCT series_code, series_name FROM rows '
+    'WHERE series_code IN (SELECT series_code FROM observations)',
+    'CREATE TABLE years AS SELECT DISTINCT year FROM observations',
+    'ANALYZE',
+]
+
+_build_lock = threading.Lock()
+
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f'DATA_BACKEND must be one of {", ".join(BACKENDS)}, not {backend!r}')
+    if backend == 'duckdb' and duckdb is None:
+        raise ValueError('DATA_BACKEND=duckdb needs the duckdb package')
+
+
+def connect(path, backend, read_only=True):
+    if backend == 'duckdb':
+        return duckdb.connect(path, read_only=read_only)
+    if read_only:
+        return sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+    connection = sqlite3.connect(path)
+    # A failed build leaves a temporary file that is never used, so it needs
+    # no journal.
+    connection.execute('PRAGMA journal_mode = OFF')
+    connection.execute('PRAGMA synchronous = OFF')
+    return connection
+
+
+def csv_chunks(path):
+    # The values are parsed as data_cache.read_csv parses them, so the store
+    # holds the same floats as the in-memory frames.
+    if data_cache.pyarrow is None:
+        yield from pd.read_csv(path, chunksize=CHUNK_ROWS)
+        return
+    header = pd.read_csv(path, nrows=0).columns
+    types = {name: data_cache.pyarrow.string() if name in ID_COLUMNS else data_cache.pyarrow.float64()
+             for name in header}
+    reader = data_cache.pyarrow.csv.open_csv(
+        path, read_options=data_cache.pyarrow.csv.ReadOptions(block_size=1 << 22),
+        convert_options=data_cache.pyarrow.csv.ConvertOptions(column_types=types))
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def insert(connection, backend, table, frame):
+    if backend == 'duckdb':
+        connection.register('chunk', frame)
+        connection.execute(f'INSERT INTO {table} SELECT * FROM chunk')
+        connection.unregister('chunk')
+    else:
+        placeholders = ', '.join('?' * len(frame.columns))
+        connection.executemany(f'INSERT INTO {table} VALUES ({placeholders})',
+                               frame.astype(object).itertuples(index=False, name=None))
+
+
+def build(csv_path, path, backend):
+    start = time.perf_counter()
+    temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    connection = connect(temporary, backend, read_only=False)
+    options = ' WITHOUT ROWID' if backend == 'sqlite' else ''
+    for statement in SCHEMA:
+        connection.execute(statement.format(options=options))
+
+    row_number = 0
+    observations = 0
+    for chunk in csv_chunks(csv_path):
+        if not row_number:
+            insert(connection, backend, 'columns', pd.DataFrame({'position': range(len(chunk.columns)),
+                                                                 'name': chunk.columns}))
+        year_columns = series_cube.year_columns(chunk.columns)
+        rows = chunk[ID_COLUMNS].astype(object).where(chunk[ID_COLUMNS].notna(), None)
+        rows.insert(0, 'row_number', range(row_number, row_number + len(chunk)))
+        insert(connection, backend, 'rows', rows)
+        row_number += len(chunk)
+
+        values = chunk[year_columns].to_numpy(dtype=float)
+        keyed = chunk['Country Code'].notna().to_numpy() & chunk['Series Code'].notna().to_numpy()
+        row_positions, column_positions = np.nonzero(~np.isnan(values) & keyed[:, None])
+        long = pd.DataFrame({'series_code': chunk['Series Code'].to_numpy()[row_positions],
+                             'country_code': chunk['Country Code'].to_numpy()[row_positions],
+                             'year': np.array(series_cube.years_of(year_columns))[column_positions],
+                             'value': values[row_positions, column_positions]})
+        insert(connection, backend, 'observations', long.sort_values(['series_code', 'country_code', 'year']))
+        observations += len(long)
+
+    for statement in FINISH:
+        connection.execute(statement)
+    connection.commit()
+    connection.close()
+    os.replace(temporary, path)
+    logger.info('Built the %s store of %s (%d rows, %d values) in %.1fs',
+                backend, csv_path, row_number, observations, time.perf_counter() - start)
+
+
+def store_path(csv_path, backend):
+    return data_cache.cache_path(csv_path, data_cache.source_digest(csv_path), backend)
+
+
+def load(csv_path, country_codes=True, backend=None):
+    # The store of the current contents of csv_path, built on first use.
+    backend = backend or BACKEND
+    check_backend(backend)
+    path = os.path.abspath(store_path(csv_path, backend))
+    with _build_lock:
+        if not os.path.exists(path):
+            data_cache.invalidate(csv_path, data_cache.source_digest(csv_path))
+            build(csv_path, path, backend)
+    return PanelStore(path, backend, country_codes)
+
+
+class PanelStore:
+    # Stands in for the country x year x series cube of series_cube.build:
+    # series_cube.country_rows and year_rows query it for the rows a callback
+    # needs. Connections are per thread and per process, as the figure
+    # workers are forked.
+    def __init__(self, path, backend, country_codes=True):
+        self.path = path
+        self.backend = backend
+        self.country_codes = country_codes
+        self._local = threading.local()
+        series = self.query('SELECT series_code, series_name FROM series')
+        self.series_names = sorted(set(series['series_name']))
+        self.code_names = dict(zip(series['series_code'], series['series_name']))
+        # Rows computed from the others, the region aggregates, kept in memory
+        # and added to the query results.
+        self.extra_rows = None
+
+    def __getstate__(self):
+        return {'path': self.path, 'backend': self.backend, 'country_codes': self.country_codes,
+                'series_names': self.series_names, 'code_names': self.code_names, 'extra_rows': self.extra_rows}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def copy(self):
+        # Read-only, so a copy is the same store.
+        return self
+
+    def connection(self):
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = connect(self.path, self.backend)
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def query(self, sql, params=()):
+        if self.backend == 'duckdb':
+            return self.connection().execute(sql, list(params)).df()
+        return pd.read_sql_query(sql, self.connection(), params=list(params))
+
+    def countries(self):
+        countries = self.query('SELECT DISTINCT country_name FROM countries ORDER BY country_name')['country_name']
+        return countries.tolist() + (self.extra_rows['Country'].unique().tolist() if self.extra_rows is not None else [])
+
+    def columns(self):
+        return self.country_rows([]).columns.tolist()
+
+    def years(self):
+        return [int(year) for year in self.query('SELECT year FROM years ORDER BY year')['year']]
+
+    def cube_rows(self, condition, params):
+        # The rows of the cube matching `condition`, with all its columns.
+        long = self.query('SELECT c.country_name AS "Country Name", o.year AS "Year", '
+                          'o.country_code AS "Country Code", s.series_name AS "Series Name", o.value AS "Value" '
+                          'FROM observations o JOIN countries c USING (country_code) '
+                          f'JOIN series s USING (series_code) WHERE {condition}', params)
+        if long.empty:
+            cube = pd.DataFrame(columns=series_cube.CUBE_INDEX).astype({'Year': int})
+        else:
+            long['Year'] = long['Year'].astype(int)
+            cube = long.pivot_table(index=series_cube.CUBE_INDEX, columns='Series Name', values='Value')
+            cube = cube.reset_index()
+        cube = cube.reindex(columns=series_cube.CUBE_INDEX + self.series_names)
+        cube.columns.name = ''
+        cube.rename(columns={'Country Name': 'Country'}, inplace=True)
+        cube = derived_series.add(cube, self.code_names)
+        return cube if self.country_codes else cube.drop(columns='Country Code')
+
+    def with_extra_rows(self, cube, selected):
+        if self.extra_rows is None:
+            return cube
+        return pd.concat([cube, self.extra_rows[selected(self.extra_rows)]], ignore_index=True)
+
+    def country_rows(self, countries):
+        countries = list(countries)
+        cube = self.cube_rows(f'c.country_name IN ({", ".join("?" * len(countries))})' if countries else '0',
+                              countries)
+        return self.with_extra_rows(cube, lambda rows: rows['Country'].isin(countries))
+
+    def year_rows(self, year):
+        return self.with_extra_rows(self.cube_rows('o.year = ?', [int(year)]), lambda rows: rows['Year'] == year)
+
+    def wide(self, columns=None, series_codes=None, years=None):
+        # What data_cache.read_csv returns for the same arguments.
+        condition, params = '', []
+        if series_codes is not None:
+            series_codes = list(series_codes)
+            condition = f'WHERE series_code IN ({", ".join("?" * len(series_codes))})' if series_codes \
+                else 'WHERE 0'
+            params = series_codes
+        rows = self.query('SELECT row_number, country_name AS "Country Name", country_code AS "Country Code", '
+                          'series_name AS "Series Name", series_code AS "Series Code" '
+                          f'FROM rows {condition} ORDER BY row_number', params)
+        long = self.query(f'SELECT series_code, country_code, year, value FROM observations {condition}', params)
+        names = self.query('SELECT name FROM columns ORDER BY position')['name'].tolist()
+        year_columns = series_cube.year_columns(names)
+
+        values = long.pivot(index=['country_code', 'series_code'], columns='year', values='value') \
+            .reindex(columns=series_cube.years_of(year_columns))
+        values.columns = year_columns
+        frame = rows.join(values, on=['Country Code', 'Series Code'])
+        frame = frame[names].astype({column: float for column in year_columns})
+        frame = frame[[name for name in names if data_cache.wanted(name, columns, years)]]
+        return frame.reset_index(drop=True) if columns is not None or series_codes is not None \
+            or years is not None else frame
+
+
+def read_csv(path, columns=None, series_codes=None, years=None):
+    # data_cache.read_csv, from the store when there is one.
+    if BACKEND == 'memory':
+        return data_cache.read_csv(path, columns, series_codes, years)
+    return load(path).wide(columns, series_codes, years)
+
+
+def code_names(path):
+    series = data_cache.read_csv(path, columns=['Series Name', 'Series Code']).dropna()
+    return dict(zip(series['Series Code'], series['Series Name']))
+
+
+def region_rows(rows, regions, series_names):
+    # The aggregates of the series in the data, with the derived series
+    # computed from them: a sum or mean of ratios is not the ratio of the
+    # region.
+    inputs = rows.drop(columns=derived_series.columns_of(rows.columns))
+    return derived_series.add(region_aggregates.aggregate(inputs, regions), series_names)
+
+
+def cube(path, country_codes=True, regions=None):
+    # series_cube.load with the derived series, and the aggregates of
+    # `regions` as rows, or the store standing in for it.
+    if BACKEND == 'memory':
+        series_names = code_names(path)
+        frame = derived_series.add(series_cube.load(path), series_names)
+        frame = frame if country_codes else frame.drop(columns='Country Code')
+        if regions:
+            aggregates = region_rows(series_cube.country_rows(frame, region_aggregates.members(regions)), regions,
+                                     series_names)
+            frame = pd.concat([frame, aggregates], ignore_index=True)
+        return frame
+    store = load(path, country_codes)
+    if regions:
+        store.extra_rows = region_rows(store.country_rows(region_aggregates.members(regions)), regions,
+                                       store.code_names)
+    return store
@@ -0,0 +1,69 @@
+import cProfile
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+
+
+# Fraction of callback requests to profile; 0 turns profiling off.
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 100))
+
+enabled = PROFILE_SAMPLE_RATE > 0
+
+
+def should_sample():
+    return enabled and random.random() < PROFILE_SAMPLE_RATE
+
+
+def start():
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler, time.perf_counter()
+
+
+def stop(started, tag, details=None):
+    profiler, start_time = started
+    profiler.disable()
+    duration = time.perf_counter() - start_time
+
+    details_json = json.dumps(details, sort_keys=True, default=str)
+    digest = hashlib.sha256(details_json.encode()).hexdigest()[:8]
+    slug = re.sub(r'[^A-Za-z0-9.-]+', '_', tag).strip('_.')[:80]
+    stem = f'{time.strftime("%Y%m%d-%H%M%S")}-{slug}-{digest}-{os.getpid()}'
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profiler.dump_stats(os.path.join(PROFILE_DIR, f'{stem}.prof'))
+    with open(os.path.join(PROFILE_DIR, f'{stem}.json'), 'w') as details_file:
+        json.dump({'tag': tag, 'details': details, 'duration': duration}, details_file,
+                  indent=2, default=str)
+    rotate()
+
+
+def rotate():
+    profiles = sorted((entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith('.prof')),
+                      key=lambda entry: entry.stat().st_mtime)
+    for entry in profiles[:max(0, len(profiles) - PROFILE_MAX_FILES)]:
+        for path in [entry.path, entry.path[:-len('.prof')] + '.json']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+@contextmanager
+def profiled(tag, details=None, sampled=True):
+    # Data loading runs once per process, so it is profiled whenever
+    # profiling is on rather than sampled.
+    if not (should_sample() if sampled else enabled):
+        yield
+        return
+    started = start()
+    try:
+        yield
+    finally:
+        stop(started, tag, details)
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from dash import html
+
+import series_cube
+
+
+# Per series and year, the countries ordered by value (highest first) and the
+# dense rank of every country, built once at load so that a country's rank is
+# a lookup and the top or bottom k a slice of the order. Countries without a
+# value have rank 0 and come after the others in the order.
+
+def build(values, countries, years):
+    # values: series -> countries x years array.
+    series = list(values)
+    stacked = np.stack([np.asarray(values[name], dtype=float).T for name in series]) if series \
+        else np.empty((0, len(years), len(countries)))
+    # Series x years x countries; argsort puts the NaNs last and keeps ties
+    # in country order.
+    order = np.argsort(-stacked, axis=2, kind='stable')
+    ordered = np.take_along_axis(stacked, order, axis=2)
+    known = ~np.isnan(ordered)
+    steps = np.ones(ordered.shape, dtype=bool)
+    steps[..., 1:] = ordered[..., 1:] != ordered[..., :-1]
+    dense = np.cumsum(steps & known, axis=2) * known
+    ranks = np.empty_like(dense)
+    np.put_along_axis(ranks, order, dense, axis=2)
+
+    dtype = np.int16 if len(countries) < 2 ** 15 else np.int32
+    return {'series': {name: position for position, name in enumerate(series)},
+            'years': {int(year): position for position, year in enumerate(years)},
+            'countries': np.array(countries, dtype=object),
+            'country_positions': {country: position for position, country in enumerate(countries)},
+            'values': stacked, 'order': order.astype(dtype), 'ranks': ranks.astype(dtype),
+            'counts': known.sum(axis=2)}
+
+
+def from_wide(df, series_codes):
+    # From rows in the cleaned_data.csv layout, by series code.
+    year_columns = series_cube.year_columns(df.columns)
+    countries = sorted(df['Country Name'].dropna().unique())
+    values = {code: df[df['Series Code'] == code].set_index('Country Name')[year_columns].reindex(countries)
+              .to_numpy(dtype=float) for code in series_codes}
+    return build(values, countries, series_cube.years_of(year_columns))
+
+
+def positions(index, series, year):
+    if series not in index['series'] or year not in index['years']:
+        return None
+    return index['series'][series], index['years'][year]
+
+
+def count(index, series, year):
+    # How many countries have a value, so are ranked.
+    found = positions(index, series, year)
+    return int(index['counts'][found]) if found else 0
+
+
+def rank(index, series, year, country):
+    # 0 when the country has no value.
+    found = positions(index, series, year)
+    if found is None or country not in index['country_positions']:
+        return 0
+    return int(index['ranks'][found + (index['country_positions'][country],)])
+
+
+def entries(index, found, country_positions):
+    if found is None:
+        return pd.DataFrame(columns=['Rank', 'Country', 'Value'])
+    return pd.DataFrame({'Rank': index['ranks'][found][country_positions],
+                         'Country': index['countries'][country_positions],
+                         'Value': index['values'][found][country_positions]})
+
+
+def top(index, series, year, k):
+    found = positions(index, series, year)
+    return entries(index, found, index['order'][found][:min(k, count(index, series, year))] if found else None)
+
+
+def bottom(index, series, year, k):
+    found = positions(index, series, year)
+    ranked = count(index, series, year)
+    return entries(index, found, index['order'][found][max(ranked - k, 0):ranked][::-1] if found else None)
+
+
+def table(frame):
+    return html.Table(
+        [html.Tr([html.Th(column) for column in frame.columns])] +
+        [html.Tr([html.Td(f'{value:g}' if isinstance(value, float) else value) for value in row])
+         for row in frame.itertuples(index=False)],
+        style={'margin': '0 20px', 'fontFamily': 'Calibri'})
+
+
+def leaderboard(index, series, year, countries, k=10):
+    # Top and bottom k of the series in the year, and the ranks of `countries`.
+    ranks = pd.DataFrame({'Rank': [rank(index, series, year, country) or '-' for country in countries],
+                          'Country': countries})
+    return html.Div([
+        html.H3(f'Ranking in {year} ({count(index, series, year)} countries)',
+                style={'text-align': 'center', 'fontFamily': 'Calibri'}),
+        html.Div([
+            html.Div([html.H4('Top'), table(top(index, series, year, k))]),
+            html.Div([html.H4('Bottom'), table(bottom(index, series, year, k))]),
+            html.Div([html.H4('Selected'), table(ranks)]),
+        ], style={'display': 'flex', 'justifyContent': 'center'}),
+    ])
@@ -0,0 +1,93 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Region-level rows for the cube: for every region, year and series the sum,
+# mean and population-weighted mean over the region's countries, as rows
+# whose 'Country' is e.g. 'Europe (mean)', so every chart that takes
+# countries can plot them. Regions may overlap. Regions from the JSON file in
+# REGIONS_PATH ({"name": [countries]}) are added to the dashboard's own.
+REGIONS_PATH = os.environ.get('REGIONS_PATH')
+STATISTICS = ['sum', 'mean', 'population-weighted mean']
+WEIGHT = 'Population, total'
+KEYS = ['Country', 'Year', 'Country Code']
+
+
+def with_user_regions(regions):
+    if not REGIONS_PATH:
+        return dict(regions)
+    with open(REGIONS_PATH) as regions_file:
+        return {**regions, **json.load(regions_file)}
+
+
+def country_regions(regions):
+    # Country -> its first region, for colouring countries by region.
+    first = {}
+    for region, countries in regions.items():
+        for country in countries:
+            first.setdefault(country, region)
+    return first
+
+
+def members(regions):
+    return sorted({country for countries in regions.values() for country in countries})
+
+
+def label(region, statistic):
+    return f'{region} ({statistic})'
+
+
+def labels(regions):
+    return [label(region, statistic) for region in regions for statistic in STATISTICS]
+
+
+def membership(regions, countries):
+    # Regions x countries, 1 where the country belongs to the region.
+    positions = {country: position for position, country in enumerate(countries)}
+    matrix = np.zeros((len(regions), len(countries)))
+    for row, region_countries in enumerate(regions.values()):
+        for country in region_countries:
+            if country in positions:
+                matrix[row, positions[country]] = 1
+    return matrix
+
+
+def aggregate(rows, regions):
+    # rows: the cube rows of the member countries. Every statistic of every
+    # region, year and series comes out of one product of the membership
+    # matrix with the values, their counts, the population-weighted values
+    # and the weights, laid out as countries x (years x series).
+    if rows.empty:
+        return rows.iloc[:0]
+    series = [column for column in rows.columns if column not in KEYS]
+    countries = sorted(set(rows['Country']))
+    years = sorted(set(rows['Year']))
+    cells = rows.set_index(['Country', 'Year']).reindex(pd.MultiIndex.from_product([countries, years]))
+
+    values = cells[series].to_numpy(dtype=float).reshape(len(countries), len(years) * len(series))
+    weights = cells[WEIGHT].to_numpy(dtype=float).reshape(len(countries), len(years)) if WEIGHT in cells \
+        else np.full((len(countries), len(years)), np.nan)
+    weights = np.repeat(weights, len(series), axis=1)
+    known = ~np.isnan(values)
+    weighted = known & ~np.isnan(weights)
+    filled = np.where(known, values, 0)
+    stacked = np.hstack([filled, known, np.where(weighted, filled * weights, 0), np.where(weighted, weights, 0)])
+
+    sums, counts, weighted_sums, weight_totals = np.split(membership(regions, countries) @ stacked, 4, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        results = {'sum': np.where(counts > 0, sums, np.nan),
+                   'mean': sums / counts,
+                   'population-weighted mean': weighted_sums / weight_totals}
+
+    frames = []
+    for statistic in STATISTICS:
+        frame = pd.DataFrame(results[statistic].reshape(len(regions) * len(years), len(series)), columns=series)
+        frame.insert(0, 'Country', np.repeat([label(region, statistic) for region in regions], len(years)))
+        frame.insert(1, 'Year', np.tile(np.array(years, dtype=int), len(regions)))
+        frames.append(frame.dropna(how='all', subset=series))
+    order = {name: position for position, name in enumerate(labels(regions))}
+    aggregates = pd.concat(frames).sort_values('Country', key=lambda names: names.map(order), kind='stable')
+    return aggregates.reset_index(drop=True).reindex(columns=rows.columns)
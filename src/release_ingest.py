@@ -0,0 +1,139 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import cleaning
+import data_cache
+import series_cube
+
+
+# Applies a new databank release (a full download, or only the new year and
+# the revised recent years) to data/data.csv, reruns the cleaning and patches
+# the country x year x series cube the dashboards load with the cells that
+# changed, instead of every dashboard melting and pivoting the new file.
+
+KEYS = ['Country Code', 'Series Code']
+
+
+def keyed(data):
+    # Rows without codes are the notes at the end of a databank download.
+    valid = data[KEYS].notna().all(axis=1)
+    rows = data[valid].set_index(KEYS)
+    if rows.index.has_duplicates:
+        duplicated = rows.index[rows.index.duplicated()][0]
+        raise ValueError(f'{duplicated} appears more than once')
+    return rows, data[~valid]
+
+
+def diff(stored, release):
+    stored_years = cleaning.year_columns_of(stored.columns)
+    release_years = cleaning.year_columns_of(release.columns)
+    common_years = [column for column in release_years if column in stored_years]
+    common_rows = release.index.intersection(stored.index)
+
+    before = stored.loc[common_rows, common_years].to_numpy()
+    after = release.loc[common_rows, common_years].to_numpy()
+    revised = ~((before == after) | (pd.isna(before) & pd.isna(after)))
+    return {'new_years': [column for column in release_years if column not in stored_years],
+            'new_rows': len(release.index.difference(stored.index)),
+            'revised_cells': int(revised.sum()),
+            'revised_per_year': {column: int(count) for column, count in zip(common_years, revised.sum(axis=0))
+                                 if count}}
+
+
+def merge(stored, notes, release):
+    # Values of the release win; rows and years it does not have are kept.
+    year_columns = sorted(set(cleaning.year_columns_of(stored.columns)) | set(cleaning.year_columns_of(release.columns)))
+    merged = stored.reindex(columns=['Country Name', 'Series Name'] + year_columns)
+    new_rows = release.index.difference(stored.index)
+    merged = pd.concat([merged, release.loc[new_rows].reindex(columns=merged.columns)])
+    positions = merged.index.get_indexer(release.index)
+    for column in release.columns:
+        values = merged[column].to_numpy(dtype=object, copy=True)
+        values[positions] = release[column].to_numpy()
+        merged[column] = values
+
+    # New rows go after the last row of their country, so countries that are
+    # contiguous stay so, which the incremental cleaning relies on.
+    positions = np.arange(len(stored), dtype=float)
+    last_rows = pd.Series(positions, index=stored.index.get_level_values(0)).groupby(level=0).max()
+    new_positions = last_rows.reindex(new_rows.get_level_values(0)).fillna(len(stored)).to_numpy() + 0.5
+    order = np.argsort(np.concatenate([positions, new_positions]), kind='stable')
+    merged = merged.iloc[order].reset_index()
+    columns = ['Country Name', 'Country Code', 'Series Name', 'Series Code'] + year_columns
+    return pd.concat([merged[columns], notes.reindex(columns=columns)], ignore_index=True)
+
+
+def write_panel(data, path):
+    temporary = f'{path}.{os.getpid()}.tmp'
+    data.to_csv(temporary, index=False, na_rep='..')
+    os.replace(temporary, path)
+
+
+def update_cube(cleaned_path, old_cleaned, old_cube):
+    new_cleaned = data_cache.read_csv(cleaned_path)
+    try:
+        changes = series_cube.cell_changes(old_cleaned, new_cleaned)
+        cube = series_cube.patch(old_cube, changes)
+    except ValueError as error:
+        print(f'Could not patch the cube ({error}), building it from scratch')
+        return series_cube.load(cleaned_path), None
+    data_cache.write_derived(cleaned_path, 'cube', cube)
+    return cube, len(changes)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Apply a new databank release to the stored panel and the artifacts built from it.')
+    parser.add_argument('release', help='databank CSV with the new year and the revised values')
+    parser.add_argument('--data', default='../data/data.csv', help='stored panel the release is applied to')
+    parser.add_argument('--output-dir', default='../data', help='where data-polishing.py writes the cleaned files')
+    parser.add_argument('--dry-run', action='store_true', help='only print what the release changes')
+    args = parser.parse_args()
+
+    try:
+        stored, notes = keyed(cleaning.read_data(args.data))
+        release, _ = keyed(cleaning.read_data(args.release))
+    except ValueError as error:
+        sys.exit(str(error))
+    release = release[['Country Name', 'Series Name'] + cleaning.year_columns_of(release.columns)]
+
+    changes = diff(stored, release)
+    print(f"{len(changes['new_years'])} new years"
+          + (': ' + ', '.join(cleaning.year_label(column) for column in changes['new_years'])
+             if changes['new_years'] else '')
+          + f", {changes['new_rows']} new rows, {changes['revised_cells']} revised values")
+    for column, count in changes['revised_per_year'].items():
+        print(f'    {cleaning.year_label(column)}: {count}')
+    if args.dry_run or not (changes['new_years'] or changes['new_rows'] or changes['revised_cells']):
+        return
+
+    cleaned_path = os.path.join(args.output_dir, 'cleaned_data.csv')
+    old_cleaned = old_cube = None
+    if os.path.exists(cleaned_path):
+        old_cleaned = data_cache.read_csv(cleaned_path)
+        old_cube = series_cube.load(cleaned_path)
+
+    start = time.perf_counter()
+    write_panel(merge(stored, notes, release), args.data)
+    print(f'Updated {args.data} in {time.perf_counter() - start:.2f}s')
+
+    report = cleaning.polish(args.data, args.output_dir)
+    cleaning.print_summary(report)
+
+    start = time.perf_counter()
+    if old_cube is None:
+        series_cube.load(cleaned_path)
+        print(f'Built the cube in {time.perf_counter() - start:.2f}s')
+    else:
+        _, patched = update_cube(cleaned_path, old_cleaned, old_cube)
+        if patched is not None:
+            print(f'Patched {patched} cube values in {time.perf_counter() - start:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import re
+
+from flask import Response, jsonify, request
+
+import data_cache
+import hot_reload
+import metrics
+import panel_store
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+
+# GET /api/series?codes=SG.LAW.INDX,NY.GDP.MKTP.CD&countries=DEU,IRN&years=1990-2020
+# returns the rows of cleaned_data.csv for those series and country codes,
+# with the year columns in the range, as JSON records or, with
+# Accept: application/vnd.apache.arrow.stream, an Arrow IPC stream. Every
+# parameter is optional. Each request reads its slice from the parquet copy
+# or the store the dashboards load from, with the filters pushed down, so the
+# API keeps no copy of the panel. The ETag is the content hash of the data
+# file and the query, so a client repeating a request with If-None-Match gets
+# a 304 until the data changes.
+
+JSON = 'application/json'
+ARROW = 'application/vnd.apache.arrow.stream'
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'cleaned_data.csv')
+YEARS = re.compile(r'^(\d{4})(?:-(\d{4}))?$')
+
+metrics.counter('api_series_requests_total', 'Requests to /api/series, by format and status')
+
+
+def data_path():
+    # The file the dashboards of this server registered, which is the same
+    # cleaned_data.csv for all of them.
+    for dataset in list(hot_reload.datasets.values()):
+        return dataset['path']
+    return os.path.abspath(DEFAULT_DATA_PATH)
+
+
+def split(value):
+    return [part.strip() for part in value.split(',') if part.strip()] if value else None
+
+
+def parse_years(value):
+    if not value:
+        return None
+    match = YEARS.match(value.strip())
+    if match is None:
+        raise ValueError(f'years must be YYYY or YYYY-YYYY, not {value!r}')
+    first, last = int(match.group(1)), int(match.group(2) or match.group(1))
+    if first > last:
+        raise ValueError(f'years {value!r} run backwards')
+    return first, last
+
+
+def select(path, codes, countries, years):
+    frame = panel_store.read_csv(path, series_codes=codes, years=years)
+    if countries is not None:
+        frame = frame[frame['Country Code'].isin(countries)]
+    return frame.reset_index(drop=True)
+
+
+def arrow_stream(frame):
+    table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def etag(path, codes, countries, years, mimetype):
+    query = repr((codes, countries, years, mimetype)).encode()
+    return f'{data_cache.source_digest(path)[:16]}-{hashlib.sha1(query).hexdigest()[:16]}'
+
+
+def series_view():
+    offered = [JSON, ARROW] if pyarrow is not None else [JSON]
+    # Without an Accept header, JSON.
+    mimetype = request.accept_mimetypes.best_match(offered) if request.accept_mimetypes else JSON
+    if mimetype is None:
+        metrics.inc('api_series_requests_total', format='none', status='406')
+        return jsonify({'error': f'can only return {" or ".join(offered)}'}), 406
+    try:
+        codes = split(request.args.get('codes'))
+        countries = split(request.args.get('countries'))
+        years = parse_years(request.args.get('years'))
+    except ValueError as error:
+        metrics.inc('api_series_requests_total', format=mimetype, status='400')
+        return jsonify({'error': str(error)}), 400
+
+    path = data_path()
+    tag = etag(path, codes, countries, years, mimetype)
+    if request.if_none_match.contains(tag):
+        response = Response(status=304)
+    else:
+        frame = select(path, codes, countries, years)
+        body = arrow_stream(frame) if mimetype == ARROW else frame.to_json(orient='records', double_precision=15)
+        response = Response(body, mimetype=mimetype)
+    response.set_etag(tag)
+    # Clients revalidate with the ETag instead of keeping a stale copy.
+    response.cache_control.no_cache = True
+    response.vary.add('Accept')
+    metrics.inc('api_series_requests_total', format=mimetype, status=str(response.status_code))
+    return response
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+import data_cache
+
+
+# Country x year x series panel of cleaned_data.csv, one row per country and
+# year and one column per series, as the dashboards plot it.
+CUBE_INDEX = ['Country Name', 'Year', 'Country Code']
+ROW_KEYS = ['Country Name', 'Country Code', 'Series Name']
+
+
+def year_columns(columns):
+    return [col for col in columns if col.startswith('19') or col.startswith('20')]
+
+
+def years_of(columns):
+    return [int(col[:4]) for col in year_columns(columns)]
+
+
+def build(df):
+    cube = df[['Series Name', 'Country Name', 'Country Code'] + year_columns(df.columns)]
+
+    cube = cube.melt(id_vars=['Series Name', 'Country Name', 'Country Code'],
+                     var_name='Year', value_name='Value')
+
+    cube['Year'] = cube['Year'].str.extract(r'(\d+)').astype(int)
+
+    cube = cube.pivot_table(index=CUBE_INDEX, columns='Series Name', values='Value').reset_index()
+
+    cube.columns.name = ''
+    cube.rename(columns={'Country Name': 'Country'}, inplace=True)
+    return cube
+
+
+def load(path):
+    return data_cache.read_derived(path, 'cube', build)
+
+
+def cell_changes(old, new):
+    # Every (country, series, year) value of the wide frames that differs,
+    # with NaN for the values that are gone, as a long frame.
+    old = old.dropna(subset=ROW_KEYS).set_index(ROW_KEYS)
+    new = new.dropna(subset=ROW_KEYS).set_index(ROW_KEYS)
+    rows = old.index.union(new.index)
+    columns = sorted(set(year_columns(old.columns)) | set(year_columns(new.columns)))
+    before = old.reindex(index=rows, columns=columns).to_numpy(dtype=float)
+    after = new.reindex(index=rows, columns=columns).to_numpy(dtype=float)
+
+    changed = ~((before == after) | (np.isnan(before) & np.isnan(after)))
+    row_positions, column_positions = np.nonzero(changed)
+    changes = rows[row_positions].to_frame(index=False)
+    changes['Year'] = np.array(years_of(columns))[column_positions]
+    changes['Value'] = after[row_positions, column_positions]
+    return changes
+
+
+def patch(cube, changes):
+    # Applies cell_changes to a cube, giving what build would return for the
+    # new frame without melting and pivoting all of it.
+    cube = cube.set_index(['Country', 'Year', 'Country Code'])
+    keys = pd.MultiIndex.from_frame(changes[['Country Name', 'Year', 'Country Code']],
+                                    names=cube.index.names)
+    index = cube.index.union(keys.unique())
+    columns = cube.columns.union(pd.Index(changes['Series Name'].unique()))
+    cube = cube.reindex(index=index, columns=columns)
+
+    values = cube.to_numpy(dtype=float, copy=True)
+    values[index.get_indexer(keys), columns.get_indexer(changes['Series Name'])] = changes['Value'].to_numpy()
+    cube = pd.DataFrame(values, index=index, columns=columns)
+    cube = cube.dropna(how='all').dropna(axis=1, how='all').sort_index()
+    cube = cube[sorted(cube.columns)].reset_index()
+    cube.columns.name = ''
+    return cube
+
+
+# What the dashboards read of the cube, from a cube frame or from a
+# panel_store.PanelStore standing in for one.
+def country_rows(cube, countries):
+    if isinstance(cube, pd.DataFrame):
+        return cube[cube['Country'].isin(countries)]
+    return cube.country_rows(countries)
+
+
+def year_rows(cube, year):
+    if isinstance(cube, pd.DataFrame):
+        return cube[cube['Year'] == year]
+    return cube.year_rows(year)
+
+
+def countries(cube):
+    if isinstance(cube, pd.DataFrame):
+        return cube['Country'].unique().tolist()
+    return cube.countries()
+
+
+def columns(cube):
+    if isinstance(cube, pd.DataFrame):
+        return cube.columns.tolist()
+    return cube.columns()
+
+
+def years(cube):
+    if isinstance(cube, pd.DataFrame):
+        return [int(year) for year in sorted(cube['Year'].unique())]
+    return cube.years()
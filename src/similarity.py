@@ -0,0 +1,75 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+import series_cube
+
+
+# Countries most similar to a country over a range of years: every country is
+# the vector of its mean standardized values of FEATURES over the years, and
+# the most similar are the nearest by root mean squared difference over the
+# features both countries have. The values are standardized over all countries
+# and years once, when the data loads, and kept as running sums over the years,
+# so the means over any range of years are a subtraction and a query is one
+# array operation over all countries.
+FEATURES = ['SG.LAW.INDX.EN', 'SG.LAW.INDX.MO', 'SG.LAW.INDX.PY', 'SG.LAW.INDX.WP', 'SG.LAW.INDX.PE',
+            'SG.LAW.INDX.PR', 'SG.LAW.INDX.MR', 'SG.LAW.INDX.AS',
+            'SL.EMP.TOTL.SP.FE.ZS', 'SL.EMP.TOTL.SP.MA.ZS', 'SE.TER.ENRR.FE']
+# The share of the country's features another country needs values for to be
+# compared with it.
+MIN_SHARED = 0.5
+
+
+def build(df, features=FEATURES):
+    # From rows in the cleaned_data.csv layout.
+    year_columns = series_cube.year_columns(df.columns)
+    countries = sorted(df['Country Name'].dropna().unique())
+    by_code = {code: rows.set_index('Country Name')[year_columns].reindex(countries).to_numpy(dtype=float)
+               for code, rows in df[df['Series Code'].isin(features)].groupby('Series Code')}
+    codes = [code for code in features if code in by_code and not np.isnan(by_code[code]).all()]
+
+    # Countries x years x features.
+    values = np.stack([by_code[code] for code in codes], axis=2) if codes \
+        else np.empty((len(countries), len(year_columns), 0))
+    if codes:
+        values = StandardScaler().fit_transform(values.reshape(-1, len(codes))).reshape(values.shape)
+    known = ~np.isnan(values)
+    sums = np.zeros((len(countries), len(year_columns) + 1, len(codes)))
+    counts = np.zeros(sums.shape, dtype=int)
+    np.cumsum(np.where(known, values, 0), axis=1, out=sums[:, 1:])
+    np.cumsum(known, axis=1, out=counts[:, 1:])
+    return {'countries': countries,
+            'positions': {country: position for position, country in enumerate(countries)},
+            'years': series_cube.years_of(year_columns), 'features': codes, 'sums': sums, 'counts': counts}
+
+
+def means(index, first_year, last_year):
+    # Countries x features, NaN where a country has no value in the years.
+    first = bisect_left(index['years'], first_year)
+    last = bisect_right(index['years'], last_year)
+    counts = index['counts'][:, last] - index['counts'][:, first]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (index['sums'][:, last] - index['sums'][:, first]) / counts
+
+
+def nearest(index, country, first_year, last_year, k=5):
+    # [(country, distance)], nearest first; empty when the country has no
+    # values in the years.
+    if country not in index['positions']:
+        return []
+    vectors = means(index, first_year, last_year)
+    target = vectors[index['positions'][country]]
+    shared = ~np.isnan(vectors) & ~np.isnan(target)
+    compared = shared.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        distances = np.sqrt((np.where(shared, vectors - target, 0) ** 2).sum(axis=1) / compared)
+    distances[compared < max(1, MIN_SHARED * (~np.isnan(target)).sum())] = np.inf
+    distances[index['positions'][country]] = np.inf
+
+    k = min(k, int(np.isfinite(distances).sum()))
+    if k <= 0:
+        return []
+    closest = np.argpartition(distances, k - 1)[:k]
+    closest = closest[np.lexsort((closest, distances[closest]))]
+    return [(index['countries'][position], float(distances[position])) for position in closest]
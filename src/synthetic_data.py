@@ -0,0 +1,273 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+
+PRODUCTION_COUNTRIES = 266
+PRODUCTION_SERIES = 600
+FIRST_YEAR = 1960
+LAST_YEAR = 2022
+
+# Every series the dashboards reference, with its databank code and the kind
+# of values it holds.
+referenced_series = {
+    'SP.POP.TOTL': ('Population, total', 'population'),
+    'SP.POP.TOTL.FE.IN': ('Population, female', 'population_female'),
+    'SP.POP.TOTL.MA.IN': ('Population, male', 'population_male'),
+    'SP.POP.0014.TO': ('Population ages 0-14, total', 'population_young'),
+    'SL.TLF.TOTL.IN': ('Labor force, total', 'labor_force'),
+    'SL.EMP.TOTL.SP.FE.ZS': ('Employment to population ratio, 15+, female (%) (modeled ILO estimate)', 'percent'),
+    'SL.EMP.TOTL.SP.MA.ZS': ('Employment to population ratio, 15+, male (%) (modeled ILO estimate)', 'percent'),
+    'SL.EMP.TOTL.SP.ZS': ('Employment to population ratio, 15+, total (%) (modeled ILO estimate)', 'percent'),
+    'NY.GDP.MKTP.CD': ('GDP (current US$)', 'gdp'),
+    'NY.GDP.PCAP.CD': ('GDP per capita (Current US$)', 'gdp_per_capita'),
+    'SP.DYN.LE00.IN': ('Life expectancy at birth, total (years)', 'life_expectancy'),
+    'SP.DYN.CBRT.IN': ('Birth rate, crude (per 1,000 people)', 'crude_rate'),
+    'SP.DYN.CDRT.IN': ('Death rate, crude (per 1,000 people)', 'crude_rate'),
+    'SP.DYN.TFRT.IN': ('Fertility rate, total (births per woman)', 'fertility'),
+    'SP.DYN.AMRT.FE': ('Mortality rate, adult, female (per 1,000 female adults)', 'mortality'),
+    'SP.DYN.AMRT.MA': ('Mortality rate, adult, male (per 1,000 male adults)', 'mortality'),
+    'SH.DTH.IMRT.FE': ('Number of infant deaths, female', 'deaths'),
+    'SH.DTH.IMRT.MA': ('Number of infant deaths, male', 'deaths'),
+    'SH.IMM.IDPT': ('Immunization, DPT (% of children ages 12-23 months)', 'percent'),
+    'SH.IMM.MEAS': ('Immunization, measles (% of children ages 12-23 months)', 'percent'),
+    'SP.DYN.TO65.FE.ZS': ('Survival to age 65, female, (% of cohort)', 'percent'),
+    'SP.DYN.TO65.MA.ZS': ('Survival to age 65, male, (% of cohort)', 'percent'),
+    'SE.TER.ENRR.FE': ('School enrollment, tertiary, female (% gross)', 'percent'),
+    'SG.LAW.INDX': ('Women Business and the Law Index Score (scale 1-100)', 'score'),
+    'SG.LAW.INDX.EN': ('Women, Business and the Law: Entrepreneurship Indicator Score (scale 1-100)', 'score'),
+    'SG.LAW.INDX.MO': ('Women, Business and the Law: Mobility Indicator Score (scale 1-100)', 'score'),
+    'SG.LAW.INDX.PY': ('Women, Business and the Law: Pay Indicator Score (scale 1-100)', 'score'),
+    'SG.LAW.INDX.WP': ('Women, Business and the Law: Workplace Indicator Score (scale 1-100)', 'score'),
+    'SG.LAW.INDX.PE': ('Women, Business and the Law: Pension Indicator Score (scale 1-100)', 'score'),
+    'SG.LAW.INDX.PR': ('Women, Business and the Law: Parenthood Indicator Score (scale 1-100)', 'score'),
+    'SG.LAW.INDX.MR': ('Women, Business and the Law: Marriage Indicator Score (scale 1-100)', 'score'),
+    'SG.LAW.INDX.AS': ('Women, Business and the Law: Assets Indicator Score (scale 1-100)', 'score'),
+    'SG.GET.JOBS.EQ': ('A woman can get a job in the same way as a man (1=yes; 0=no)', 'binary'),
+    'SG.NGT.WORK.EQ': ('A woman can work at night in the same way as a man (1=yes; 0=no)', 'binary'),
+    'SG.DNG.WORK.DN.EQ': ('A woman can work in a job deemed dangerous in the same way as a man (1=yes; 0=no)', 'binary'),
+    'SG.IND.WORK.EQ': ('A woman can work in an industrial job in the same way as a man (1=yes; 0=no)', 'binary'),
+    'SG.DML.PRGW': ('Dismissal of pregnant workers is prohibited (1=yes; 0=no)', 'binary'),
+    'SG.LAW.EQRM.WK': ('Law mandates equal remuneration for females and males for work of equal value (1=yes; 0=no)', 'binary'),
+    'SH.PAR.LEVE': ('There is paid parental leave (1=yes; 0=no)', 'binary'),
+    'SH.PAR.LEVE.AL': ('Paid leave is available to fathers (1=yes; 0=no)', 'binary'),
+    'SH.MMR.LEVE.AL': ('Paid leave of at least 14 weeks available to mothers (1=yes; 0=no)', 'binary'),
+    'SG.AGE.FUPN.EQ': ('The age at which men and women can retire with full pension benefits is the same (1=yes; 0=no)', 'binary'),
+    'SG.AGE.PRPN.EQ': ('The age at which men and women can retire with partial pension benefits is the same (1=yes; 0=no)', 'binary'),
+    'SH.MMR.LEVE.GT': ('The government administers 100% of maternity leave benefits (1=yes; 0=no)', 'binary'),
+    'SG.LAW.NODC.HR': ('The law prohibits discrimination in employment based on gender (1=yes; 0=no)', 'binary'),
+    'SG.LAW.NMON.CO': ('The law provides for the valuation of nonmonetary contributions (1=yes; 0=no)', 'binary'),
+    'SG.AGE.RTRE.EQ': ('The mandatory retirement age for men and women is the same (1=yes; 0=no)', 'binary'),
+    'SG.LAW.CHMR': ('There are periods of absence due to childcare accounted for in pension benefits (1=yes; 0=no)', 'binary'),
+    'SG.LAW.CRHR.HR': ('Criminal penalties or civil remedies exist for sexual harassment in employment (1=yes; 0=no)', 'binary'),
+    'SG.LEG.SXHR.EM': ('There is legislation on sexual harassment in employment (1=yes; 0=no)', 'binary'),
+    'SG.OPN.BANK.EQ': ('A woman can open a bank account in the same way as a man (1=yes; 0=no)', 'binary'),
+    'SG.INH.ASST.EQ': ('Male and female surviving spouses have equal rights to inherit assets (1=yes; 0=no)', 'binary'),
+    'SG.OWN.PRRT.IM': ('Men and women have equal ownership rights to immovable property (1=yes; 0=no)', 'binary'),
+    'SG.ADM.AUTH.EQ': ('The law grants spouses equal administrative authority over assets during marriage (1=yes; 0=no)', 'binary'),
+    'SG.LAW.CRDD.GR': ('The law prohibits discrimination in access to credit based on gender (1=yes; 0=no)', 'binary'),
+    'SG.APL.PSPT.EQ': ('A woman can apply for a passport in the same way as a man (1=yes; 0=no)', 'binary'),
+    'SG.HLD.HEAD.EQ': ('A woman can be head of household in the same way as a man (1=yes; 0=no)', 'binary'),
+    'SG.LOC.LIVE.EQ': ('A woman can choose where to live in the same way as a man (1=yes; 0=no)', 'binary'),
+    'SG.OBT.DVRC.EQ': ('A woman can obtain a judgment of divorce in the same way as a man (1=yes; 0=no)', 'binary'),
+    'SG.MOV.HOME.EQ': ('A woman can travel outside her home in the same way as a man (1=yes; 0=no)', 'binary'),
+    'SG.MOV.CTRY.EQ': ('A woman can travel outside the country in the same way as a man (1=yes; 0=no)', 'binary'),
+    'SG.REM.RIGT.EQ': ('A woman has the same rights to remarry as a man (1=yes; 0=no)', 'binary'),
+    'SG.LAW.OBHB.MR': ('The law is free of legal provisions that require a married woman to obey her husband (1=yes; 0=no)', 'binary'),
+    'SG.LEG.DVAW': ('There is legislation specifically addressing domestic violence (1=yes; 0=no)', 'binary'),
+    'SG.BUS.REGT.EQ': ('A woman can register a business in the same way as a man (1=yes; 0=no)', 'binary'),
+    'SG.CNT.SIGN.EQ': ('A woman can sign a contract in the same way as a man (1=yes; 0=no)', 'binary'),
+}
+
+# Every country name the dashboards reference, spelled the way each one does.
+referenced_countries = {
+    'Afghanistan': 'AFG', 'Algeria': 'DZA', 'Argentina': 'ARG', 'Belgium': 'BEL',
+    'Brazil': 'BRA', 'Cameroon': 'CMR', 'Canada': 'CAN', 'Chile': 'CHL',
+    'China': 'CHN', 'Colombia': 'COL', 'Costa Rica': 'CRI',
+    'Dominican Republic': 'DOM', 'Ecuador': 'ECU', 'Egypt': 'EGX',
+    'Egypt, Arab Rep.': 'EGY', 'Ethiopia': 'ETH', 'France': 'FRA',
+    'Germany': 'DEU', 'Ghana': 'GHA', 'Guyana': 'GUY', 'India': 'IND',
+    'Indonesia': 'IDN', 'Iran': 'IRX', 'Iran, Islamic Rep.': 'IRN',
+    'Iraq': 'IRQ', 'Israel': 'ISR', 'Italy': 'ITA', 'Jamaica': 'JAM',
+    'Japan': 'JPN', 'Jordan': 'JOR', 'Kenya': 'KEN', 'Kuwait': 'KWT',
+    'Lebanon': 'LBN', 'Malaysia': 'MYS', 'Mexico': 'MEX', 'Morocco': 'MAR',
+    'Netherlands': 'NLD', 'Nigeria': 'NGA', 'Pakistan': 'PAK', 'Panama': 'PAN',
+    'Peru': 'PER', 'Philippines': 'PHL', 'Poland': 'POL', 'Qatar': 'QAT',
+    'Russian Federation': 'RUS', 'Saudi Arabia': 'SAU', 'South Africa': 'ZAF',
+    'Spain': 'ESP', 'Suriname': 'SUR', 'Sweden': 'SWE', 'Switzerland': 'CHE',
+    'Tanzania': 'TZA', 'Thailand': 'THA', 'Turkiye': 'TUR', 'Uganda': 'UGA',
+    'United Arab Emirates': 'ARE', 'United Kingdom': 'GBR',
+    'United States': 'USA', 'Uruguay': 'URY', 'Venezuela, RB': 'VEN',
+    'Vietnam': 'VNM',
+}
+
+# Ranges the values of each kind are drawn from, as (low, high).
+value_ranges = {
+    'population': (1e6, 1.4e9),
+    'labor_force': (0.35, 0.55),
+    'population_young': (0.15, 0.45),
+    'percent': (20, 99),
+    'gdp': (5e10, 2e13),
+    'gdp_per_capita': (500, 80000),
+    'life_expectancy': (45, 85),
+    'crude_rate': (5, 45),
+    'fertility': (1.1, 7.5),
+    'mortality': (50, 400),
+    'deaths': (100, 500000),
+    'score': (20, 100),
+}
+
+
+def year_columns(first_year, last_year):
+    return [f'{year} [YR{year}]' for year in range(first_year, last_year + 1)]
+
+
+def build_series_catalog(n_series, binary_fraction, rng):
+    catalog = [(code, name, kind) for code, (name, kind) in referenced_series.items()]
+    for i in range(max(0, n_series - len(catalog))):
+        kind = 'binary' if rng.random() < binary_fraction else 'percent'
+        suffix = ' (1=yes; 0=no)' if kind == 'binary' else ' (%)'
+        catalog.append((f'SYN.IND.{i:05d}', f'Synthetic indicator {i}{suffix}', kind))
+    return catalog
+
+
+def build_country_catalog(n_countries):
+    catalog = list(referenced_countries.items())
+    for i in range(max(0, n_countries - len(catalog))):
+        catalog.append((f'Synthetic economy {i}', f'X{i:05d}'))
+    return catalog
+
+
+def missing_mask(shape, years, pattern, missing_rate, rng, referenced=False, sparse_rows=None):
+    if pattern == 'none':
+        return np.zeros(shape, dtype=bool)
+    if pattern == 'random':
+        return rng.random(shape) < missing_rate
+
+    # 'realistic': early and latest years are mostly empty, referenced series are
+    # otherwise complete, other series are missing at a per-series rate and
+    # sparse economies (like the databank aggregates) have empty rows.
+    year_rate = np.zeros(len(years)) if referenced else np.full(
+        len(years), rng.uniform(0, 3 * missing_rate))
+    year_rate[years < 1970] = 0.6
+    year_rate[years > 2021] = 0.8
+    mask = rng.random(shape) < year_rate
+    if sparse_rows is not None:
+        mask[sparse_rows & (rng.random(shape[0]) < 0.4)] = True
+    return mask
+
+
+def generate_values(kind, n_countries, years, rng, population=None):
+    n_years = len(years)
+    t = (years - years[0]) / max(1, years[-1] - years[0])
+
+    if kind == 'binary':
+        reform_year = rng.integers(years[0], years[-1] + 30, size=(n_countries, 1))
+        return (years >= reform_year).astype(float)
+
+    if kind in ('population_female', 'population_male'):
+        share = rng.uniform(0.48, 0.52, size=(n_countries, 1))
+        share = share if kind == 'population_female' else 1 - share
+        return np.round(population * share)
+
+    if kind in ('labor_force', 'population_young'):
+        low, high = value_ranges[kind]
+        return np.round(population * rng.uniform(low, high, size=(n_countries, 1)))
+
+    low, high = value_ranges[kind]
+    if kind in ('population', 'gdp', 'gdp_per_capita', 'deaths'):
+        start = np.exp(rng.uniform(np.log(low), np.log(high), size=(n_countries, 1)))
+        growth = rng.uniform(-0.2, 3.0, size=(n_countries, 1))
+        values = start * (1 + growth * t)
+        return np.round(values) if kind in ('population', 'deaths') else values
+
+    start = rng.uniform(low, high, size=(n_countries, 1))
+    trend = rng.uniform(-0.3, 0.3, size=(n_countries, 1)) * (high - low)
+    noise = rng.normal(0, 0.01 * (high - low), size=(n_countries, n_years))
+    values = np.clip(start + trend * t + noise, low * 0.5, high)
+    if kind == 'score':
+        values = np.round(np.maximum.accumulate(values, axis=1) / 3.125) * 3.125
+    return values
+
+
+def generate(output, n_countries=PRODUCTION_COUNTRIES, n_series=PRODUCTION_SERIES,
+             first_year=FIRST_YEAR, last_year=LAST_YEAR, missing_rate=0.02,
+             missing_pattern='realistic', binary_fraction=0.4, seed=0,
+             countries_per_chunk=50):
+    rng = np.random.default_rng(seed)
+    years = np.arange(first_year, last_year + 1)
+    columns = year_columns(first_year, last_year)
+    series_catalog = build_series_catalog(n_series, binary_fraction, rng)
+    country_catalog = build_country_catalog(n_countries)
+
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    rows = 0
+    header = True
+    for start in range(0, len(country_catalog), countries_per_chunk):
+        chunk = country_catalog[start:start + countries_per_chunk]
+        names = np.array([name for name, _ in chunk], dtype=object)
+        codes = np.array([code for _, code in chunk], dtype=object)
+        population = generate_values('population', len(chunk), years, rng)
+        sparse_rows = np.array([code.startswith('X') for code in codes]) & (
+            rng.random(len(chunk)) < 0.15)
+
+        frames = []
+        for series_code, series_name, kind in series_catalog:
+            if series_code == 'SP.POP.TOTL':
+                values = population
+            else:
+                values = generate_values(kind, len(chunk), years, rng, population)
+            mask = missing_mask(values.shape, years, missing_pattern, missing_rate, rng,
+                                referenced=series_code in referenced_series,
+                                sparse_rows=sparse_rows)
+            values = np.where(mask, np.nan, values)
+            frame = pd.DataFrame(values, columns=columns)
+            frame.insert(0, 'Country Name', names)
+            frame.insert(1, 'Country Code', codes)
+            frame.insert(2, 'Series Name', series_name)
+            frame.insert(3, 'Series Code', series_code)
+            frames.append(frame)
+
+        block = pd.concat(frames, ignore_index=True)
+        block.to_csv(output, mode='w' if header else 'a', header=header,
+                     index=False, na_rep='..')
+        header = False
+        rows += len(block)
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate a synthetic World Bank databank extract.')
+    parser.add_argument('--output', default='../data/data.csv')
+    parser.add_argument('--scale', type=float, default=1,
+                        help='multiplies the number of countries (rows)')
+    parser.add_argument('--countries', type=int, default=PRODUCTION_COUNTRIES)
+    parser.add_argument('--series', type=int, default=PRODUCTION_SERIES)
+    parser.add_argument('--first-year', type=int, default=FIRST_YEAR)
+    parser.add_argument('--last-year', type=int, default=LAST_YEAR)
+    parser.add_argument('--missing-rate', type=float, default=0.02)
+    parser.add_argument('--missing-pattern', default='realistic',
+                        choices=['realistic', 'random', 'none'])
+    parser.add_argument('--binary-fraction', type=float, default=0.4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = generate(args.output, n_countries=int(args.countries * args.scale),
+                    n_series=args.series, first_year=args.first_year,
+                    last_year=args.last_year, missing_rate=args.missing_rate,
+                    missing_pattern=args.missing_pattern,
+                    binary_fraction=args.binary_fraction, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    print(f'Wrote {rows} rows to {args.output} in {elapsed:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
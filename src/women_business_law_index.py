@@ -2,8 +2,11 @@ import plotly.graph_objects as go
 from dash.dependencies import Input, Output
 from dash import html
 from dash import dcc
-import dash
-import pandas as pd
+from dash_server import create_app, dump_metrics_on_exit
+import panel_store
+import series_cube
+import rankings
+import hot_reload
 
 
 categories = {'SG.LAW.INDX': 'Women Business and the Law Index Score (1-100)',
@@ -18,32 +21,50 @@ categories = {'SG.LAW.INDX': 'Women Business and the Law Index Score (1-100)',
 
 countries = ['Germany', 'Spain', 'United States', 'Argentina', 'China', 'India', 'Iran', 'Afghanistan']
 
-app = dash.Dash(__name__)
-app.layout = html.Div([
-    dcc.Dropdown(
-        id='category-dropdown',
-        options=[{'label': i[1], 'value': i[0]} for i in categories.items()],
-        value='SG.LAW.INDX'
-    ),
-    dcc.Dropdown(
-        id='first-year-dropdown',
-        options=[{'label': year, 'value': year} for year in [year for year in range(1970, 2021, 1)]],
-        value='1970'
-    ),
-    dcc.Dropdown(
-        id='second-year-dropdown',
-        options=[{'label': year, 'value': year} for year in [year for year in range(1970, 2021, 1)]],
-        value='2020'
-    ),
-    html.H1(id='chart-title', children='Two Pie Charts', style={'text-align': 'center', 'fontFamily': 'Calibri'}),
-    html.Div(children=[
-        dcc.Graph(id='pie-chart-1',
-                  className='six columns',
-                  style={'float': 'left'}),
-        dcc.Graph(id='pie-chart-2',
-                  className='six columns',
-                  style={'float': 'right', 'margin-left': '5%', 'margin-right': '5%'})])
-])
+DATA_PATH = '../data/cleaned_data.csv'
+
+
+def load_data(path):
+    df = panel_store.read_csv(path, columns=['Country Name', 'Series Code'], series_codes=list(categories))
+    return df, series_cube.years_of(df.columns), rankings.from_wide(df, list(categories))
+
+
+df, years, law_ranks = load_data(DATA_PATH)
+hot_reload.register(__name__, DATA_PATH, load_data, ['df', 'years', 'law_ranks'])
+
+app = create_app(__name__)
+
+
+def serve_layout():
+    return html.Div([
+        dcc.Dropdown(
+            id='category-dropdown',
+            options=[{'label': i[1], 'value': i[0]} for i in categories.items()],
+            value='SG.LAW.INDX'
+        ),
+        dcc.Dropdown(
+            id='first-year-dropdown',
+            options=[{'label': year, 'value': year} for year in years],
+            value=years[0]
+        ),
+        dcc.Dropdown(
+            id='second-year-dropdown',
+            options=[{'label': year, 'value': year} for year in years],
+            value=years[-1]
+        ),
+        html.H1(id='chart-title', children='Two Pie Charts', style={'text-align': 'center', 'fontFamily': 'Calibri'}),
+        html.Div(children=[
+            dcc.Graph(id='pie-chart-1',
+                      className='six columns',
+                      style={'float': 'left'}),
+            dcc.Graph(id='pie-chart-2',
+                      className='six columns',
+                      style={'float': 'right', 'margin-left': '5%', 'margin-right': '5%'})]),
+        html.Div(id='leaderboard', style={'clear': 'both'})
+    ])
+
+
+app.layout = serve_layout
 
 
 @app.callback(
@@ -103,8 +124,17 @@ def update_graph(category_code, first_year, second_year):
 colors_antique = ['#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A', '#19D3F3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
 colors_pastel = ['#B6E880', '#AB63FA', '#FFA15A', '#FF6692', '#19D3F3', '#EF553B', '#FF97FF', '#636EFA', '#00CC96', '#FECB52']
 
-df = pd.read_csv('../data/cleaned_data.csv')
+
+@app.callback(
+    Output('leaderboard', 'children'),
+    [Input('category-dropdown', 'value'),
+     Input('second-year-dropdown', 'value')]
+)
+def update_leaderboard(category_code, year):
+    return rankings.leaderboard(law_ranks, category_code, year, countries)
+
 
 if __name__ == '__main__':
+    dump_metrics_on_exit()
     app.run_server(debug=True)
 
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+import cleaning
+import synthetic_data
+
+
+@pytest.fixture(scope='session')
+def extract(tmp_path_factory):
+    # A small synthetic databank extract. Enough countries for some sparse
+    # ones, and early years that are mostly empty, so the cleaning removes
+    # countries and years.
+    path = str(tmp_path_factory.mktemp('extract') / 'data.csv')
+    synthetic_data.generate(path, n_countries=150, n_series=120, first_year=1960, last_year=2019, seed=1)
+    # A country's rows together, as in a databank download, which the
+    # incremental cleaning needs.
+    data = cleaning.read_data(path)
+    data.sort_values('Country Code', kind='stable').to_csv(path, index=False, na_rep='..')
+    return path
+
+
+def revised_extract(path, output, new_year=True):
+    # The extract with some values of the latest years revised and, with
+    # new_year, some gone and a new year, which the incremental cleaning
+    # cannot splice in.
+    data = cleaning.read_data(path)
+    rng = np.random.default_rng(2)
+    year_columns = cleaning.year_columns_of(data.columns)
+    for column in year_columns[-3:]:
+        known = np.flatnonzero(data[column].notna().to_numpy())
+        rows = data.index[rng.choice(known, 25, replace=False)]
+        data.loc[rows[:20], column] = '12.5'
+        if new_year:
+            data.loc[rows[20:], column] = np.nan
+    if new_year:
+        year = int(year_columns[-1][:4]) + 1
+        data[f'{year} [YR{year}]'] = data[year_columns[-1]]
+    data.to_csv(output, index=False, na_rep='..')
+
+
+@pytest.fixture
+def revise():
+    return revised_extract
+
+
+@pytest.fixture(scope='session')
+def cleaned(extract, tmp_path_factory):
+    # The cleaned_data.csv of the extract.
+    output_dir = tmp_path_factory.mktemp('cleaned')
+    cleaning.polish(extract, str(output_dir), force=True)
+    return str(output_dir / 'cleaned_data.csv')
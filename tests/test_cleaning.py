@@ -0,0 +1,27 @@
+import pytest
+
+import cleaning
+
+
+def read_outputs(output_dir):
+    return {name: (output_dir / name).read_bytes() for name in cleaning.OUTPUT_NAMES}
+
+
+def test_streaming_polish_writes_the_same_files(extract, tmp_path):
+    cleaning.polish(extract, str(tmp_path / 'memory'), force=True)
+    for chunksize in [333, 100000]:
+        cleaning.polish(extract, str(tmp_path / f'stream-{chunksize}'), chunksize=chunksize, force=True)
+        assert read_outputs(tmp_path / f'stream-{chunksize}') == read_outputs(tmp_path / 'memory')
+
+
+@pytest.mark.parametrize('new_year', [False, True])
+def test_incremental_polish_matches_a_full_rebuild(extract, revise, tmp_path, new_year):
+    incremental = tmp_path / 'incremental'
+    cleaning.polish(extract, str(incremental), force=True)
+    revised = str(tmp_path / 'revised.csv')
+    revise(extract, revised, new_year)
+
+    report = cleaning.polish(revised, str(incremental))
+    assert report['rebuild']['incremental'] is not new_year
+    cleaning.polish(revised, str(tmp_path / 'full'), force=True)
+    assert read_outputs(incremental) == read_outputs(tmp_path / 'full')
@@ -0,0 +1,57 @@
+import gzip
+
+import pytest
+from dash import Input, Output, html
+
+import dash_server
+
+
+@pytest.fixture
+def client():
+    app = dash_server.create_app(__name__)
+    app.layout = html.Div([html.Div(id='text'), html.Div(id='echo')])
+
+    @app.callback(Output('echo', 'children'), Input('text', 'children'))
+    def echo(text):
+        return text
+
+    @app.server.route('/text/<int:size>')
+    def text(size):
+        return 'x' * size
+
+    return app.server.test_client()
+
+
+def test_responses_above_the_threshold_are_gzipped(client):
+    size = dash_server.COMPRESSION_MIN_BYTES
+    response = client.get(f'/text/{size}', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.get_data()) == b'x' * size
+
+
+@pytest.mark.parametrize('size, accept_encoding', [(dash_server.COMPRESSION_MIN_BYTES - 1, 'gzip'),
+                                                   (dash_server.COMPRESSION_MIN_BYTES, 'identity')])
+def test_small_responses_and_clients_without_gzip_get_the_body_as_is(client, size, accept_encoding):
+    response = client.get(f'/text/{size}', headers={'Accept-Encoding': accept_encoding})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == b'x' * size
+
+
+def metric_value(client, line_start):
+    lines = client.get('/metrics').get_data(as_text=True).splitlines()
+    values = [float(line.split()[-1]) for line in lines if line.startswith(line_start + ' ')]
+    return values[0] if values else 0
+
+
+def test_callbacks_are_counted_in_the_duration_histogram(client):
+    count = 'dash_callback_duration_seconds_count{callback="echo.children"}'
+    every_bucket = 'dash_callback_duration_seconds_bucket{callback="echo.children",le="+Inf"}'
+    before = metric_value(client, count)
+    response = client.post('/_dash-update-component', json={
+        'output': 'echo.children', 'outputs': {'id': 'echo', 'property': 'children'},
+        'inputs': [{'id': 'text', 'property': 'children', 'value': 'hello'}], 'changedPropIds': ['text.children']})
+    assert response.status_code == 200
+    assert metric_value(client, count) == before + 1
+    assert metric_value(client, every_bucket) == before + 1
+    assert metric_value(client, 'dash_callback_calls_total{callback="echo.children"}') == before + 1
@@ -0,0 +1,31 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+import data_cache
+
+
+@pytest.fixture
+def path(cleaned, tmp_path):
+    # A copy, so every test starts without a cached parquet file.
+    return shutil.copy(cleaned, tmp_path / 'cleaned_data.csv')
+
+
+@pytest.mark.parametrize('columns, series_codes, years', [
+    (None, None, None),
+    (['Country Name', 'Series Code'], None, None),
+    (None, ['SP.POP.TOTL', 'NY.GDP.MKTP.CD', 'NOT.A.CODE'], None),
+    (['Country Name', 'Series Name'], ['SP.POP.TOTL'], (2000, 2010)),
+])
+def test_read_csv_equals_the_filtered_pandas_read(path, columns, series_codes, years):
+    expected = pd.read_csv(path)
+    if series_codes is not None:
+        expected = expected[expected['Series Code'].isin(series_codes)].reset_index(drop=True)
+    expected = expected[[column for column in expected.columns
+                         if (column[:4].isdigit() and (years is None or years[0] <= int(column[:4]) <= years[1]))
+                         or (not column[:4].isdigit() and (columns is None or column in columns))]]
+
+    # From the CSV, then from the parquet copy made by the first read.
+    for _ in range(2):
+        pd.testing.assert_frame_equal(data_cache.read_csv(path, columns, series_codes, years), expected)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import derived_series
+
+
+NAMES = {'SL.TLF.TOTL.IN': 'Labor force', 'SP.POP.TOTL': 'Population', 'SL.EMP.TOTL.SP.ZS': 'Employment (%)',
+         'SP.POP.0014.TO': 'Population 0-14'}
+
+
+def test_derived_series_follow_their_expressions():
+    cube = pd.DataFrame({'Labor force': [50.0, 0.0, np.nan], 'Population': [200.0, 0.0, 10.0],
+                         'Employment (%)': [60.0, 10.0, 5.0], 'Population 0-14': [50.0, 0.0, 4.0]})
+    derived = derived_series.add(cube, NAMES)
+    np.testing.assert_allclose(derived['Labor force proportion'], [25.0, np.nan, np.nan])
+    np.testing.assert_allclose(derived['Employment to population ratio, total (%)'], [45.0, np.nan, 3.0])
+
+
+def test_a_series_without_its_inputs_comes_out_empty():
+    cube = pd.DataFrame({'Labor force': [50.0], 'Population': [200.0]})
+    derived = derived_series.add(cube, NAMES)
+    assert derived['Labor force proportion'].tolist() == [25.0]
+    assert derived['Employment to population ratio, total (%)'].isna().all()
+
+
+def test_a_series_cannot_take_the_name_of_one_in_the_data():
+    cube = pd.DataFrame({'Labor force proportion': [1.0]})
+    with pytest.raises(ValueError, match='has the name of a series in the data'):
+        derived_series.add(cube, NAMES)
+
+
+@pytest.mark.parametrize('expression', ['SP.POP.TOTL ** 2', 'abs(SP.POP.TOTL)', "SP.POP.TOTL + 'a'"])
+def test_expressions_are_limited_to_arithmetic(expression):
+    with pytest.raises(ValueError):
+        derived_series.parse(expression)
+
+
+def test_gender_pairs_match_fe_and_ma_codes():
+    series_names = {'SP.POP.TOTL.FE.IN': 'Population, female', 'SP.POP.TOTL.MA.IN': 'Population, male',
+                    'SL.TLF.CACT.FE.ZS': 'Labor force participation rate, female (% of female population)',
+                    'SP.POP.TOTL': 'Population, total', 'SE.TER.ENRR.FE': 'School enrollment, tertiary, female'}
+    assert derived_series.gender_pairs(series_names) == [('Population', 'Population, female', 'Population, male')]
+
+
+def test_gaps_and_ratios_of_a_pair():
+    series_names = {'SP.POP.TOTL.FE.IN': 'Population, female', 'SP.POP.TOTL.MA.IN': 'Population, male'}
+    cube = pd.DataFrame({'Population, female': [60.0, 5.0, np.nan], 'Population, male': [40.0, 0.0, 3.0]})
+    derived = derived_series.add(cube, series_names)
+    np.testing.assert_allclose(derived[derived_series.GAP.format('Population')], [20.0, 5.0, np.nan])
+    # No ratio where the male value is 0.
+    np.testing.assert_allclose(derived[derived_series.RATIO.format('Population')], [1.5, np.nan, np.nan])
+    assert derived_series.gap_labels(derived.columns) == ['Population']
+    assert derived_series.columns_of(derived.columns) == [
+        column for column in derived.columns if column not in cube.columns]
+
+
+def test_a_gap_cannot_take_the_name_of_another_column():
+    series_names = {'SP.POP.TOTL.FE.IN': 'Population, female', 'SP.POP.TOTL.MA.IN': 'Population, male'}
+    cube = pd.DataFrame({'Population, female': [1.0], 'Population, male': [1.0],
+                         derived_series.GAP.format('Population'): [0.0]})
+    with pytest.raises(ValueError, match='has the name of another column'):
+        derived_series.add(cube, series_names)
@@ -0,0 +1,48 @@
+import base64
+
+import numpy as np
+import plotly.graph_objects as go
+
+import figure_payload
+
+
+def animated_figure(years):
+    frames = [go.Frame(name=str(year), data=[go.Scatter(x=[1.0, 2.0, 3.0], y=[year + 0.123456, year, 0.001],
+                                                        name='trace')],
+                       layout={'title': {'text': 'Fixed'}})
+              for year in years]
+    steps = [{'args': [[str(year)]], 'label': str(year), 'method': 'animate'} for year in years]
+    return go.Figure(data=[go.Scatter(x=[1.0, 2.0, 3.0], y=[0.0, 0.0, 0.001], name='trace')], frames=frames,
+                     layout={'title': {'text': 'Fixed'}, 'sliders': [{'steps': steps}]})
+
+
+def test_frames_keep_every_nth_and_the_last_and_drop_what_never_changes():
+    reduced = figure_payload.reduce_figure(animated_figure(range(2000, 2010)), 'chart', frame_step=4,
+                                           typed_arrays=False)
+    names = ['2000', '2004', '2008', '2009']
+    assert [frame['name'] for frame in reduced['frames']] == names
+    assert [step['args'][0][0] for step in reduced['layout']['sliders'][0]['steps']] == names
+    for frame in reduced['frames']:
+        assert 'layout' not in frame
+        assert 'x' not in frame['data'][0]
+        assert 'y' in frame['data'][0]
+
+
+def test_floats_are_only_rounded_when_asked(monkeypatch):
+    monkeypatch.setattr(figure_payload, 'FLOAT_DECIMALS', None)
+    fig = animated_figure([2000, 2001])
+    kept = figure_payload.reduce_figure(fig, 'chart', typed_arrays=False)
+    assert list(kept['frames'][0]['data'][0]['y']) == [2000.123456, 2000, 0.001]
+
+    rounded = figure_payload.reduce_figure(fig, 'chart', decimals=2, typed_arrays=False)
+    assert list(rounded['frames'][0]['data'][0]['y']) == [2000.12, 2000, 0]
+
+
+def test_typed_arrays_keep_the_shape_of_2d_arrays():
+    z = np.arange(12, dtype=float).reshape(3, 4)
+    encoded = figure_payload.encode_array(z, float_dtype='f8', typed_arrays=True)
+    assert encoded['dtype'] == 'f8'
+    assert encoded['shape'] == '3, 4'
+    decoded = np.frombuffer(base64.b64decode(encoded['bdata']), dtype='<f8').reshape(3, 4)
+    np.testing.assert_array_equal(decoded, z)
+    assert 'shape' not in figure_payload.encode_array(z[0], float_dtype='f8', typed_arrays=True)
@@ -0,0 +1,41 @@
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+import pytest
+from plotly.subplots import make_subplots
+
+import figure_spec_benchmark
+import figure_specs
+
+
+def as_json(fig):
+    return json.loads(pio.to_json(fig, validate=False))
+
+
+def test_traces_equal_the_graph_objects_traces():
+    x, y = np.arange(2000, 2005), np.linspace(0, 1, 5)
+    spec = figure_specs.figure([figure_specs.line_trace(x, y, 'A', 'red'),
+                                figure_specs.bar_trace(list(x), list(y), 'B', 'blue', opacity=0.5)],
+                               figure_specs.grid_layout('Title', 'Year', 'Value'))
+    fig = go.Figure(data=[go.Scatter(x=x, y=y, mode='lines', name='A', line={'color': 'red'}),
+                          go.Bar(x=list(x), y=list(y), name='B', marker={'color': 'blue'}, opacity=0.5)])
+    fig.update_layout(title={'text': 'Title', 'y': 0.9, 'x': 0.5, 'xanchor': 'center', 'yanchor': 'top'},
+                      xaxis={'title': 'Year', **figure_specs.GRID_AXIS},
+                      yaxis={'title': 'Value', **figure_specs.GRID_AXIS},
+                      legend={'y': -0.5, **figure_specs.BOTTOM_LEGEND}, **figure_specs.TRANSPARENT_BACKGROUND)
+    assert as_json(spec) == as_json(fig.to_plotly_json())
+
+
+def test_subplot_row_equals_make_subplots():
+    fig = make_subplots(rows=1, cols=3, subplot_titles=['a', 'b', 'c'])
+    assert as_json(figure_specs.subplot_row(3, ['a', 'b', 'c'])) == \
+        {key: value for key, value in as_json(fig.to_plotly_json()['layout']).items() if key != 'template'}
+
+
+@pytest.mark.parametrize('name', sorted(figure_spec_benchmark.benchmarks))
+def test_dashboard_figures_equal_their_graph_objects_versions(name):
+    plotly_builder, spec_builder = figure_spec_benchmark.benchmarks[name]
+    args = figure_spec_benchmark.sample_data(3)
+    assert as_json(spec_builder(*args)) == as_json(plotly_builder(*args))
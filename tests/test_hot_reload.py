@@ -0,0 +1,32 @@
+import threading
+
+from hot_reload import SnapshotLock
+
+
+def test_snapshot_lock_lets_a_waiting_swap_go_first():
+    lock = SnapshotLock()
+    lock.acquire_read()
+    events = []
+
+    def swap():
+        lock.acquire_write()
+        events.append('swap')
+        lock.release_write()
+
+    def request():
+        lock.acquire_read()
+        events.append('request')
+        lock.release_read()
+
+    swapper = threading.Thread(target=swap)
+    swapper.start()
+    while not lock._writers_waiting:
+        pass
+    requester = threading.Thread(target=request)
+    requester.start()
+    requester.join(0.1)
+    assert events == []
+    lock.release_read()
+    swapper.join(5)
+    requester.join(5)
+    assert events == ['swap', 'request']
@@ -0,0 +1,46 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+import derived_series
+import panel_store
+import region_aggregates
+import series_cube
+
+
+@pytest.fixture
+def path(cleaned, tmp_path):
+    return shutil.copy(cleaned, tmp_path / 'cleaned_data.csv')
+
+
+def sorted_rows(rows):
+    return rows.sort_values(['Country', 'Year']).reset_index(drop=True)
+
+
+def test_sqlite_store_rows_equal_the_memory_cube(path):
+    memory = derived_series.add(series_cube.load(path), panel_store.code_names(path))
+    store = panel_store.load(path, backend='sqlite')
+    assert store.columns() == memory.columns.tolist()
+    assert sorted(store.countries()) == sorted(series_cube.countries(memory))
+
+    countries = sorted(series_cube.countries(memory))[::7]
+    pd.testing.assert_frame_equal(sorted_rows(store.country_rows(countries)),
+                                  sorted_rows(series_cube.country_rows(memory, countries)), check_dtype=False)
+    for year in store.years()[::10]:
+        pd.testing.assert_frame_equal(sorted_rows(store.year_rows(year)),
+                                      sorted_rows(series_cube.year_rows(memory, year)), check_dtype=False)
+
+
+def test_region_rows_are_the_same_in_both_backends(path, monkeypatch):
+    memory = derived_series.add(series_cube.load(path), panel_store.code_names(path))
+    countries = sorted(series_cube.countries(memory))
+    regions = {'First': countries[:5], 'Second': countries[3:12]}
+    labels = region_aggregates.labels(regions)
+
+    cubes = {}
+    for backend in ['memory', 'sqlite']:
+        monkeypatch.setattr(panel_store, 'BACKEND', backend)
+        cubes[backend] = sorted_rows(series_cube.country_rows(panel_store.cube(path, regions=regions), labels))
+    assert len(cubes['memory']) > 0
+    pd.testing.assert_frame_equal(cubes['sqlite'], cubes['memory'], check_dtype=False)
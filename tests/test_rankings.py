@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+import rankings
+
+
+def test_ranks_and_top_k_match_sorting():
+    rng = np.random.default_rng(4)
+    countries = [f'Country {i}' for i in range(30)]
+    values = rng.integers(0, 10, (30, 5)).astype(float)
+    values[rng.random(values.shape) < 0.2] = np.nan
+    index = rankings.build({'S': values}, countries, range(2000, 2005))
+
+    for position, year in enumerate(range(2000, 2005)):
+        column = pd.Series(values[:, position], index=countries).dropna()
+        dense = column.rank(method='dense', ascending=False).astype(int)
+        assert rankings.count(index, 'S', year) == len(column)
+        assert all(rankings.rank(index, 'S', year, country) == dense.get(country, 0) for country in countries)
+        assert list(rankings.top(index, 'S', year, 5)['Value']) == sorted(column, reverse=True)[:5]
+        assert list(rankings.bottom(index, 'S', year, 5)['Value']) == sorted(column)[:5]
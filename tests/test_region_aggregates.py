@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import derived_series
+import panel_store
+import region_aggregates
+
+
+def test_region_aggregates_match_groupby():
+    rng = np.random.default_rng(3)
+    countries = ['A', 'B', 'C', 'D']
+    rows = pd.DataFrame({'Country': np.repeat(countries, 3), 'Year': np.tile([2000, 2001, 2002], 4),
+                         'Country Code': np.repeat(countries, 3),
+                         'GDP': rng.random(12) * 100, 'Population, total': rng.random(12) * 1000})
+    rows.loc[[1, 5], 'GDP'] = np.nan
+    regions = {'North': ['A', 'B'], 'All': ['A', 'B', 'C', 'D']}
+
+    aggregates = region_aggregates.aggregate(rows, regions).set_index(['Country', 'Year'])
+    for region, members in regions.items():
+        group = rows[rows['Country'].isin(members)].groupby('Year')
+        weighted = rows.assign(w=rows['GDP'] * rows['Population, total'],
+                               p=rows['Population, total'].where(rows['GDP'].notna()))
+        weighted = weighted[weighted['Country'].isin(members)].groupby('Year')
+        expected = {'sum': group['GDP'].sum(min_count=1), 'mean': group['GDP'].mean(),
+                    'population-weighted mean': weighted['w'].sum() / weighted['p'].sum()}
+        for statistic, values in expected.items():
+            got = aggregates.loc[region_aggregates.label(region, statistic), 'GDP']
+            np.testing.assert_allclose(got.to_numpy(), values.to_numpy())
+
+
+def test_region_derived_series_come_from_the_aggregated_series():
+    rows = pd.DataFrame({'Country': ['A', 'B'], 'Year': [2000, 2000], 'Country Code': ['A', 'B'],
+                         'Female': [10.0, 30.0], 'Male': [20.0, 20.0]})
+    names = {'X.FE': 'Female', 'X.MA': 'Male'}
+    rows = derived_series.add(rows, names)
+    ratio = derived_series.RATIO.format('Female')
+
+    aggregates = panel_store.region_rows(rows, {'AB': ['A', 'B']}, names).set_index('Country')
+    assert list(aggregates.columns) == list(rows.set_index('Country').columns)
+    assert aggregates.loc['AB (sum)', ratio] == 1
+    assert aggregates.loc['AB (mean)', derived_series.GAP.format('Female')] == 0
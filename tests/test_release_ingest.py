@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+import cleaning
+import data_cache
+import release_ingest
+import series_cube
+
+
+def test_patched_cube_equals_the_rebuilt_cube(extract, revise, tmp_path):
+    cleaning.polish(extract, str(tmp_path), force=True)
+    cleaned_path = str(tmp_path / 'cleaned_data.csv')
+    old_cleaned = data_cache.read_csv(cleaned_path)
+    old_cube = series_cube.build(old_cleaned)
+
+    stored, notes = release_ingest.keyed(cleaning.read_data(extract))
+    revised = str(tmp_path / 'revised.csv')
+    revise(extract, revised)
+    release, _ = release_ingest.keyed(cleaning.read_data(revised))
+    release = release[['Country Name', 'Series Name'] + cleaning.year_columns_of(release.columns)[-4:]]
+
+    changes = release_ingest.diff(stored, release)
+    assert changes['new_years'] == cleaning.year_columns_of(release.columns)[-1:]
+    assert changes['new_rows'] == 0
+    assert 0 < changes['revised_cells'] <= 75
+
+    merged = release_ingest.merge(stored, notes, release)
+    pd.testing.assert_frame_equal(merged.dropna(subset=release_ingest.KEYS).reset_index(drop=True),
+                                  cleaning.read_data(revised).dropna(subset=release_ingest.KEYS)
+                                  .reset_index(drop=True))
+
+    release_ingest.write_panel(merged, extract.replace('data.csv', 'merged.csv'))
+    cleaning.polish(extract.replace('data.csv', 'merged.csv'), str(tmp_path))
+    new_cleaned = data_cache.read_csv(cleaned_path)
+    patched = series_cube.patch(old_cube, series_cube.cell_changes(old_cleaned, new_cleaned))
+    assert not patched.equals(old_cube)
+    pd.testing.assert_frame_equal(patched, series_cube.build(new_cleaned), check_dtype=False)
+
+
+def test_keyed_rejects_a_row_that_appears_twice(extract):
+    data = cleaning.read_data(extract)
+    data = pd.concat([data, data.iloc[[3]]], ignore_index=True)
+    with pytest.raises(ValueError, match='appears more than once'):
+        release_ingest.keyed(data)
@@ -0,0 +1,52 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+import dash_server
+import hot_reload
+
+
+@pytest.fixture
+def path(cleaned, tmp_path, monkeypatch):
+    # A copy of the data, registered as this module's, so the API serves it.
+    path = str(shutil.copy(cleaned, tmp_path / 'cleaned_data.csv'))
+    monkeypatch.setattr(hot_reload, 'datasets', {})
+    monkeypatch.setattr(hot_reload, 'start_watcher', lambda: None)
+    hot_reload.register(__name__, path, lambda path: [], [])
+    return path
+
+
+@pytest.fixture
+def client(path):
+    return dash_server.create_server(__name__).test_client()
+
+
+URL = '/api/series?codes=SP.POP.TOTL&years=2000-2010'
+
+
+def test_a_matching_etag_gets_a_304(client):
+    first = client.get(URL)
+    assert first.status_code == 200
+    assert first.json
+
+    repeated = client.get(URL, headers={'If-None-Match': first.headers['ETag']})
+    assert repeated.status_code == 304
+    assert repeated.get_data() == b''
+    assert repeated.headers['ETag'] == first.headers['ETag']
+    assert client.get('/api/series?codes=NY.GDP.MKTP.CD&years=2000-2010',
+                      headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+
+
+def test_a_reload_of_changed_data_changes_the_etag(client, path):
+    first = client.get(URL)
+    data = pd.read_csv(path)
+    data.loc[data['Series Code'] == 'SP.POP.TOTL', '2005 [YR2005]'] += 1
+    data.to_csv(path, index=False)
+    hot_reload.reload()
+
+    after = client.get(URL, headers={'If-None-Match': first.headers['ETag']})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != first.headers['ETag']
+    assert [row['2005 [YR2005]'] for row in after.json] == \
+        [row['2005 [YR2005]'] + 1 for row in first.json]
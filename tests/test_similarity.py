@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+import similarity
+
+
+def test_nearest_countries_match_brute_force():
+    rng = np.random.default_rng(5)
+    countries = [f'Country {i}' for i in range(25)]
+    years = list(range(2000, 2010))
+    rows = []
+    for code in similarity.FEATURES[:4]:
+        values = rng.normal(50, 10, (len(countries), len(years)))
+        values[rng.random(values.shape) < 0.3] = np.nan
+        frame = pd.DataFrame(values, columns=[f'{year} [YR{year}]' for year in years])
+        frame.insert(0, 'Country Name', countries)
+        frame.insert(1, 'Series Code', code)
+        rows.append(frame)
+    df = pd.concat(rows, ignore_index=True)
+    index = similarity.build(df)
+
+    long = df.melt(id_vars=['Country Name', 'Series Code'], var_name='Year')
+    long['value'] = long.groupby('Series Code')['value'].transform(lambda v: (v - v.mean()) / v.std(ddof=0))
+    long = long[long['Year'].str[:4].astype(int).between(2003, 2007)]
+    means = long.pivot_table(index='Country Name', columns='Series Code', values='value')
+    means = means.reindex(index=countries, columns=index['features'])
+    target = means.loc['Country 0']
+    expected = {}
+    for country in countries[1:]:
+        shared = means.loc[country].notna() & target.notna()
+        if shared.sum() >= max(1, similarity.MIN_SHARED * target.notna().sum()):
+            expected[country] = np.sqrt(((means.loc[country][shared] - target[shared]) ** 2).mean())
+    expected = sorted(expected.items(), key=lambda item: (item[1], countries.index(item[0])))[:5]
+
+    nearest = similarity.nearest(index, 'Country 0', 2003, 2007, 5)
+    assert [country for country, _ in nearest] == [country for country, _ in expected]
+    np.testing.assert_allclose([distance for _, distance in nearest], [distance for _, distance in expected])
@@ -0,0 +1,166 @@
+import argparse
+import hashlib
+import inspect
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import rankings
+import women_rights
+
+
+region_slugs = {
+    'Europe': 'europe',
+    'Middle East': 'middle-east',
+    'Asia': 'asia',
+    'Africa': 'africa',
+    'South America': 's-america',
+    'North and middle America': 'n-america',
+}
+
+def law_score_map(selected_countries, year):
+    # update_figure also returns the leaderboard, which is not in the image.
+    figure, _ = women_rights.update_figure(selected_countries, year)
+    return figure
+
+
+def law_score_ranks(countries, year):
+    # The hover text has each country's rank among all countries, which the
+    # region's rows alone do not determine.
+    return [[rankings.rank(women_rights.law_ranks, women_rights.LAW_INDEX, year, country) for country in countries],
+            rankings.count(women_rights.law_ranks, women_rights.LAW_INDEX, year)]
+
+
+charts = {
+    'total-population': (women_rights.get_standardized_population_chart, ('total',)),
+    'female-population': (women_rights.get_standardized_population_chart, ('female',)),
+    'male-population': (women_rights.get_standardized_population_chart, ('male',)),
+    'employment-vs-labor-force': (women_rights.update_employment_ratio_chart, ()),
+    'gender-employment-ratio': (women_rights.update_employment_ratio_heatmap, ()),
+    'employment-equality': (women_rights.update_employment_equality_chart, ()),
+    'life-equality': (women_rights.update_life_equality_chart, ()),
+    'women-bussiness-and-law-score': (law_score_map, (2020,)),
+}
+
+# What a chart's image depends on besides its function, the region's rows and
+# its arguments: the functions it wraps, and data from outside the region.
+wrapped_functions = {
+    'women-bussiness-and-law-score': [women_rights.update_figure],
+}
+outside_data = {
+    'women-bussiness-and-law-score': law_score_ranks,
+}
+
+DEFAULT_WIDTH = 1385
+DEFAULT_HEIGHT = 450
+MANIFEST_NAME = '.fingerprints.json'
+
+
+def data_fingerprint(region, chart):
+    countries = women_rights.regions[region]
+    func, extra_args = charts[chart]
+    rows = women_rights.df_original[women_rights.df_original['Country'].isin(countries)]
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps([chart, countries, extra_args]).encode())
+    digest.update(pd.util.hash_pandas_object(rows, index=False).values.tobytes())
+    for source in [func] + wrapped_functions.get(chart, []):
+        digest.update(inspect.getsource(source).encode())
+    if chart in outside_data:
+        digest.update(json.dumps(outside_data[chart](countries, *extra_args)).encode())
+    return digest.hexdigest()
+
+
+def render(region, chart, path, image_format, scale):
+    start = time.perf_counter()
+    func, extra_args = charts[chart]
+    fig = func(women_rights.regions[region], *extra_args)
+    fig.write_image(path, format=image_format, scale=scale,
+                    width=fig.layout.width or DEFAULT_WIDTH,
+                    height=fig.layout.height or DEFAULT_HEIGHT)
+    return region, chart, time.perf_counter() - start
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def save_manifest(output_dir, manifest):
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+
+
+def render_all(output_dir, regions, chart_names, workers, image_format='png', scale=1, force=False):
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+
+    jobs = []
+    skipped = 0
+    for region in regions:
+        for chart in chart_names:
+            name = f'{region_slugs[region]}-{chart}.{image_format}'
+            path = os.path.join(output_dir, name)
+            fingerprint = data_fingerprint(region, chart)
+            if not force and os.path.exists(path) and manifest.get(name) == fingerprint:
+                skipped += 1
+                continue
+            jobs.append((region, chart, path, name, fingerprint))
+
+    start = time.perf_counter()
+    rendered = 0
+    failed = []
+    if jobs:
+        # Forked workers reuse the data women_rights already prepared.
+        context = multiprocessing.get_context(
+            'fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {pool.submit(render, region, chart, path, image_format, scale): (name, fingerprint)
+                       for region, chart, path, name, fingerprint in jobs}
+            for future in as_completed(futures):
+                name, fingerprint = futures[future]
+                try:
+                    region, chart, duration = future.result()
+                except Exception as error:
+                    failed.append(name)
+                    print(f'{name}: failed ({error})')
+                    continue
+                rendered += 1
+                manifest[name] = fingerprint
+                print(f'{name}: {duration:.2f}s')
+        save_manifest(output_dir, manifest)
+    elapsed = time.perf_counter() - start
+
+    throughput = rendered / elapsed if elapsed else 0
+    print(f'Rendered {rendered} images in {elapsed:.1f}s ({throughput:.2f} images/s), '
+          f'skipped {skipped} unchanged, {len(failed)} failed')
+    return rendered, skipped, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Render the region chart images in women_rights/img.')
+    parser.add_argument('--output-dir', default='../img')
+    parser.add_argument('--regions', nargs='+', default=list(region_slugs),
+                        choices=list(region_slugs))
+    parser.add_argument('--charts', nargs='+', default=list(charts), choices=list(charts))
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--format', default='png')
+    parser.add_argument('--scale', type=float, default=1)
+    parser.add_argument('--force', action='store_true',
+                        help='render even if the data fingerprint is unchanged')
+    args = parser.parse_args()
+
+    render_all(args.output_dir, args.regions, args.charts, args.workers,
+               image_format=args.format, scale=args.scale, force=args.force)
+
+
+if __name__ == '__main__':
+    main()
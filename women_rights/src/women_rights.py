@@ -1,7 +1,6 @@
 from geopy.geocoders import Nominatim
 import pandas as pd
 import plotly.express as px
-from dash import Dash
 from dash import dcc, html
 from dash.dependencies import Input, Output, State
 import plotly.graph_objs as go
@@ -10,28 +9,24 @@ from plotly.subplots import make_subplots
 from math import ceil
 import geopandas as gpd
 
+from dash_server import create_app, dump_metrics_on_exit
+import profiling
+import series_cube
+import panel_store
+import region_aggregates
+import rankings
+import hot_reload
+
 
 geolocator = Nominatim(user_agent='geoapiExercises')
 
 
 def prepare_data(file_path):
-    df = pd.read_csv(file_path)
-
-    df = df[['Series Name', 'Country Name', 'Country Code'] +
-            [col for col in df if col.startswith('19') or col.startswith('20')]]
-
-    df = df.melt(id_vars=['Series Name', 'Country Name', 'Country Code'],
-                 var_name='Year', value_name='Value')
-
-    df['Year'] = df['Year'].str.extract('(\d+)').astype(int)
-
-    df = df.pivot_table(index=['Country Name', 'Year', 'Country Code'],
-                        columns='Series Name', values='Value').reset_index()
-
-    df.columns.name = ''
-    df.rename(columns={'Country Name': 'Country'}, inplace=True)
+    # Without the region aggregate rows: the world map locates every country
+    # of the dropdown, which an aggregate is not.
+    df = panel_store.cube(file_path)
 
-    all_countries = df['Country'].unique().tolist()
+    all_countries = series_cube.countries(df)
     return df, all_countries
 
 
@@ -39,7 +34,7 @@ group_features = ['Population, total',
                   'Population, female',
                   'Population, male',]
 
-regions = {
+regions = region_aggregates.with_user_regions({
     'Europe': ['United Kingdom', 'France', 'Germany', 'Italy', 'Spain', 'Belgium', 'Netherlands', 'Switzerland', 'Sweden', 'Poland'],
     'Middle East': ['Saudi Arabia', 'Iran, Islamic Rep.', 'Israel', 'Turkiye', 'United Arab Emirates', 'Iraq', 'Lebanon', 'Qatar', 'Jordan', 'Kuwait'],
     'Asia': ['China', 'Japan', 'India', 'Vietnam', 'Russian Federation', 'Thailand', 'Indonesia', 'Pakistan', 'Philippines', 'Malaysia'],
@@ -47,53 +42,71 @@ regions = {
     'South America': ['Brazil', 'Argentina', 'Venezuela, RB', 'Uruguay', 'Colombia', 'Chile', 'Peru', 'Guyana', 'Suriname', 'Ecuador'],
     'North and middle America': ['United States', 'Canada', 'Mexico', 'Panama', 'Costa Rica', 'Jamaica', 'Dominican Republic'],
 
-}
-
-df, all_countries = prepare_data('../../data/cleaned_data.csv')
-df_original = df.copy()
-
-app = Dash(__name__)
-
-
-app.layout = html.Div([
-    dcc.Dropdown(
-        id='country-dropdown',
-        options=[{'label': country, 'value': country}
-                 for country in all_countries],
-        multi=True,
-        value=[]
-    ),
-    dcc.RadioItems(
-        id='region-radio',
-        options=[{'label': region, 'value': region}
-                 for region in regions.keys()],
-        value=None
-    ),
-    dcc.Graph(id='line-chart-total'),
-    dcc.Graph(id='line-chart-female'),
-    dcc.Graph(id='line-chart-male'),
-    dcc.Graph(id='employment-ratio-chart'),
-    dcc.Graph(id='employment-ratio-chart-heatmap'),
-    dcc.Graph(id='employment-equality-chart'),
-    dcc.Graph(id='life-equality-chart'),
-    html.Label('Select Year:'),
-    dcc.RadioItems(
-        id='year-radio',
-        options=[{'label': str(i), 'value': i}
-                 for i in [1970, 1980, 1990, 2000, 2010, 2020]],
-        value=2020,
-        labelStyle={'display': 'inline-block'}
-    ),
-    html.Div(
-        dcc.Graph(id='world-map'),
-        style={
-            'display': 'flex',
-            'justify-content': 'center',
-            'width': '100%'
-        }
-    ),
-
-])
+})
+
+DATA_PATH = '../../data/cleaned_data.csv'
+LAW_INDEX = 'SG.LAW.INDX'
+
+
+def load_data(path):
+    with profiling.profiled('women_rights.prepare_data', {'file_path': path}, sampled=False):
+        df, all_countries = prepare_data(path)
+    decades = [year for year in series_cube.years(df) if year % 10 == 0]
+    law_ranks = rankings.from_wide(
+        panel_store.read_csv(path, columns=['Country Name', 'Series Code'], series_codes=[LAW_INDEX]), [LAW_INDEX])
+    return df, all_countries, df.copy(), decades, law_ranks
+
+
+df, all_countries, df_original, decades, law_ranks = load_data(DATA_PATH)
+hot_reload.register(__name__, DATA_PATH, load_data, ['df', 'all_countries', 'df_original', 'decades', 'law_ranks'])
+
+app = create_app(__name__)
+
+
+def serve_layout():
+    return html.Div([
+        dcc.Dropdown(
+            id='country-dropdown',
+            options=[{'label': country, 'value': country}
+                     for country in all_countries],
+            multi=True,
+            value=[]
+        ),
+        dcc.RadioItems(
+            id='region-radio',
+            options=[{'label': region, 'value': region}
+                     for region in regions.keys()],
+            value=None
+        ),
+        dcc.Graph(id='line-chart-total'),
+        dcc.Graph(id='line-chart-female'),
+        dcc.Graph(id='line-chart-male'),
+        dcc.Graph(id='employment-ratio-chart'),
+        dcc.Graph(id='employment-ratio-chart-heatmap'),
+        dcc.Graph(id='employment-equality-chart'),
+        dcc.Graph(id='life-equality-chart'),
+        html.Label('Select Year:'),
+        dcc.RadioItems(
+            id='year-radio',
+            options=[{'label': str(i), 'value': i}
+                     for i in decades],
+            value=decades[-1],
+            labelStyle={'display': 'inline-block'}
+        ),
+        html.Div(
+            dcc.Graph(id='world-map'),
+            style={
+                'display': 'flex',
+                'justify-content': 'center',
+                'width': '100%'
+            }
+        ),
+        html.Div(id='world-leaderboard'),
+
+    ])
+
+
+app.layout = serve_layout
 
 
 @app.callback(
@@ -114,8 +127,7 @@ def get_standardized_population_chart(selected_countries, population_type):
         return go.Figure()
     else:
         column_name = f'Population, {population_type}'
-        filtered_df = df_original[df_original['Country'].isin(
-            selected_countries)][['Year', 'Country', column_name]]
+        filtered_df = series_cube.country_rows(df_original, selected_countries)[['Year', 'Country', column_name]]
 
         scaler = StandardScaler()
         for country in selected_countries:
@@ -208,12 +220,9 @@ def update_employment_ratio_chart(selected_countries):
     if not selected_countries:
         return go.Figure()
 
-    filtered_df = df[df['Country'].isin(selected_countries)]
+    filtered_df = series_cube.country_rows(df, selected_countries)
     filtered_df = filtered_df[filtered_df['Year'] >= 1990]
 
-    filtered_df['Labor force proportion'] = (
-        filtered_df['Labor force, total'] / filtered_df['Population, total']) * 100
-
     n = len(selected_countries)
     n_cols = min(5, n)
     n_rows = ceil(n / n_cols)
@@ -243,11 +252,7 @@ def update_employment_ratio_chart(selected_countries):
     for i, country in enumerate(selected_countries, start=1):
         country_df = filtered_df[filtered_df['Country'] == country]
 
-        labor_force_employment_proportion = (
-            country_df['Employment to population ratio, 15+, total (%) (modeled ILO estimate)'] *
-            (country_df['Population, total'] - country_df['Population ages 0-14, total']) /
-            country_df['Population, total']
-        )
+        labor_force_employment_proportion = country_df['Employment to population ratio, total (%)']
 
         min_country = min(labor_force_employment_proportion.min(),
                           country_df['Labor force proportion'].min())
@@ -327,8 +332,7 @@ def update_employment_ratio_heatmap(selected_countries):
     if len(selected_countries) > 10:
         return go.Figure()
     else:
-        filtered_df = df_original[df_original['Country'].isin(
-            selected_countries)]
+        filtered_df = series_cube.country_rows(df_original, selected_countries)
         filtered_df = filtered_df[filtered_df['Year'] > 1990]
 
         employment_features = [
@@ -417,7 +421,7 @@ life_features = [
 
 
 def calculate_average_score(df, selected_countries, features):
-    df_selected = df[df['Country'].isin(selected_countries)]
+    df_selected = series_cube.country_rows(df, selected_countries)
 
     for feature in features:
         df_selected[feature] = df_selected[feature].interpolate()
@@ -483,14 +487,15 @@ def geolocate(country):
 
 
 @app.callback(
-    Output('world-map', 'figure'),
+    [Output('world-map', 'figure'),
+     Output('world-leaderboard', 'children')],
     [Input('country-dropdown', 'value'),
      Input('year-radio', 'value')])
 def update_figure(selected_countries, selected_year):
     if not selected_countries or not selected_year:
-        return go.Figure()
+        return go.Figure(), None
     else:
-        filtered_df = df[df.Year == selected_year]
+        filtered_df = series_cube.year_rows(df, selected_year)
         filtered_df = filtered_df[filtered_df['Country'].isin(
             selected_countries)]
 
@@ -518,7 +523,8 @@ def update_figure(selected_countries, selected_year):
         fig = go.Figure(data=go.Choropleth(
             locations=filtered_df['Country Code'],
             z=filtered_df['Women Business and the Law Index Score (scale 1-100)'],
-            text=filtered_df['Country'],
+            text=[f'{country} (#{rankings.rank(law_ranks, LAW_INDEX, selected_year, country) or "-"}'
+                  f' of {rankings.count(law_ranks, LAW_INDEX, selected_year)})' for country in filtered_df['Country']],
             colorscale='YlOrRd',
             autocolorscale=False,
             reversescale=True,
@@ -543,8 +549,9 @@ def update_figure(selected_countries, selected_year):
         fig.update_layout(
             title_text='Geographical Women Business and the Law Index Score')
 
-        return fig
+        return fig, rankings.leaderboard(law_ranks, LAW_INDEX, selected_year, selected_countries)
 
 
 if __name__ == '__main__':
+    dump_metrics_on_exit()
     app.run_server(debug=True)